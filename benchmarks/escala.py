@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# benchmarks/escala.py — Benchmark de escala com o qBittorrent falso
+#
+# Roda os fluxos principais contra populacoes sinteticas (qbittorrent_falso.py)
+# e mede, por cenario e tamanho: tempo de parede, chamadas e latencia por
+# endpoint da API, pico de RSS e tamanho do banco. Cada cenario roda num
+# processo proprio (o pico de RSS e do processo) com banco novo.
+#
+# Cenarios:
+#   checagem          executar_checagem a frio (banco vazio, sync full_update)
+#   checagem_quente   segundo run apos 1% de mudancas (delta do sync, caches)
+#   seed_cleaner      executar_seed_cleaner (dry run) com o disco critico
+#   trackers          gerenciar_trackers sobre o inventario do run
+#   tracker_list      gerar_lista_trackers (--tracker-list)
+#
+# Uso:
+#   python3 benchmarks/escala.py
+#   python3 benchmarks/escala.py --torrents 10000 --cenarios checagem seed_cleaner
+#   python3 benchmarks/escala.py --latencia-ms 2 --saida atual.json
+#   python3 benchmarks/escala.py --saida novo.json --comparar atual.json
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    import resource
+except ImportError:     # Windows
+    resource = None
+
+CENARIOS = ("checagem", "checagem_quente", "seed_cleaner", "trackers", "tracker_list")
+TAMANHOS = (10000, 50000, 100000)
+
+
+def _rss_pico_mb():
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KB, macOS bytes
+    return round(pico / (1024 ** 2 if sys.platform == "darwin" else 1024), 1)
+
+
+def _tamanho_banco_mb(db_path):
+    total = 0
+    for sufixo in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + sufixo):
+            total += os.path.getsize(db_path + sufixo)
+    return round(total / 1024 ** 2, 2)
+
+
+def _paths_config(pasta, critico):
+    livre = shutil.disk_usage(pasta).free / 1024 ** 3
+    limites = (livre + 100, livre + 200) if critico else (0, 0)
+    return {"p2p": {"path": pasta, "limite_min": limites[0], "limite_max": limites[1],
+                    "seed_cleaner": True, "pause_trigger": True}}
+
+
+def _checagem(client, conn, pasta, regras, espelho):
+    from modulos.checagem_disco import executar_checagem
+
+    return executar_checagem(
+        client=client, conn=conn, paths_config=_paths_config(pasta, False),
+        tracker_rules=regras, seed_cleaner_dry_run=True,
+        min_downloads_per_tracker=4, min_torrents_per_tracker=4,
+        enviar_notificacao_fn=lambda *a, **k: None, espelho=espelho)
+
+
+def executar_cenario(cenario, n, latencia_ms, semente):
+    """Roda um cenario neste processo e retorna o dict de resultado."""
+    from qbittorrent_falso import ClienteFalso, gerar_populacao
+    from modulos.db import init_db, criar_run
+    from modulos.sincronizacao import EspelhoTorrents
+
+    pasta   = tempfile.mkdtemp(prefix="qbit-bench-")
+    db_path = os.path.join(pasta, "qbit.db")
+    try:
+        torrents, regras = gerar_populacao(n, pasta=pasta, semente=semente)
+        client  = ClienteFalso(torrents, latencia_ms=latencia_ms, semente=semente)
+        conn    = init_db(pasta, db_path)
+        espelho = EspelhoTorrents(client, conn)
+        saida   = io.StringIO()
+
+        with contextlib.redirect_stdout(saida):
+            # Preparacao (fora da medicao)
+            if cenario in ("checagem_quente", "seed_cleaner"):
+                _checagem(client, conn, pasta, regras, espelho)
+                client.avancar(0.01)
+                client.zerar_metricas()
+
+            inicio = time.perf_counter()
+            if cenario in ("checagem", "checagem_quente"):
+                _checagem(client, conn, pasta, regras, espelho)
+            elif cenario == "seed_cleaner":
+                from modulos.helpers import verificar_espacos
+                from modulos.inventario import InventarioTorrents
+                from modulos.limpeza import executar_seed_cleaner
+
+                espacos = verificar_espacos(_paths_config(pasta, True))
+                run_id  = criar_run(conn, 'paused', 0, 0, espacos)
+                executar_seed_cleaner(client, conn, run_id, espacos, regras, True,
+                                      InventarioTorrents(client, conn, espelho=espelho))
+            elif cenario == "trackers":
+                from modulos.ativacao import gerenciar_trackers
+                from modulos.inventario import InventarioTorrents
+
+                gerenciar_trackers(client, 4, 4, InventarioTorrents(client, conn, espelho=espelho))
+            elif cenario == "tracker_list":
+                from modulos.tracker_list import gerar_lista_trackers
+
+                gerar_lista_trackers(client, conn, espelho=espelho)
+            else:
+                raise ValueError(f"cenário desconhecido: {cenario}")
+            segundos = time.perf_counter() - inicio
+
+        conn.close()
+        metricas = client.metricas()
+        return {
+            "cenario":       cenario,
+            "torrents":      n,
+            "segundos":      round(segundos, 3),
+            "chamadas_api":  sum(m["chamadas"] for m in metricas.values()),
+            "endpoints":     metricas,
+            "rss_pico_mb":   _rss_pico_mb(),
+            "banco_mb":      _tamanho_banco_mb(db_path),
+        }
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+def _rodar_em_processo(cenario, n, latencia_ms, semente):
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--filho", cenario, str(n),
+         "--latencia-ms", str(latencia_ms), "--semente", str(semente)],
+        capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"cenario": cenario, "torrents": n, "erro": proc.stderr.strip().splitlines()[-1:]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def _versao():
+    try:
+        return subprocess.run(["git", "-C", RAIZ, "describe", "--always", "--dirty"],
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _variacao(atual, anterior):
+    if anterior in (None, 0) or atual is None:
+        return ""
+    return f" ({(atual - anterior) / anterior * 100:+.0f}%)"
+
+
+def imprimir(resultados, anteriores=None):
+    base = {(r["cenario"], r["torrents"]): r for r in (anteriores or []) if "erro" not in r}
+    print(f"\n{'cenário':<17} {'torrents':>9} {'tempo (s)':>16} {'chamadas':>15} "
+          f"{'RSS (MB)':>16} {'banco (MB)':>16}")
+    for r in resultados:
+        if "erro" in r:
+            print(f"{r['cenario']:<17} {r['torrents']:>9}   ❌ {' '.join(r['erro'])}")
+            continue
+        ant = base.get((r["cenario"], r["torrents"]), {})
+        print(f"{r['cenario']:<17} {r['torrents']:>9} "
+              f"{str(r['segundos']) + _variacao(r['segundos'], ant.get('segundos')):>16} "
+              f"{str(r['chamadas_api']) + _variacao(r['chamadas_api'], ant.get('chamadas_api')):>15} "
+              f"{str(r['rss_pico_mb']) + _variacao(r['rss_pico_mb'], ant.get('rss_pico_mb')):>16} "
+              f"{str(r['banco_mb']) + _variacao(r['banco_mb'], ant.get('banco_mb')):>16}")
+        chamadas = "  ".join(f"{e}={m['chamadas']} ({m['ms_total']} ms)"
+                             for e, m in r["endpoints"].items())
+        if chamadas:
+            print(f"{'':<17} {'':>9}   📡 {chamadas}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de escala com qBittorrent falso")
+    parser.add_argument("--torrents", type=int, nargs="+", default=list(TAMANHOS))
+    parser.add_argument("--cenarios", nargs="+", choices=CENARIOS, default=list(CENARIOS))
+    parser.add_argument("--latencia-ms", type=float, default=0,
+                        help="Atraso simulado por requisição à API")
+    parser.add_argument("--semente", type=int, default=1)
+    parser.add_argument("--saida", help="Grava os resultados em JSON")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparar")
+    parser.add_argument("--filho", nargs=2, metavar=("CENARIO", "N"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.filho:
+        resultado = executar_cenario(args.filho[0], int(args.filho[1]),
+                                     args.latencia_ms, args.semente)
+        print(json.dumps(resultado))
+        return
+
+    anteriores = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            anteriores = json.load(f)["resultados"]
+
+    resultados = []
+    for n in args.torrents:
+        for cenario in args.cenarios:
+            print(f"⏱️  {cenario} com {n} torrents...", flush=True)
+            resultados.append(_rodar_em_processo(cenario, n, args.latencia_ms, args.semente))
+
+    imprimir(resultados, anteriores)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump({
+                "versao":      _versao(),
+                "gerado_em":   datetime.now().isoformat(timespec="seconds"),
+                "python":      platform.python_version(),
+                "latencia_ms": args.latencia_ms,
+                "semente":     args.semente,
+                "resultados":  resultados,
+            }, f, indent=2)
+        print(f"\n💾 Resultados gravados em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# benchmarks/qbittorrent_falso.py — qBittorrent Web API v2 falso, em processo
+#
+# Substitui o qbittorrentapi.Client nos benchmarks: implementa os endpoints
+# que o projeto usa (torrents_info, sync_maindata, torrents_trackers,
+# torrents_files e as acoes em lote) sobre uma populacao sintetica, contando
+# chamadas e latencia por endpoint.
+#
+# Uso:
+#   torrents, regras = gerar_populacao(50000, pasta="/tmp/bench")
+#   client = ClienteFalso(torrents, latencia_ms=2)
+#   ...
+#   client.avancar(0.01)      # muda 1% dos torrents (delta do proximo sync)
+#   client.metricas()         # {endpoint: {"chamadas", "ms_total", "ms_medio"}}
+
+import hashlib
+import random
+import time
+from collections import Counter, defaultdict
+
+GB = 1024 ** 3
+
+# Distribuicao de estados de uma biblioteca tipica (peso relativo)
+ESTADOS = {
+    "stalledUP":   45,
+    "uploading":   10,
+    "pausedUP":    10,
+    "queuedUP":     5,
+    "forcedUP":     2,
+    "downloading":  4,
+    "forcedDL":     4,
+    "stalledDL":    4,
+    "queuedDL":     6,
+    "pausedDL":     4,
+    "checkingDL":   1,
+    "checkingUP":   1,
+    "moving":       1,
+    "error":        1,
+    "missingFiles": 1,
+}
+
+ESTADOS_SEED = {"stalledUP", "uploading", "pausedUP", "queuedUP", "forcedUP", "checkingUP"}
+
+
+class Atributos(dict):
+    """dict com acesso por atributo (igual ao TorrentDictionary do qbittorrentapi)."""
+
+    def __getattr__(self, nome):
+        try:
+            return self[nome]
+        except KeyError:
+            raise AttributeError(nome)
+
+
+def gerar_populacao(n, trackers=20, cross_seed=0.2, dias_max=120, pasta="/tmp/qbit-bench",
+                    semente=1):
+    """
+    Gera n torrents sinteticos. Retorna (torrents, tracker_rules).
+
+    trackers:   quantidade de trackers (metade deles recebe regra em tracker_rules)
+    cross_seed: fracao dos torrents que e cross-seed de outro (mesmo conteudo,
+                outro tracker; um terco com a raiz renomeada)
+    dias_max:   seeding_time sorteado entre 0 e dias_max dias
+    """
+    rnd      = random.Random(semente)
+    hosts    = [f"tracker{i:02d}.example{i % 3}.org" for i in range(trackers)]
+    regras   = {h.split(".", 1)[1] if i % 4 == 0 else h: rnd.choice((7, 14, 30, 60))
+                for i, h in enumerate(hosts[: max(1, trackers // 2)])}
+    estados  = list(ESTADOS)
+    pesos    = list(ESTADOS.values())
+    save     = pasta.rstrip("/") + "/"
+
+    torrents = []
+    for i in range(n):
+        h     = hashlib.sha1(f"{semente}:{i}".encode()).hexdigest()
+        host  = rnd.choice(hosts)
+        state = rnd.choices(estados, pesos)[0]
+        base  = torrents[rnd.randrange(len(torrents))] if torrents and rnd.random() < cross_seed else None
+        if base is not None:
+            nome = base["name"] if rnd.random() < 0.67 else base["name"] + ".REPACK"
+            size = base["size"]
+        else:
+            nome = f"Release.{i:07d}.1080p.WEB-DL"
+            size = rnd.randrange(GB // 4, 15 * GB)
+        seeding = state in ESTADOS_SEED
+        torrents.append(Atributos(
+            hash=h, name=nome, state=state, size=size, total_size=size,
+            progress=1.0 if seeding else round(rnd.random(), 3),
+            amount_left=0 if seeding else rnd.randrange(0, size + 1),
+            dlspeed=0 if seeding else rnd.randrange(0, 20 * 1024 ** 2),
+            upspeed=rnd.randrange(0, 5 * 1024 ** 2) if seeding else 0,
+            ratio=round(rnd.random() * 3, 2),
+            seeding_time=rnd.randrange(0, dias_max * 86400) if seeding else 0,
+            force_start=state in ("forcedDL", "forcedUP"),
+            save_path=save,
+            content_path=base["content_path"] if base is not None and nome == base["name"]
+                         else save + nome,
+            tracker=f"https://{host}/{h[:16]}/announce",
+            infohash_v2="",
+            added_on=1700000000 + i,
+        ))
+    return torrents, regras
+
+
+class ClienteFalso:
+    """
+    Cliente com a interface do qbittorrentapi.Client usada pelo projeto.
+
+    latencia_ms: atraso simulado por requisicao (rede + qBittorrent).
+    Cada chamada conta em self.chamadas e soma o tempo em self.tempos.
+    """
+
+    def __init__(self, torrents, latencia_ms=0, semente=1):
+        self.torrents  = {t["hash"]: t for t in torrents}
+        self.latencia  = latencia_ms / 1000
+        self.chamadas  = Counter()
+        self.tempos    = defaultdict(float)
+        self._rnd      = random.Random(semente)
+        self._rid      = 0
+        self._alterados = set()
+        self._removidos = set()
+
+    # ------------------------------------------------------------------
+    # Medicao
+    # ------------------------------------------------------------------
+    def _inicio(self, endpoint):
+        self.chamadas[endpoint] += 1
+        inicio = time.perf_counter()
+        if self.latencia:
+            time.sleep(self.latencia)
+        return inicio
+
+    def _fim(self, endpoint, inicio):
+        self.tempos[endpoint] += time.perf_counter() - inicio
+
+    def metricas(self):
+        return {
+            e: {"chamadas": n,
+                "ms_total": round(self.tempos[e] * 1000, 1),
+                "ms_medio": round(self.tempos[e] * 1000 / n, 3)}
+            for e, n in sorted(self.chamadas.items())
+        }
+
+    def zerar_metricas(self):
+        self.chamadas.clear()
+        self.tempos.clear()
+
+    # ------------------------------------------------------------------
+    # Evolucao da populacao entre runs
+    # ------------------------------------------------------------------
+    def avancar(self, fracao=0.01, segundos=300):
+        """Muda uma fracao dos torrents e soma `segundos` ao seeding_time de quem seeda."""
+        for t in self.torrents.values():
+            if t["state"] in ESTADOS_SEED:
+                t["seeding_time"] += segundos
+        for h in self._rnd.sample(list(self.torrents), int(len(self.torrents) * fracao)):
+            t = self.torrents[h]
+            if t["progress"] < 1:
+                t["progress"]    = min(1.0, round(t["progress"] + self._rnd.random() / 4, 3))
+                t["amount_left"] = int(t["size"] * (1 - t["progress"]))
+                if t["progress"] >= 1:
+                    t["state"], t["dlspeed"] = "stalledUP", 0
+            else:
+                t["upspeed"] = self._rnd.randrange(0, 5 * 1024 ** 2)
+            self._alterados.add(h)
+
+    # ------------------------------------------------------------------
+    # Autenticacao / app
+    # ------------------------------------------------------------------
+    def auth_log_in(self, username=None, password=None):
+        inicio = self._inicio("auth_log_in")
+        self._fim("auth_log_in", inicio)
+
+    def app_version(self):
+        inicio = self._inicio("app_version")
+        self._fim("app_version", inicio)
+        return "v4.6.0"
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+    def _hashes(self, torrent_hashes):
+        if isinstance(torrent_hashes, str):
+            return torrent_hashes.split("|")
+        return list(torrent_hashes or ())
+
+    def torrents_info(self, torrent_hashes=None, **kwargs):
+        inicio = self._inicio("torrents_info")
+        if torrent_hashes:
+            lista = [Atributos(self.torrents[h]) for h in self._hashes(torrent_hashes)
+                     if h in self.torrents]
+        else:
+            lista = [Atributos(t) for t in self.torrents.values()]
+        self._fim("torrents_info", inicio)
+        return lista
+
+    def sync_maindata(self, rid=0):
+        inicio = self._inicio("sync_maindata")
+        self._rid += 1
+        if not rid:
+            dados = {"rid": self._rid, "full_update": True,
+                     "torrents": {h: {k: v for k, v in t.items() if k != "hash"}
+                                  for h, t in self.torrents.items()}}
+        else:
+            dados = {"rid": self._rid,
+                     "torrents": {h: dict(self.torrents[h]) for h in self._alterados
+                                  if h in self.torrents},
+                     "torrents_removed": list(self._removidos)}
+        self._alterados.clear()
+        self._removidos.clear()
+        self._fim("sync_maindata", inicio)
+        return Atributos(dados)
+
+    def torrents_trackers(self, torrent_hash):
+        inicio = self._inicio("torrents_trackers")
+        t = self.torrents[torrent_hash]
+        lista = [Atributos(url="** [DHT] **"), Atributos(url="** [PeX] **"),
+                 Atributos(url="** [LSD] **"), Atributos(url=t["tracker"])]
+        self._fim("torrents_trackers", inicio)
+        return lista
+
+    def torrents_files(self, torrent_hash):
+        inicio = self._inicio("torrents_files")
+        t = self.torrents[torrent_hash]
+        # Arquivos deterministicos pelo conteudo: cross-seeds renomeados batem
+        rnd    = random.Random(t["size"])
+        partes = rnd.randint(1, 5)
+        lista  = [Atributos(name=f"arquivo{i}", size=t["size"] // partes) for i in range(partes)]
+        self._fim("torrents_files", inicio)
+        return lista
+
+    # ------------------------------------------------------------------
+    # Acoes (hashes separados por '|')
+    # ------------------------------------------------------------------
+    def _alterar(self, endpoint, torrent_hashes, **campos):
+        inicio = self._inicio(endpoint)
+        for h in self._hashes(torrent_hashes):
+            t = self.torrents.get(h)
+            if t is not None:
+                t.update(campos)
+                self._alterados.add(h)
+        self._fim(endpoint, inicio)
+
+    def torrents_pause(self, torrent_hashes=None):
+        self._alterar("torrents_pause", torrent_hashes, state="pausedDL", force_start=False)
+
+    def torrents_resume(self, torrent_hashes=None):
+        self._alterar("torrents_resume", torrent_hashes, state="queuedDL")
+
+    def torrents_set_force_start(self, torrent_hashes=None, enable=True):
+        inicio = self._inicio("torrents_set_force_start")
+        for h in self._hashes(torrent_hashes):
+            t = self.torrents.get(h)
+            if t is None:
+                continue
+            t["force_start"] = enable
+            if enable and t["state"] in ("downloading", "stalledDL", "queuedDL", "pausedDL"):
+                t["state"] = "forcedDL"
+            self._alterados.add(h)
+        self._fim("torrents_set_force_start", inicio)
+
+    def torrents_recheck(self, torrent_hashes=None):
+        self._alterar("torrents_recheck", torrent_hashes)
+
+    def torrents_delete(self, delete_files=False, torrent_hashes=None):
+        inicio = self._inicio("torrents_delete")
+        for h in self._hashes(torrent_hashes):
+            if self.torrents.pop(h, None) is not None:
+                self._removidos.add(h)
+                self._alterados.discard(h)
+        self._fim("torrents_delete", inicio)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# benchmarks/regras_trackers.py — Micro-benchmark do casamento TRACKER_RULES
+#
+# Compara a busca linear antiga (urlparse a cada URL + substring contra cada
+# regra) com o IndiceRegras (parse memoizado + lookup por sufixo).
+#
+# Uso:
+#   python3 benchmarks/regras_trackers.py
+#   python3 benchmarks/regras_trackers.py --torrents 50000 --regras 100
+
+import argparse
+import os
+import random
+import sys
+import time
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modulos.helpers import IndiceRegras, extrair_host_tracker  # noqa: E402
+
+
+def _dominio_linear(url):
+    # Implementacao anterior: sem cache, dominio = dois ultimos labels
+    try:
+        host  = urlparse(url).netloc.lower().split('@')[-1].split(':')[0]
+        parts = host.split('.')
+        return '.'.join(parts[-2:]) if len(parts) >= 2 else host
+    except Exception:
+        return "unknown"
+
+
+def _regras_linear(urls, tracker_rules):
+    rules = []
+    for url in urls:
+        domain = _dominio_linear(url)
+        for rule_domain, days in tracker_rules.items():
+            if rule_domain in domain:
+                rules.append((rule_domain, days))
+                break
+    return rules
+
+
+def _regras_indice(urls, indice):
+    rules = []
+    for url in urls:
+        regra = indice.regra(extrair_host_tracker(url))
+        if regra is not None:
+            rules.append(regra)
+    return rules
+
+
+def gerar_dados(n_torrents, n_regras, seed=1):
+    rnd    = random.Random(seed)
+    regras = {f"tracker{i:03d}.org": 30 + i for i in range(n_regras)}
+    # Metade dos announces casa com alguma regra; o resto sao trackers publicos
+    hosts  = [f"announce.tracker{i:03d}.org" for i in range(n_regras)] + \
+             [f"open.public{i:03d}.net" for i in range(n_regras)]
+    # Announce URL de tracker privado: mesmo passkey em todos os torrents do usuario
+    announces = [f"https://{h}:443/{rnd.getrandbits(64):016x}/announce" for h in hosts]
+    torrents  = [[rnd.choice(announces) for _ in range(rnd.randint(1, 3))]
+                 for _ in range(n_torrents)]
+    return regras, torrents
+
+
+def medir(fn, torrents, extra):
+    inicio = time.perf_counter()
+    total  = 0
+    for urls in torrents:
+        total += len(fn(urls, extra))
+    return time.perf_counter() - inicio, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de TRACKER_RULES")
+    parser.add_argument("--torrents", type=int, default=50000)
+    parser.add_argument("--regras",   type=int, default=100)
+    args = parser.parse_args()
+
+    regras, torrents = gerar_dados(args.torrents, args.regras)
+    n_urls = sum(len(u) for u in torrents)
+    print(f"📦 {args.torrents} torrents, {n_urls} announce URLs, {args.regras} regras")
+
+    t_linear, casos_linear = medir(_regras_linear, torrents, regras)
+
+    inicio = time.perf_counter()
+    indice = IndiceRegras(regras)
+    t_compilar = time.perf_counter() - inicio
+    t_indice, casos_indice = medir(_regras_indice, torrents, indice)
+
+    print(f"   linear:  {t_linear * 1000:8.1f} ms  ({casos_linear} regras aplicadas)")
+    print(f"   índice:  {(t_indice + t_compilar) * 1000:8.1f} ms  ({casos_indice} regras aplicadas, "
+          f"compilação {t_compilar * 1000:.2f} ms)")
+    print(f"   🚀 {t_linear / (t_indice + t_compilar):.1f}x mais rápido")
+
+
+if __name__ == "__main__":
+    main()
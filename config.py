@@ -24,6 +24,12 @@ QB_URL  = "http://torrent.seudominio.com:PORTA"   # URL do qBittorrent (com port
 QB_USER = "admin"
 QB_PASS = "sua_senha_aqui"
 
+# O cookie de sessão é salvo em DB_DIR/qb_session.json (permissão 0600) e
+# reaproveitado nas próximas execuções, evitando um login a cada run.
+# Use um valor menor que o timeout de sessão da Web UI (padrão 3600 s).
+# 0 = fazer login sempre.
+QB_SESSAO_TTL_MINUTOS = 50
+
 # -----------------------------------------------------------------------------
 # Notificações
 # -----------------------------------------------------------------------------
@@ -36,6 +42,18 @@ QB_PASS = "sua_senha_aqui"
 NOTIFICACAO_TIPO = "nenhum"
 NOTIFICACAO_CONFIG = {}
 
+# Vários canais ao mesmo tempo: lista de tipos e as credenciais de cada um
+# pelo nome do tipo. Os canais enviam em paralelo, sem segurar o run.
+#   NOTIFICACAO_TIPO   = ["telegram", "discord"]
+#   NOTIFICACAO_CONFIG = {
+#       "telegram": {"bot_token": "...", "chat_id": "..."},
+#       "discord":  {"webhook_url": "https://discord.com/api/webhooks/..."},
+#   }
+
+# Espera máxima pelos envios no fim do run; o que não chegou (canal fora do
+# ar, rate limit longo) fica pendente no banco e é reenviado no próximo run.
+NOTIFICACAO_PRAZO_SEGUNDOS = 15
+
 # ── Telegram ──────────────────────────────────────────────────────────────────
 # Crie um bot via @BotFather e obtenha o BOT_TOKEN.
 # Para obter o CHAT_ID: envie uma mensagem ao bot e acesse
@@ -97,6 +115,51 @@ MIN_DOWNLOADS_PER_TRACKER = 4   # Mínimo de downloads ativos simultâneos por t
 MIN_TORRENTS_PER_TRACKER  = 4   # Ignorar tracker se tiver menos torrents que isso
                                  # (exceto se não houver nenhum ativo)
 
+# -----------------------------------------------------------------------------
+# Previsão de enchimento dos discos
+# A cada execução o espaço livre fica no histórico (tabela runs). Uma reta
+# ajustada sobre as últimas PREVISAO_JANELA_HORAS estima quando cada disco
+# atinge o limite_min. Se for dentro de PREVISAO_HORIZONTE_MINUTOS, o seed
+# cleaner roda antes do disco ficar crítico (discos com seed_cleaner) e a
+# ativação de novos downloads por tracker é suspensa.
+# 0 no horizonte = só mostrar a previsão, sem ação preventiva.
+# -----------------------------------------------------------------------------
+PREVISAO_JANELA_HORAS      = 6
+PREVISAO_HORIZONTE_MINUTOS = 60
+
+# -----------------------------------------------------------------------------
+# Retenção e compactação do banco
+# Snapshots mais antigos que RETENCAO_SNAPSHOTS_DIAS viram agregados por hora
+# e por dia (tracker + estado) e os registros brutos são apagados. Os
+# agregados por hora ficam RETENCAO_HORARIO_DIAS; os diários, para sempre.
+# Runs, eventos de espera, notificações e logins saem após RETENCAO_RUNS_DIAS.
+# Roda sozinho após o run nas COMPACTAR_HORAS (no máximo
+# COMPACTAR_PRAZO_SEGUNDOS por vez, em lotes de COMPACTAR_LOTE linhas) ou
+# manualmente com --compact. COMPACTAR_HORAS = [] desliga o automático.
+# -----------------------------------------------------------------------------
+RETENCAO_SNAPSHOTS_DIAS  = 14
+RETENCAO_HORARIO_DIAS    = 90
+RETENCAO_RUNS_DIAS       = 90
+COMPACTAR_HORAS          = [3, 4]
+COMPACTAR_PRAZO_SEGUNDOS = 60
+COMPACTAR_LOTE           = 5000
+
+# -----------------------------------------------------------------------------
+# Modo daemon (--daemon)
+# Intervalo entre ciclos quando o script roda como serviço em vez de cron.
+# O config.py e o tracker_rules.py são recarregados automaticamente quando
+# alterados (ou com SIGHUP).
+# -----------------------------------------------------------------------------
+DAEMON_INTERVALO_SEGUNDOS = 300
+
+# -----------------------------------------------------------------------------
+# Ações em lote
+# Pausa, retomada, force start, recheck e deleção são enviados em lotes de
+# hashes separados por '|' (uma requisição por lote em vez de uma por torrent).
+# Se um lote falhar, ele é dividido e reenviado até isolar o hash com problema.
+# -----------------------------------------------------------------------------
+ACOES_TAMANHO_LOTE = 100
+
 # -----------------------------------------------------------------------------
 # Discos monitorados
 # Cada entrada define um ponto de montagem e seus limites de espaço livre em GB:
@@ -123,6 +186,22 @@ PATHS = {
     },
 }
 
+# -----------------------------------------------------------------------------
+# Sincronização incremental (/api/v2/sync/maindata)
+# True  → guarda uma cópia dos torrents no banco e pede ao qBittorrent só o que
+#         mudou desde a última execução (bem mais leve com muitos torrents)
+# False → baixa a lista completa (torrents_info) a cada execução
+# -----------------------------------------------------------------------------
+SYNC_MAINDATA = True
+
+# -----------------------------------------------------------------------------
+# Cache de trackers (tabela tracker_cache no banco)
+# Os trackers de cada torrent são consultados uma única vez e reaproveitados
+# nas execuções seguintes. Defina um TTL em horas para forçar nova consulta
+# periódica (0 = só consulta hashes novos ou com tracker alterado).
+# -----------------------------------------------------------------------------
+TRACKER_CACHE_TTL_HORAS = 0
+
 # -----------------------------------------------------------------------------
 # Limpeza por tempo de seeding (integração com seed cleaner)
 # SEED_CLEANER_DRY_RUN = True  → apenas simula, não apaga nada
@@ -130,9 +209,28 @@ PATHS = {
 # -----------------------------------------------------------------------------
 SEED_CLEANER_DRY_RUN = True
 
+# SEED_CLEANER_ALVO = True  → apaga só os grupos necessários para o disco voltar
+#                             ao limite_max (maiores primeiro; empate: mais
+#                             tempo de seed, depois maior ratio)
+# SEED_CLEANER_ALVO = False → apaga todos os elegíveis
+# O --erase-torrent sempre considera todos os elegíveis.
+SEED_CLEANER_ALVO = True
+
+# Após apagar, espera o qBittorrent remover os torrents e o disco devolver o
+# espaço (consulta com intervalo crescente). Segue assim que o espaço volta;
+# desiste após SEED_CLEANER_PRAZO_SEGUNDOS.
+SEED_CLEANER_PRAZO_SEGUNDOS = 300
+
+# Hardlinks: arquivos com link na biblioteca do Radarr/Sonarr não liberam
+# espaço ao apagar o torrent. O seed cleaner examina os arquivos (stat) para
+# calcular o espaço realmente recuperável; o resultado fica em cache no banco
+# e os contadores de link são reconferidos após CONTEUDO_CACHE_TTL_HORAS.
+CONTEUDO_CACHE_TTL_HORAS = 6
+
 # Regras por tracker: domínio -> dias mínimos de seeding para elegível à deleção
-# O script agrupa cross-seeds pelo nome do torrent: só deleta quando TODOS os
-# trackers do grupo satisfizerem o mínimo de dias configurado.
+# O script agrupa cross-seeds pelo conteúdo (mesmo content_path, infohash v2
+# ou mesma lista de arquivos): só deleta quando TODOS os trackers do grupo
+# satisfizerem o mínimo de dias configurado.
 TRACKER_RULES = {
     "tracker1.example.com":   30,   # deleta após 30 dias de seed
     "tracker2.example.com":   45,
@@ -143,9 +241,30 @@ TRACKER_RULES = {
 
 # -----------------------------------------------------------------------------
 # OpenTelemetry (opcional)
-# Para enviar logs estruturados a um OTEL Collector, descomente abaixo:
+# Para enviar logs estruturados, métricas e o trace de cada run (tempo por fase e por
+# chamada da API) a um OTEL Collector, descomente abaixo:
 # -----------------------------------------------------------------------------
 # OTEL_ENDPOINT     = "http://localhost:4318"
 # OTEL_SERVICE_NAME = "qbit-manager"
 # OTEL_ENVIRONMENT  = "production"
 # OTEL_ENABLED      = True
+#
+# O envio acontece em segundo plano, comprimido (gzip). Envios que falham
+# (collector fora do ar) ficam em DB_DIR/otel-spool.jsonl e são reenviados no
+# próximo run; acima do limite os mais antigos são descartados. O run espera
+# a thread de envio por no máximo OTEL_PRAZO_ENVIO_SEGUNDOS.
+# OTEL_SPOOL_MAX_MB         = 20
+# OTEL_PRAZO_ENVIO_SEGUNDOS = 5
+
+# -----------------------------------------------------------------------------
+# Prometheus (opcional)
+# Métricas do último run (discos, pausados, checking/moving, torrents por
+# tracker, seed cleaner, duração das fases) no formato do Prometheus, sem
+# chamadas extras ao qBittorrent.
+#   PROMETHEUS_TEXTFILE: arquivo para o textfile collector do node_exporter,
+#                        regravado de forma atômica no fim de cada run
+#   PROMETHEUS_PORTA:    servidor HTTP com GET /metrics (só no --daemon)
+# -----------------------------------------------------------------------------
+# PROMETHEUS_TEXTFILE = "/var/lib/node_exporter/textfile_collector/qbit.prom"
+# PROMETHEUS_PORTA    = 9835
+# PROMETHEUS_ENDERECO = "0.0.0.0"
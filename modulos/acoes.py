@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# modulos/acoes.py — Acoes em lote na API do qBittorrent
+#
+# A Web API aceita varios hashes separados por '|' em uma unica chamada.
+# Em vez de uma requisicao (+ sleep) por torrent, as acoes sao agrupadas em
+# lotes de tamanho configuravel. Se um lote falhar, ele e dividido ao meio e
+# reenviado ate isolar o(s) hash(es) com problema.
+#
+# Configuracao no config.py:
+#   ACOES_TAMANHO_LOTE = 100
+
+# Config — sobrescrito por configurar_acoes()
+_config = {
+    "tamanho_lote": 100,
+}
+
+# Acao -> funcao que recebe (client, hashes_unidos, **kwargs)
+_ACOES = {
+    "pause":       lambda client, hashes, **kw: client.torrents_pause(torrent_hashes=hashes),
+    "resume":      lambda client, hashes, **kw: client.torrents_resume(torrent_hashes=hashes),
+    "force_start": lambda client, hashes, enable=True, **kw:
+                       client.torrents_set_force_start(torrent_hashes=hashes, enable=enable),
+    "recheck":     lambda client, hashes, **kw: client.torrents_recheck(torrent_hashes=hashes),
+    "delete":      lambda client, hashes, delete_files=True, **kw:
+                       client.torrents_delete(delete_files=delete_files, torrent_hashes=hashes),
+}
+
+
+def configurar_acoes(tamanho_lote=None):
+    if tamanho_lote:
+        _config["tamanho_lote"] = max(1, int(tamanho_lote))
+
+
+def _enviar_lote(client, fn, lote, kwargs, resultados):
+    try:
+        fn(client, "|".join(lote), **kwargs)
+    except Exception as e:
+        if len(lote) == 1:
+            resultados[lote[0]] = str(e) or e.__class__.__name__
+            return
+        # Dividir e reenviar para isolar o hash problematico
+        meio = len(lote) // 2
+        _enviar_lote(client, fn, lote[:meio], kwargs, resultados)
+        _enviar_lote(client, fn, lote[meio:], kwargs, resultados)
+        return
+    for h in lote:
+        resultados[h] = None
+
+
+def executar_em_lote(client, acao, hashes, tamanho_lote=None, **kwargs):
+    """
+    Executa uma acao (pause, resume, force_start, recheck, delete) em lotes.
+
+    Uso:
+        resultados = executar_em_lote(client, "pause", hashes)
+        resultados = executar_em_lote(client, "force_start", hashes, enable=False)
+
+    Retorna {hash: None} para sucesso ou {hash: "mensagem de erro"} para falha.
+    """
+    fn = _ACOES[acao]
+    tamanho    = tamanho_lote or _config["tamanho_lote"]
+    hashes     = list(dict.fromkeys(hashes))
+    resultados = {}
+    for i in range(0, len(hashes), tamanho):
+        _enviar_lote(client, fn, hashes[i:i + tamanho], kwargs, resultados)
+    return resultados
@@ -1,18 +1,18 @@
 #!/usr/bin/env python3
 # modulos/ativacao.py — Ativacao de downloads, restauracao e gerenciamento de trackers
 
-import time
 from collections import defaultdict
+from modulos.acoes import executar_em_lote
 from modulos.db import (
     ler_torrents_pausados,
     registrar_pause_event,
 )
 from modulos.helpers import (
-    extrair_dominio_tracker,
+    disco_do_caminho,
     obter_downloads_ativos,
     notificar_se_necessario,
 )
-from modulos.otel import log, log_pausa, log_tracker
+from modulos.otel import gauge, log, log_pausa, log_tracker, span
 
 
 def forcar_start_checking(client, checking_torrents):
@@ -21,23 +21,25 @@ def forcar_start_checking(client, checking_torrents):
         return 0
     forcados = 0
     print(f"\n⚡ Force start em {len(checking_torrents)} torrents em checking...")
+    resultados = executar_em_lote(client, "force_start",
+                                  [t.hash for t in checking_torrents], enable=True)
     for t in checking_torrents:
-        try:
-            client.torrents_set_force_start(torrent_hashes=t.hash, enable=True)
+        erro = resultados.get(t.hash)
+        if erro is None:
             print(f"   ⚡ {t.name[:55]} [{t.state}]")
             forcados += 1
-            time.sleep(0.1)
-        except Exception as e:
-            print(f"   ❌ {t.name[:30]}: {e}")
+        else:
+            print(f"   ❌ {t.name[:30]}: {erro}")
     print(f"   ✅ {forcados} torrents com force start aplicado")
     log(f"Force start checking: {forcados} torrents", forcados=forcados)
     return forcados
 
 
+@span("pausa")
 def executar_pausa(client, conn, run_id, espacos, moving_count, moving_torrents,
-                   enviar_notificacao_fn):
+                   enviar_notificacao_fn, inventario):
     """Pausa downloads ativos quando disco esta critico"""
-    downloads_ativos      = obter_downloads_ativos(client)
+    downloads_ativos      = obter_downloads_ativos(inventario)
     torrents_pausados_ant = ler_torrents_pausados(conn)
 
     print(f"\n⚠️  DISCO CRÍTICO — pausando downloads")
@@ -46,20 +48,22 @@ def executar_pausa(client, conn, run_id, espacos, moving_count, moving_torrents,
             print(f"   🔴 {nome}: {d['livre']:.1f} GB (mín: {d['limite_min']} GB)")
 
     novos_pausados = []
+    discos         = {}
     if downloads_ativos:
         print(f"\n⏸️  Pausando {len(downloads_ativos)} downloads ativos...")
+        hashes = [t.hash for t in downloads_ativos]
+        executar_em_lote(client, "force_start", hashes, enable=False)
+        resultados = executar_em_lote(client, "pause", hashes)
         for t in downloads_ativos:
-            try:
-                try:
-                    client.torrents_set_force_start(torrent_hashes=t.hash, enable=False)
-                    time.sleep(0.1)
-                except:
-                    pass
-                client.torrents_pause(torrent_hashes=t.hash)
+            erro = resultados.get(t.hash)
+            if erro is None:
                 novos_pausados.append(t.hash)
+                discos[t.hash] = disco_do_caminho(
+                    getattr(t, 'save_path', '') or getattr(t, 'content_path', ''), espacos)
                 print(f"   ⏸️  {t.name[:55]}")
-            except Exception as e:
-                print(f"   ❌ {t.name[:30]}: {e}")
+            else:
+                print(f"   ❌ {t.name[:30]}: {erro}")
+        inventario.invalidar()
     else:
         print(f"   ℹ️  Nenhum download em forcedDL para pausar")
 
@@ -67,26 +71,23 @@ def executar_pausa(client, conn, run_id, espacos, moving_count, moving_torrents,
     discos_criticos = [n for n, d in espacos.items() if d["critico"]]
     registrar_pause_event(conn, run_id, 'pause', reason='disk_space',
                           espacos=espacos, hashes=todos_pausados,
-                          discos_criticos=discos_criticos)
+                          discos_criticos=discos_criticos, discos=discos)
 
     print(f"\n   Total pausados: {len(todos_pausados)} "
           f"(anteriores: {len(torrents_pausados_ant)}, novos: {len(novos_pausados)})")
 
-    log_pausa("pause", espacos, len(todos_pausados), discos_criticos)
+    log_pausa("pause", espacos, len(todos_pausados), discos_criticos,
+              novos=len(novos_pausados))
 
     if moving_count > 0:
         print(f"\n   🔍 Recheck em {moving_count} torrents MOVING...")
-        for t in moving_torrents:
-            try:
-                client.torrents_recheck(torrent_hashes=t.hash)
-                time.sleep(0.1)
-            except:
-                pass
+        executar_em_lote(client, "recheck", [t.hash for t in moving_torrents])
 
     notificar_se_necessario(conn, run_id, 'paused', enviar_notificacao_fn)
 
 
-def executar_restauracao(client, conn, run_id, espacos, enviar_notificacao_fn):
+@span("restauracao")
+def executar_restauracao(client, conn, run_id, espacos, enviar_notificacao_fn, inventario):
     """Restaura downloads pausados quando condicoes normalizam"""
     torrents_pausados = ler_torrents_pausados(conn)
     if not torrents_pausados:
@@ -95,24 +96,31 @@ def executar_restauracao(client, conn, run_id, espacos, enviar_notificacao_fn):
     print(f"\n✅ Condições normalizadas — restaurando {len(torrents_pausados)} downloads...")
     restored = failed = 0
 
+    existentes = []
     for h in torrents_pausados:
-        try:
-            info = client.torrents_info(torrent_hashes=h)
-            if not info:
-                failed += 1
-                continue
-            client.torrents_resume(torrent_hashes=h)
-            time.sleep(0.1)
-            try:
-                client.torrents_set_force_start(torrent_hashes=h, enable=True)
-                print(f"   ▶️  {info[0].name[:55]} [FORCE]")
-            except:
-                print(f"   ▶️  {info[0].name[:55]}")
-            restored += 1
-        except Exception as e:
-            print(f"   ❌ {h[:16]}: {e}")
+        info = inventario.por_hash(h)
+        if not info:
             failed += 1
+            continue
+        existentes.append(info)
 
+    res_resume = executar_em_lote(client, "resume", [t.hash for t in existentes])
+    retomados  = [t for t in existentes if res_resume.get(t.hash) is None]
+    res_force  = executar_em_lote(client, "force_start", [t.hash for t in retomados], enable=True)
+
+    for t in existentes:
+        erro = res_resume.get(t.hash)
+        if erro is not None:
+            print(f"   ❌ {t.hash[:16]}: {erro}")
+            failed += 1
+            continue
+        if res_force.get(t.hash) is None:
+            print(f"   ▶️  {t.name[:55]} [FORCE]")
+        else:
+            print(f"   ▶️  {t.name[:55]}")
+        restored += 1
+
+    inventario.invalidar()
     registrar_pause_event(conn, run_id, 'restore', espacos=espacos, hashes=torrents_pausados)
 
     print(f"\n   ✅ Restaurados: {restored}" + (f"  ❌ Falhas: {failed}" if failed else ""))
@@ -120,21 +128,14 @@ def executar_restauracao(client, conn, run_id, espacos, enviar_notificacao_fn):
     notificar_se_necessario(conn, run_id, 'restored', enviar_notificacao_fn)
 
 
-def analisar_torrents_por_tracker(client):
+def analisar_torrents_por_tracker(inventario):
     """Classifica torrents por tracker e estado"""
     tracker_analise = defaultdict(lambda: {
         'downloading_ativo': [], 'downloading_fila': [],
         'paused': [], 'seeding': [], 'outros': []
     })
-    for t in client.torrents_info():
-        tracker_principal = "no_tracker"
-        try:
-            for tr in client.torrents_trackers(t.hash):
-                if tr.url and not tr.url.startswith('**'):
-                    tracker_principal = extrair_dominio_tracker(tr.url)
-                    break
-        except:
-            pass
+    for t in inventario.todos():
+        tracker_principal = inventario.tracker_principal(t.hash, "no_tracker")
 
         info    = {
             'nome':        t.name[:50] + ('...' if len(t.name) > 50 else ''),
@@ -162,20 +163,24 @@ def analisar_torrents_por_tracker(client):
     return dict(tracker_analise)
 
 
-def gerenciar_trackers(client, min_downloads, min_torrents):
+@span("trackers")
+def gerenciar_trackers(client, min_downloads, min_torrents, inventario):
     """Garante minimo de downloads ativos por tracker"""
     print("\n" + "=" * 70)
     print("🎯 Gerenciamento de Trackers")
     print("=" * 70)
 
     total_forcados = total_ativados = 0
+    plano = []
 
-    for tracker, dados in sorted(analisar_torrents_por_tracker(client).items()):
+    for tracker, dados in sorted(analisar_torrents_por_tracker(inventario).items()):
         ativo_count  = len(dados['downloading_ativo'])
         fila_count   = len(dados['downloading_fila'])
         paused_count = len(dados['paused'])
         total_count  = (ativo_count + fila_count + paused_count +
                         len(dados['seeding']) + len(dados['outros']))
+        for classe, lista in dados.items():
+            gauge("qbit.tracker.torrents", len(lista), tracker=tracker, classe=classe)
 
         print(f"\n🌐 {tracker}:")
         print(f"  📥 Ativo: {ativo_count}  ⏳ Fila: {fila_count}  "
@@ -195,39 +200,51 @@ def gerenciar_trackers(client, min_downloads, min_torrents):
         necessarios = min_downloads - ativo_count
         print(f"  🎯 PRECISA: +{necessarios}")
 
+        forcar = dados['downloading_fila'][:necessarios]
+        ativar = dados['paused'][:max(0, necessarios - len(forcar))]
+        plano.append((tracker, ativo_count, fila_count, forcar, ativar))
+
+    # Aplicar as acoes de todos os trackers em poucas chamadas
+    hashes_forcar = [i['hash'] for _, _, _, forcar, _ in plano for i in forcar]
+    hashes_ativar = [i['hash'] for _, _, _, _, ativar in plano for i in ativar]
+    res_forcar = executar_em_lote(client, "force_start", hashes_forcar, enable=True)
+    res_ativar = executar_em_lote(client, "resume", hashes_ativar)
+    res_force_ativados = executar_em_lote(
+        client, "force_start",
+        [h for h in hashes_ativar if res_ativar.get(h) is None], enable=True)
+
+    for tracker, ativo_count, fila_count, forcar, ativar in plano:
+        if forcar or ativar:
+            print(f"\n🌐 {tracker}:")
         forcados_tracker = ativados_tracker = 0
 
-        for info in dados['downloading_fila'][:necessarios]:
-            try:
-                client.torrents_set_force_start(torrent_hashes=info['hash'], enable=True)
+        for info in forcar:
+            erro = res_forcar.get(info['hash'])
+            if erro is None:
                 print(f"    ▶️  FORCE: {info['nome']}")
                 total_forcados   += 1
                 forcados_tracker += 1
-                necessarios      -= 1
-            except Exception as e:
-                print(f"    ❌ {e}")
-            if necessarios <= 0:
-                break
-
-        for info in dados['paused'][:necessarios]:
-            try:
-                client.torrents_resume(torrent_hashes=info['hash'])
-                try:
-                    client.torrents_set_force_start(torrent_hashes=info['hash'], enable=True)
-                    print(f"    ▶️  ATIVAR+FORCE: {info['nome']}")
-                except:
-                    print(f"    ▶️  ATIVAR: {info['nome']}")
-                total_ativados   += 1
-                ativados_tracker += 1
-                necessarios      -= 1
-            except Exception as e:
-                print(f"    ❌ {e}")
-            if necessarios <= 0:
-                break
+            else:
+                print(f"    ❌ {erro}")
+
+        for info in ativar:
+            erro = res_ativar.get(info['hash'])
+            if erro is not None:
+                print(f"    ❌ {erro}")
+                continue
+            if res_force_ativados.get(info['hash']) is None:
+                print(f"    ▶️  ATIVAR+FORCE: {info['nome']}")
+            else:
+                print(f"    ▶️  ATIVAR: {info['nome']}")
+            total_ativados   += 1
+            ativados_tracker += 1
 
         if forcados_tracker or ativados_tracker:
             log_tracker(tracker, ativo_count, fila_count,
                         forcados_tracker, ativados_tracker)
 
+    if total_forcados or total_ativados:
+        inventario.invalidar()
+
     print(f"\n📊 Trackers — Forçados: {total_forcados}  Ativados: {total_ativados}")
     return total_forcados, total_ativados
@@ -5,6 +5,12 @@
 #   1. Se precisa chamar limpeza (seed cleaner)
 #   2. Se precisa pausar ou restaurar downloads (ativacao)
 #   3. Se pode gerenciar trackers normalmente
+#
+# Alem do estado atual, a previsao de enchimento (modulos/previsao.py) permite
+# agir antes do disco ficar critico: seed cleaner preventivo nos discos com
+# seed_cleaner e ativacao de trackers suspensa enquanto o risco persistir.
+
+import json
 
 from modulos.db import (
     ler_ultimo_estado,
@@ -14,6 +20,7 @@ from modulos.db import (
     ler_torrents_pausados,
     ler_motivo_pausa,
     registrar_pause_event,
+    confirmar,
 )
 from modulos.helpers import (
     verificar_espacos,
@@ -22,24 +29,55 @@ from modulos.helpers import (
     construir_tracker_map,
     notificar_se_necessario,
 )
+from modulos.inventario import InventarioTorrents
+from modulos.previsao import (
+    prever_discos,
+    downloads_por_disco,
+    discos_em_risco,
+    imprimir_previsoes,
+    formatar_eta,
+)
 from modulos.limpeza import executar_seed_cleaner
+from modulos.elegibilidade import atualizar_elegibilidade
 from modulos.ativacao import (
     forcar_start_checking,
     executar_pausa,
     executar_restauracao,
     gerenciar_trackers,
 )
-from modulos.otel import log, log_disco, log_run
+from modulos.otel import gauge, log, log_disco, log_run, span
 
 
 def executar_checagem(client, conn, paths_config, tracker_rules,
                       seed_cleaner_dry_run, min_downloads_per_tracker,
-                      min_torrents_per_tracker, enviar_notificacao_fn):
+                      min_torrents_per_tracker, enviar_notificacao_fn,
+                      tracker_cache_ttl_horas=None, espelho=None,
+                      cache_trackers=None, previsao_janela_horas=6,
+                      previsao_horizonte_minutos=0, seed_cleaner_alvo=True,
+                      seed_cleaner_prazo_segundos=300):
     """
     Fluxo principal de checagem de disco.
 
+    A lista de torrents e buscada uma unica vez (InventarioTorrents) e
+    compartilhada entre snapshot, seed cleaner, pausa e trackers. Os
+    trackers de cada torrent vem do cache tracker_cache (SQLite). Com um
+    EspelhoTorrents, a busca e o delta do sync/maindata sobre o espelho local.
+    No modo daemon o espelho e o cache de trackers sao reaproveitados entre
+    ciclos (parametros espelho e cache_trackers).
+
+    As escritas de cada PASSO sao confirmadas (confirmar) antes do proximo:
+    o run segue dentro de transacao(conn), mas a trava de escrita do SQLite
+    nunca fica presa durante chamadas ao qBittorrent.
+
+    Com previsao_horizonte_minutos > 0, discos que devem cruzar limite_min
+    dentro do horizonte disparam o seed cleaner antes de ficarem criticos
+    e suspendem a ativacao de trackers.
+
     Retorna o run_id criado.
     """
+    inventario = InventarioTorrents(client, conn, tracker_cache_ttl_horas, espelho,
+                                    cache_trackers)
+
     # ------------------------------------------------------------------
     # PASSO 1: Ler ultimo estado do banco
     # ------------------------------------------------------------------
@@ -55,21 +93,25 @@ def executar_checagem(client, conn, paths_config, tracker_rules,
     # ------------------------------------------------------------------
     # PASSO 2: Coletar estado atual
     # ------------------------------------------------------------------
-    print(f"\n📊 Estado atual:")
-    espacos = verificar_espacos(paths_config)
-    imprimir_espacos(espacos)
-    log_disco(espacos)
-
-    checking_count, moving_count, checking_torrents, moving_torrents = \
-        obter_contagem_checking_moving(client)
-    checking_moving_total = checking_count + moving_count
-    print(f"\n   🔍 Checking: {checking_count}  🔄 Moving: {moving_count}  📦 Total: {checking_moving_total}")
-
-    qualquer_critico     = any(d["critico"] and d["pause_trigger"] for d in espacos.values())
-    todos_ok             = all(d["ok"] for d in espacos.values() if d["pause_trigger"])
-    checking_moving_zero = checking_moving_total == 0
-    critico_seed_cleaner = any(d["critico"] and d["seed_cleaner"] for d in espacos.values())
-    pode_restaurar       = todos_ok and checking_moving_zero
+    with span("disco") as fase:
+        print(f"\n📊 Estado atual:")
+        espacos = verificar_espacos(paths_config)
+        imprimir_espacos(espacos)
+        log_disco(espacos)
+
+        checking_count, moving_count, checking_torrents, moving_torrents = \
+            obter_contagem_checking_moving(inventario)
+        checking_moving_total = checking_count + moving_count
+        print(f"\n   🔍 Checking: {checking_count}  🔄 Moving: {moving_count}  📦 Total: {checking_moving_total}")
+        fase["attrs"]["checking_moving"] = checking_moving_total
+        gauge("qbit.torrents.checking", checking_count)
+        gauge("qbit.torrents.moving",   moving_count)
+
+        qualquer_critico     = any(d["critico"] and d["pause_trigger"] for d in espacos.values())
+        todos_ok             = all(d["ok"] for d in espacos.values() if d["pause_trigger"])
+        checking_moving_zero = checking_moving_total == 0
+        critico_seed_cleaner = any(d["critico"] and d["seed_cleaner"] for d in espacos.values())
+        pode_restaurar       = todos_ok and checking_moving_zero
 
     # ------------------------------------------------------------------
     # PASSO 3: Criar registro do run
@@ -77,15 +119,45 @@ def executar_checagem(client, conn, paths_config, tracker_rules,
     run_status = 'paused' if (tinha_pausados or qualquer_critico) else 'active'
     run_id     = criar_run(conn, run_status, checking_count, moving_count,
                            espacos, len(ultimo_estado["torrents_pausados"]))
+    confirmar(conn)
+
+    # ------------------------------------------------------------------
+    # PASSO 3b: Previsao de enchimento dos discos
+    # ------------------------------------------------------------------
+    with span("previsao"):
+        print(f"\n📈 Previsão ({previsao_janela_horas}h de histórico):")
+        previsoes = prever_discos(conn, espacos, previsao_janela_horas,
+                                  downloads_por_disco(inventario, espacos))
+        imprimir_previsoes(espacos, previsoes)
+        em_risco = discos_em_risco(espacos, previsoes, previsao_horizonte_minutos)
+        for nome in em_risco:
+            print(f"   ⚠️  {nome} deve atingir o limite mínimo em "
+                  f"{formatar_eta(previsoes[nome]['eta_horas'])}")
+            log(f"Previsão: {nome} atinge limite_min em {formatar_eta(previsoes[nome]['eta_horas'])}",
+                level="warn", disco=nome, eta_horas=previsoes[nome]["eta_horas"],
+                taxa_gbh=previsoes[nome]["taxa_gbh"])
 
     # ------------------------------------------------------------------
     # PASSO 4: Snapshot de torrents
     # ------------------------------------------------------------------
-    print(f"\n📸 Salvando snapshot...")
-    todos_torrents = client.torrents_info()
-    tracker_map    = construir_tracker_map(client, todos_torrents)
-    count = salvar_snapshots(conn, run_id, todos_torrents, tracker_map)
-    print(f"   💾 {count} torrents salvos no banco")
+    with span("snapshot") as fase:
+        print(f"\n📸 Salvando snapshot...")
+        todos_torrents = inventario.todos()
+        tracker_map    = construir_tracker_map(inventario)
+        count = salvar_snapshots(conn, run_id, todos_torrents, tracker_map)
+        print(f"   💾 {len(todos_torrents)} torrents — {count} mudança(s) gravada(s) no banco")
+        fase["attrs"].update(torrents=len(todos_torrents), mudancas=count)
+    confirmar(conn)
+
+    # ------------------------------------------------------------------
+    # PASSO 4b: Indice de elegibilidade do seed cleaner (incremental)
+    # ------------------------------------------------------------------
+    if tracker_rules and any(d["seed_cleaner"] for d in espacos.values()):
+        with span("elegibilidade"):
+            elegibilidade = atualizar_elegibilidade(conn, inventario, tracker_rules)
+        confirmar(conn)
+        print(f"   🌱 Elegibilidade: {elegibilidade['torrents']} torrents "
+              f"({elegibilidade['alterados']} atualizados, {elegibilidade['removidos']} removidos)")
 
     # ------------------------------------------------------------------
     # PASSO 5: Logica principal baseada no estado anterior
@@ -95,11 +167,16 @@ def executar_checagem(client, conn, paths_config, tracker_rules,
     total_forcados         = 0
     total_ativados         = 0
     pode_gerenciar_trackers = False
+    limitar_trackers        = False
 
     if tinha_pausados:
         # ── Havia torrents pausados: verificar se pode restaurar ──
         print(f"\n🔄 Sistema estava pausado — verificando condições para restaurar...")
 
+        # Pausados que ainda existem no qBittorrent (a espera grava so a diferenca)
+        pausados_presentes = {h for h in ultimo_estado["torrents_pausados"]
+                              if inventario.por_hash(h) is not None}
+
         discos_criticos_registro = ultimo_estado["discos_criticos"]
 
         if discos_criticos_registro is None:
@@ -107,11 +184,12 @@ def executar_checagem(client, conn, paths_config, tracker_rules,
             notificar_se_necessario(conn, run_id, 'waiting_paused', enviar_notificacao_fn)
             registrar_pause_event(conn, run_id, 'waiting',
                                   espacos=espacos,
-                                  hashes=ultimo_estado["torrents_pausados"])
+                                  hashes=pausados_presentes)
             forcados_checking = forcar_start_checking(client, checking_torrents)
 
         elif pode_restaurar:
-            executar_restauracao(client, conn, run_id, espacos, enviar_notificacao_fn)
+            executar_restauracao(client, conn, run_id, espacos, enviar_notificacao_fn,
+                                 inventario)
             forcados_checking       = forcar_start_checking(client, checking_torrents)
             pode_gerenciar_trackers = True
 
@@ -137,7 +215,8 @@ def executar_checagem(client, conn, paths_config, tracker_rules,
                 # p2p ainda critico — seed cleaner pode ajudar
                 print(f"\n   💡 Pausa causada pelo p2p — tentando seed cleaner...")
                 seeding_deletados = executar_seed_cleaner(
-                    client, conn, run_id, espacos, tracker_rules, seed_cleaner_dry_run)
+                    client, conn, run_id, espacos, tracker_rules, seed_cleaner_dry_run,
+                    inventario, seed_cleaner_alvo, seed_cleaner_prazo_segundos)
 
                 if seeding_deletados > 0 and not seed_cleaner_dry_run:
                     print(f"\n🔄 Reavaliando espaço após seed cleaner...")
@@ -149,20 +228,21 @@ def executar_checagem(client, conn, paths_config, tracker_rules,
                     pode_restaurar       = todos_ok and checking_moving_zero
 
                     if pode_restaurar:
-                        executar_restauracao(client, conn, run_id, espacos, enviar_notificacao_fn)
+                        executar_restauracao(client, conn, run_id, espacos,
+                                             enviar_notificacao_fn, inventario)
                         forcados_checking       = forcar_start_checking(client, checking_torrents)
                         pode_gerenciar_trackers = True
                     else:
                         print(f"   ⚠️  Espaço ainda insuficiente — mantendo pausa")
                         registrar_pause_event(conn, run_id, 'waiting',
                                               espacos=espacos,
-                                              hashes=ultimo_estado["torrents_pausados"],
+                                              hashes=pausados_presentes,
                                               discos_criticos=discos_criticos_registro)
                         notificar_se_necessario(conn, run_id, 'waiting_paused', enviar_notificacao_fn)
                 else:
                     registrar_pause_event(conn, run_id, 'waiting',
                                           espacos=espacos,
-                                          hashes=ultimo_estado["torrents_pausados"],
+                                          hashes=pausados_presentes,
                                           discos_criticos=discos_criticos_registro)
                     notificar_se_necessario(conn, run_id, 'waiting_paused', enviar_notificacao_fn)
 
@@ -173,7 +253,7 @@ def executar_checagem(client, conn, paths_config, tracker_rules,
                       f"— aguardando Radarr/Sonarr liberar espaço...")
                 registrar_pause_event(conn, run_id, 'waiting',
                                       espacos=espacos,
-                                      hashes=ultimo_estado["torrents_pausados"],
+                                      hashes=pausados_presentes,
                                       discos_criticos=discos_criticos_registro)
                 notificar_se_necessario(conn, run_id, 'waiting_paused', enviar_notificacao_fn)
 
@@ -186,7 +266,7 @@ def executar_checagem(client, conn, paths_config, tracker_rules,
                     print(f"\n   ⏳ Condições ainda não satisfeitas — aguardando...")
                 registrar_pause_event(conn, run_id, 'waiting',
                                       espacos=espacos,
-                                      hashes=ultimo_estado["torrents_pausados"],
+                                      hashes=pausados_presentes,
                                       discos_criticos=discos_criticos_registro)
                 notificar_se_necessario(conn, run_id, 'waiting_paused', enviar_notificacao_fn)
 
@@ -196,7 +276,8 @@ def executar_checagem(client, conn, paths_config, tracker_rules,
         # ── Sem pausados: fluxo normal ──
         if qualquer_critico:
             seeding_deletados = executar_seed_cleaner(
-                client, conn, run_id, espacos, tracker_rules, seed_cleaner_dry_run)
+                client, conn, run_id, espacos, tracker_rules, seed_cleaner_dry_run,
+                inventario, seed_cleaner_alvo, seed_cleaner_prazo_segundos)
 
             if seeding_deletados > 0 and not seed_cleaner_dry_run:
                 print(f"\n🔄 Reavaliando espaço após seed cleaner...")
@@ -208,7 +289,7 @@ def executar_checagem(client, conn, paths_config, tracker_rules,
             if qualquer_critico:
                 forcados_checking = forcar_start_checking(client, checking_torrents)
                 executar_pausa(client, conn, run_id, espacos, moving_count,
-                               moving_torrents, enviar_notificacao_fn)
+                               moving_torrents, enviar_notificacao_fn, inventario)
             else:
                 print(f"\n✅ Disco normalizado após seed cleaner — sistema ativo")
                 forcados_checking       = forcar_start_checking(client, checking_torrents)
@@ -218,30 +299,63 @@ def executar_checagem(client, conn, paths_config, tracker_rules,
             forcados_checking       = forcar_start_checking(client, checking_torrents)
             pode_gerenciar_trackers = True
 
+            if em_risco:
+                # ── Acao preventiva: disco vai ficar critico dentro do horizonte ──
+                risco_seed_cleaner = [n for n in em_risco if espacos[n]["seed_cleaner"]]
+                if risco_seed_cleaner:
+                    print(f"\n   💡 Seed cleaner preventivo: {', '.join(risco_seed_cleaner)}")
+                    espacos_forcar = {nome: dict(d) for nome, d in espacos.items()}
+                    for nome in risco_seed_cleaner:
+                        espacos_forcar[nome]["critico"] = True
+                    seeding_deletados = executar_seed_cleaner(
+                        client, conn, run_id, espacos_forcar, tracker_rules,
+                        seed_cleaner_dry_run, inventario, seed_cleaner_alvo,
+                        seed_cleaner_prazo_segundos)
+
+                    if seeding_deletados > 0 and not seed_cleaner_dry_run:
+                        print(f"\n🔄 Reavaliando espaço após seed cleaner...")
+                        espacos = verificar_espacos(paths_config)
+                        imprimir_espacos(espacos)
+                        log_disco(espacos)
+                        em_risco = [n for n in em_risco
+                                    if espacos[n]["livre"] - espacos[n]["limite_min"]
+                                    <= previsoes[n]["taxa_gbh"] * previsao_horizonte_minutos / 60]
+
+                limitar_trackers = any(espacos[n]["pause_trigger"] for n in em_risco)
+
     # ------------------------------------------------------------------
     # PASSO 6: Gerenciar trackers
     # ------------------------------------------------------------------
-    if pode_gerenciar_trackers:
+    if pode_gerenciar_trackers and limitar_trackers:
+        print(f"\n⏭️  Gerenciamento de trackers SUSPENSO — previsão de disco crítico "
+              f"({', '.join(em_risco)})")
+    elif pode_gerenciar_trackers:
         total_forcados, total_ativados = gerenciar_trackers(
-            client, min_downloads_per_tracker, min_torrents_per_tracker)
+            client, min_downloads_per_tracker, min_torrents_per_tracker, inventario)
     else:
         print(f"\n⏭️  Gerenciamento de trackers PAUSADO")
 
     # ------------------------------------------------------------------
     # PASSO 7: Fechar run
     # ------------------------------------------------------------------
-    atualizar_run(conn, run_id,
-                  status=           'active' if pode_gerenciar_trackers else 'paused',
-                  forcados_checking=forcados_checking,
-                  tracker_forcados= total_forcados,
-                  tracker_ativados= total_ativados,
-                  seeding_deletados=seeding_deletados,
-                  paused_count=     len(ler_torrents_pausados(conn)))
+    with span("fechar_run"):
+        inventario.persistir_trackers()
+        pausados_final = ler_torrents_pausados(conn)
+        atualizar_run(conn, run_id,
+                      status=           'active' if pode_gerenciar_trackers else 'paused',
+                      forcados_checking=forcados_checking,
+                      tracker_forcados= total_forcados,
+                      tracker_ativados= total_ativados,
+                      seeding_deletados=seeding_deletados,
+                      paused_count=     len(pausados_final),
+                      api_fetches=      inventario.fetches,
+                      api_fetches_evitados=inventario.fetches_evitados,
+                      tracker_fetches=  inventario.tracker_fetches,
+                      previsao=         json.dumps(previsoes))
 
     # Resumo
     print("\n" + "=" * 70)
     print("📊 RESUMO FINAL:")
-    pausados_final = ler_torrents_pausados(conn)
     if pausados_final:
         print(f"🛑 Sistema PAUSADO ({len(pausados_final)} torrents)")
         motivos = ler_motivo_pausa(conn)
@@ -255,8 +369,17 @@ def executar_checagem(client, conn, paths_config, tracker_rules,
         print(f"⚡ Force start checking: {forcados_checking}")
     if seeding_deletados:
         print(f"🗑️  Seed cleaner: {seeding_deletados} {'(DRY RUN)' if seed_cleaner_dry_run else 'deletados'}")
+    if em_risco:
+        etas = [f"{n} em {formatar_eta(previsoes[n]['eta_horas'])}" for n in em_risco]
+        print(f"📈 Previsão de disco crítico: {', '.join(etas)}")
     if total_forcados or total_ativados:
         print(f"🎯 Trackers — Forçados: {total_forcados}  Ativados: {total_ativados}")
+    print(f"📡 Buscas de torrents: {inventario.fetches} "
+          f"(evitadas: {inventario.fetches_evitados})  "
+          f"torrents_trackers: {inventario.tracker_fetches}  "
+          f"torrents_files: {inventario.files_fetches}")
+    if inventario.espelho is not None:
+        print(f"🔁 sync/maindata: {inventario.sync_alterados} torrent(s) alterado(s)")
 
     print(f"\n🗄️  Run #{run_id}")
 
@@ -268,6 +391,8 @@ def executar_checagem(client, conn, paths_config, tracker_rules,
         "tracker_forcados": total_forcados,
         "tracker_ativados": total_ativados,
         "pausados": len(pausados_final),
+        "discos_em_risco": len(em_risco),
+        **inventario.resumo(),
     })
 
     return run_id
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# modulos/compactacao.py — Retencao, agregados e compactacao do banco
+#
+# Sem limpeza o banco cresce a cada run (log de mudancas, runs, eventos) e as
+# consultas ficam mais lentas mes a mes. A compactacao, em ordem:
+#
+#   1. agrega os snapshots dos runs mais antigos que RETENCAO_SNAPSHOTS_DIAS
+#      em snapshot_rollups por hora (tracker + state) e, com os dias completos,
+#      por dia
+#   2. apaga o log de mudancas / snapshots desses runs, mantendo a ultima
+#      mudanca de cada torrent (a view continua exata para os runs retidos)
+#   3. apaga agregados horarios apos RETENCAO_HORARIO_DIAS (os diarios ficam)
+#   4. apaga runs, eventos 'waiting', notificacoes e auth_events apos
+#      RETENCAO_RUNS_DIAS e esvazia a lista de hashes das pausas antigas
+#   5. PRAGMA incremental_vacuum devolve as paginas livres ao disco
+#
+# Tudo em lotes de COMPACTAR_LOTE linhas, cada um com seu commit, e com um
+# prazo opcional: a execucao automatica (nas COMPACTAR_HORAS, apos o run)
+# para no prazo e continua no proximo ciclo. --compact roda ate o fim.
+
+import time
+from datetime import datetime, timedelta
+
+from modulos.db import (
+    runs_para_agregar,
+    agregar_runs,
+    agregar_dias,
+    primeiro_run_desde,
+    apagar_snapshots_antigos,
+    apagar_torrents_removidos,
+    apagar_rollups_horarios,
+    apagar_runs_antigos,
+    compactar_pause_events,
+    apagar_eventos_antigos,
+    auto_vacuum_incremental,
+    converter_auto_vacuum,
+    vacuum_incremental,
+    registrar_compactacao,
+    ultima_compactacao_completa,
+)
+from modulos.otel import log
+
+# Runs agregados por lote (o log de mudancas e reproduzido a cada lote)
+RUNS_POR_LOTE = 100
+
+# Paginas devolvidas por chamada do incremental_vacuum
+PAGINAS_POR_LOTE = 2000
+
+# Intervalo minimo entre compactacoes automaticas completas
+INTERVALO_AUTOMATICO = timedelta(hours=20)
+
+
+def compactacao_devida(conn, horas):
+    """True se agora esta numa das horas configuradas e a ultima completa e antiga."""
+    agora = datetime.now()
+    if agora.hour not in (horas or []):
+        return False
+    ultima = ultima_compactacao_completa(conn)
+    return ultima is None or agora - ultima >= INTERVALO_AUTOMATICO
+
+
+def compactar(conn, retencao_snapshots_dias=14, retencao_horario_dias=90,
+              retencao_runs_dias=90, lote=5000, prazo_segundos=None,
+              converter_vacuum=False):
+    """
+    Executa a compactacao em lotes. Retorna o resumo
+    {"runs_agregados", "dias_agregados", "snapshots", "runs", "eventos",
+     "completo", "segundos"}.
+
+    prazo_segundos: interrompe entre lotes ao estourar (None = sem prazo).
+    converter_vacuum: liga auto_vacuum=INCREMENTAL em bancos antigos com um
+    VACUUM completo (so no --compact manual — bloqueia o banco).
+    """
+    inicio_dt = datetime.now()
+    inicio    = time.monotonic()
+    retencao_runs_dias = max(retencao_runs_dias, retencao_snapshots_dias + 1)
+    corte_snapshots = inicio_dt - timedelta(days=retencao_snapshots_dias)
+    corte_horario   = inicio_dt - timedelta(days=retencao_horario_dias)
+    corte_runs      = inicio_dt - timedelta(days=retencao_runs_dias)
+
+    resumo = {"runs_agregados": 0, "dias_agregados": 0, "snapshots": 0,
+              "runs": 0, "eventos": 0, "completo": False}
+
+    def _esgotado():
+        return prazo_segundos is not None and time.monotonic() - inicio >= prazo_segundos
+
+    def _repetir(funcao, *args):
+        """Chama funcao(conn, *args, lote) ate nao sobrar nada; False se o prazo acabou."""
+        total = 0
+        while True:
+            n = funcao(conn, *args, lote)
+            total += n
+            if n == 0:
+                return total, True
+            if _esgotado():
+                return total, False
+
+    def _concluir(completo):
+        resumo["completo"] = completo
+        resumo["segundos"] = round(time.monotonic() - inicio, 1)
+        registrar_compactacao(conn, inicio_dt, completo, resumo)
+        log("Compactação do banco", level="info", **resumo)
+        return resumo
+
+    # 1. Agregados por hora e por dia
+    print(f"   📊 Agregando snapshots anteriores a {corte_snapshots:%Y-%m-%d %H:%M}...")
+    while True:
+        runs = runs_para_agregar(conn, corte_snapshots, RUNS_POR_LOTE)
+        if not runs:
+            break
+        agregar_runs(conn, runs)
+        resumo["runs_agregados"] += len(runs)
+        if _esgotado():
+            return _concluir(False)
+    resumo["dias_agregados"] = agregar_dias(conn, corte_snapshots.date().isoformat())
+
+    # 2. Log de mudancas / snapshots antigos (a ultima mudanca de cada torrent fica)
+    limite_run = primeiro_run_desde(conn, corte_snapshots)
+    if limite_run is not None:
+        n, ok = _repetir(apagar_snapshots_antigos, limite_run)
+        resumo["snapshots"] += n
+        if not ok:
+            return _concluir(False)
+        n, ok = _repetir(apagar_torrents_removidos)
+        if not ok:
+            return _concluir(False)
+
+    # 3. Agregados horarios antigos
+    n, ok = _repetir(apagar_rollups_horarios, corte_horario)
+    if not ok:
+        return _concluir(False)
+
+    # 4. Runs e eventos
+    for funcao, chave in ((apagar_runs_antigos, "runs"),
+                          (compactar_pause_events, "eventos"),
+                          (apagar_eventos_antigos, "eventos")):
+        n, ok = _repetir(funcao, corte_runs)
+        resumo[chave] += n
+        if not ok:
+            return _concluir(False)
+
+    # 5. Devolver paginas livres
+    if not auto_vacuum_incremental(conn) and converter_vacuum:
+        print("   🧹 Convertendo o banco para auto_vacuum=INCREMENTAL (VACUUM completo)...")
+        converter_auto_vacuum(conn)
+    if auto_vacuum_incremental(conn):
+        while vacuum_incremental(conn, PAGINAS_POR_LOTE) > 0:
+            if _esgotado():
+                return _concluir(False)
+    else:
+        print("   ℹ️  auto_vacuum desligado neste banco — rode --compact para converter")
+
+    return _concluir(True)
+
+
+def imprimir_resumo(resumo):
+    print(f"   📊 Runs agregados: {resumo['runs_agregados']} "
+          f"(dias novos: {resumo['dias_agregados']})")
+    print(f"   🗑️  Removidos — snapshots: {resumo['snapshots']}  runs: {resumo['runs']}  "
+          f"eventos: {resumo['eventos']}")
+    status = "✅ concluída" if resumo["completo"] else "⏸️  prazo esgotado — continua na próxima"
+    print(f"   {status} em {resumo['segundos']}s")
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# modulos/conteudo.py — Espaco realmente recuperavel ao apagar torrents
+#
+# O disco p2p costuma ter hardlinks para a biblioteca do Radarr/Sonarr: apagar
+# um torrent cujos arquivos tem st_nlink > 1 nao libera nada naquele
+# filesystem. Aqui os arquivos de cada content_path sao examinados (stat) e o
+# espaco so conta como recuperavel quando TODOS os links de um inode estao
+# dentro do conjunto que sera apagado.
+#
+#   - inode pertence ao disco cujo path tem o mesmo st_dev
+#   - tamanho = blocos alocados (st_blocks * 512), nao o tamanho logico
+#   - content_path inexistente (ex.: qBittorrent em container com outro
+#     caminho) → usa o size informado pelo qBittorrent
+#
+# A lista de arquivos fica na tabela content_scan, chaveada pelo inode e mtime
+# da raiz; os link counts sao revalidados depois de CONTEUDO_CACHE_TTL_HORAS.
+#
+# Configuracao no config.py:
+#   CONTEUDO_CACHE_TTL_HORAS = 6
+
+import os
+import stat
+from datetime import datetime, timedelta
+
+from modulos.db import ler_content_scan, salvar_content_scan, remover_content_scan
+
+# Config — sobrescrito por configurar_conteudo()
+_config = {
+    "ttl_horas": 6,
+}
+
+
+def configurar_conteudo(ttl_horas=None):
+    if ttl_horas is not None:
+        _config["ttl_horas"] = ttl_horas
+
+
+def _listar_arquivos(raiz, st_raiz):
+    """[[caminho, dev, inode, nlink, bytes_alocados]] dos arquivos regulares."""
+    def _entrada(caminho, st):
+        alocado = getattr(st, "st_blocks", None)
+        tamanho = alocado * 512 if alocado is not None else st.st_size
+        return [caminho, st.st_dev, st.st_ino, st.st_nlink, tamanho]
+
+    if stat.S_ISREG(st_raiz.st_mode):
+        return [_entrada(raiz, st_raiz)]
+
+    arquivos = []
+    for pasta, _, nomes in os.walk(raiz):
+        for nome in nomes:
+            caminho = os.path.join(pasta, nome)
+            try:
+                st = os.lstat(caminho)
+            except OSError:
+                continue
+            if stat.S_ISREG(st.st_mode):
+                arquivos.append(_entrada(caminho, st))
+    return arquivos
+
+
+class AnalisadorConteudo:
+    """
+    Calcula o espaco recuperavel de um conjunto de torrents.
+
+    Uso:
+        analisador = AnalisadorConteudo(conn, espacos)
+        total, por_disco, escaneado = analisador.recuperavel(torrents)
+        analisador.persistir()
+
+    torrents: dicts com "hash", "content_path", "size" e "disco".
+    """
+
+    def __init__(self, conn, espacos, ttl_horas=None):
+        self.conn      = conn
+        self.ttl       = timedelta(hours=_config["ttl_horas"] if ttl_horas is None else ttl_horas)
+        self.discos    = {}     # st_dev -> nome do disco
+        for nome, d in espacos.items():
+            for p in d["paths"]:
+                try:
+                    self.discos.setdefault(os.stat(p).st_dev, nome)
+                except OSError:
+                    pass
+        self._arquivos = {}     # content_path -> lista de arquivos (ou None)
+        self._novos    = {}
+        self.escaneados = 0
+        self.do_cache   = 0
+
+    def arquivos(self, content_path):
+        if content_path in self._arquivos:
+            return self._arquivos[content_path]
+        try:
+            st = os.stat(content_path)
+        except (OSError, TypeError, ValueError):
+            self._arquivos[content_path] = None
+            return None
+
+        cache = ler_content_scan(self.conn, content_path) if self.conn is not None else None
+        if (cache and cache["root_ino"] == st.st_ino and cache["root_mtime"] == st.st_mtime
+                and datetime.now() - cache["scanned_at"] <= self.ttl):
+            arquivos = cache["arquivos"]
+            self.do_cache += 1
+        else:
+            arquivos = _listar_arquivos(content_path, st)
+            self._novos[content_path] = {
+                "root_ino":   st.st_ino,
+                "root_mtime": st.st_mtime,
+                "scanned_at": datetime.now(),
+                "arquivos":   arquivos,
+            }
+            self.escaneados += 1
+        self._arquivos[content_path] = arquivos
+        return arquivos
+
+    def recuperavel(self, torrents):
+        """
+        Retorna (bytes_total, {disco: bytes}, escaneado).
+        escaneado=False quando algum content_path nao pode ser examinado
+        (o size do qBittorrent foi usado no lugar).
+        """
+        inodes    = {}      # (dev, inode) -> [nlink, bytes, {caminhos}]
+        por_disco = {}
+        escaneado = True
+        sem_scan  = {}      # content_path -> (size, disco)
+
+        for t in torrents:
+            arquivos = self.arquivos(t["content_path"]) if t["content_path"] else None
+            if arquivos is None:
+                escaneado = False
+                chave = t["content_path"] or t["hash"]
+                tamanho_anterior = sem_scan.get(chave, (0, None))[0]
+                sem_scan[chave] = (max(tamanho_anterior, t["size"]), t["disco"])
+                continue
+            for caminho, dev, ino, nlink, tamanho in arquivos:
+                entrada = inodes.setdefault((dev, ino), [nlink, tamanho, set()])
+                entrada[2].add(caminho)
+
+        for (dev, _), (nlink, tamanho, caminhos) in inodes.items():
+            if len(caminhos) >= nlink:
+                disco = self.discos.get(dev)
+                por_disco[disco] = por_disco.get(disco, 0) + tamanho
+        for tamanho, disco in sem_scan.values():
+            por_disco[disco] = por_disco.get(disco, 0) + tamanho
+
+        return sum(por_disco.values()), por_disco, escaneado
+
+    def persistir(self, removidos=()):
+        """Salva os scans novos e remove os content_paths apagados."""
+        if self.conn is None:
+            return
+        salvar_content_scan(self.conn, self._novos)
+        self._novos = {}
+        remover_content_scan(self.conn, removidos)
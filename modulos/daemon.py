@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# modulos/daemon.py — Loop do modo daemon (--daemon)
+#
+# Substitui a execucao por cron: o processo fica vivo e chama o corpo do
+# run (executar_checagem) a cada intervalo, mantendo client autenticado,
+# conexao do banco, espelho do sync/maindata, cache de trackers e OTEL.
+#
+#   SIGTERM / SIGINT → termina o ciclo atual e encerra
+#   SIGHUP           → recarrega a configuracao no proximo ciclo
+#   config.py / tracker_rules.py alterados (mtime) → recarrega a configuracao
+
+import os
+import signal
+import time
+import traceback
+
+_estado = {
+    "parar":      False,
+    "recarregar": False,
+}
+
+
+def _tratar_parada(signum, frame):
+    print(f"\n🛑 Sinal {signal.Signals(signum).name} recebido — encerrando após o ciclo atual")
+    _estado["parar"] = True
+
+
+def _tratar_recarga(signum, frame):
+    print(f"\n🔄 SIGHUP recebido — configuração será recarregada")
+    _estado["recarregar"] = True
+
+
+def instalar_sinais():
+    signal.signal(signal.SIGTERM, _tratar_parada)
+    signal.signal(signal.SIGINT,  _tratar_parada)
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, _tratar_recarga)
+
+
+def ler_mtimes(arquivos):
+    mtimes = {}
+    for caminho in arquivos:
+        try:
+            mtimes[caminho] = os.path.getmtime(caminho)
+        except OSError:
+            mtimes[caminho] = None
+    return mtimes
+
+
+def aguardar(segundos):
+    """Dorme em passos curtos para reagir rapido a SIGTERM."""
+    limite = time.monotonic() + segundos
+    while not _estado["parar"]:
+        restante = limite - time.monotonic()
+        if restante <= 0:
+            break
+        time.sleep(min(1.0, restante))
+
+
+def loop_daemon(executar_ciclo, intervalo_fn, arquivos_config, recarregar_fn):
+    """
+    Executa executar_ciclo() a cada intervalo_fn() segundos ate receber SIGTERM.
+
+    - executar_ciclo: corpo de um run (excecoes sao registradas e o loop segue)
+    - intervalo_fn:   retorna o intervalo atual (pode mudar apos recarga)
+    - arquivos_config: arquivos monitorados por mtime para recarga automatica
+    - recarregar_fn:  chamado quando a configuracao precisa ser recarregada
+    """
+    instalar_sinais()
+    mtimes = ler_mtimes(arquivos_config)
+    ciclo  = 0
+
+    while not _estado["parar"]:
+        inicio = time.monotonic()
+
+        atuais = ler_mtimes(arquivos_config)
+        if atuais != mtimes or _estado["recarregar"]:
+            mtimes = atuais
+            _estado["recarregar"] = False
+            print(f"\n🔄 Recarregando configuração...")
+            try:
+                recarregar_fn()
+            except Exception as e:
+                print(f"   ❌ Falha ao recarregar configuração (mantendo a anterior): {e}")
+
+        ciclo += 1
+        print(f"\n⏱️  Ciclo #{ciclo}")
+        try:
+            executar_ciclo()
+        except Exception as e:
+            print(f"   ❌ Erro no ciclo #{ciclo}: {e}")
+            traceback.print_exc()
+
+        duracao = time.monotonic() - inicio
+        espera  = max(0, intervalo_fn() - duracao)
+        if not _estado["parar"]:
+            print(f"   💤 Ciclo em {duracao:.1f}s — próximo em {espera:.0f}s")
+        aguardar(espera)
+
+    print("👋 Daemon encerrado")
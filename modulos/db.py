@@ -4,26 +4,160 @@
 import os
 import sqlite3
 import json
-from datetime import datetime
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+# WAL: leitores (--check-disk, consultas manuais) nao esperam o run que esta
+# gravando. synchronous=NORMAL no WAL so faz fsync no checkpoint — um crash do
+# processo nao perde commits; queda de energia pode perder os ultimos, exceto
+# os seguidos de checkpoint em confirmar(conn, duravel=True).
+# Nenhum deles escreve no banco ja em WAL (auto_vacuum fica em init_db, so
+# para arquivo novo — em banco existente quem converte e o --compact).
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",         # 16 MB
+    "PRAGMA mmap_size=67108864",        # 64 MB
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+# Versao do schema em PRAGMA user_version. Incremente a cada tabela, coluna,
+# indice ou view nova: com o banco na versao atual init_db nao escreve nada
+# (um --check-disk durante o run nao espera a transacao do ciclo).
+SCHEMA_VERSAO = 4
+
+
+# Snapshot delta (torrent_changes): progresso registrado em faixas de 5% e um
+# keyframe por torrent a cada KEYFRAME_HORAS mesmo sem mudanca
+PROGRESSO_FAIXAS = 20
+KEYFRAME_HORAS   = 24
+
+
+class ConexaoDB(sqlite3.Connection):
+    """
+    Conexao SQLite com commits adiaveis.
+
+    Os helpers deste modulo chamam conn.commit() ao fim de cada escrita. Dentro
+    de transacao(conn) esses commits so sao contados e as escritas seguidas
+    viram uma transacao so. confirmar(conn) faz o commit no meio do run: ao
+    fim de cada PASSO do checagem_disco e antes de chamadas ao qBittorrent ou
+    esperas longas, para a trava de escrita nunca ficar presa durante I/O de
+    rede (--check-torrent, --erase-torrent e --compact tambem escrevem), e
+    nos pontos que nao podem se perder (pausa/restauracao, delecoes ja feitas).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.profundidade    = 0    # blocos transacao() abertos
+        self.commits         = 0    # commits reais
+        self.commits_adiados = 0    # conn.commit() absorvidos pela transacao
+
+    def commit(self):
+        if self.profundidade:
+            self.commits_adiados += 1
+            return
+        self.commits += 1
+        super().commit()
+
+    def confirmar(self, duravel=False):
+        """Commit imediato, mesmo dentro de transacao(); duravel=True faz fsync."""
+        self.commits += 1
+        super().commit()
+        if duravel:
+            # Checkpoint passivo: fsync do WAL e copia para o banco sem esperar leitores
+            self.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+
+@contextmanager
+def transacao(conn):
+    """
+    Unidade de trabalho de um run: as escritas dos helpers entre dois
+    confirmar(conn) viram um commit so. Em caso de excecao o que ainda nao foi
+    confirmado e desfeito — o que ja aconteceu no qBittorrent (pausa,
+    restauracao, delecoes) foi confirmado na hora.
+    """
+    conn.profundidade += 1
+    try:
+        yield conn
+    except BaseException:
+        conn.profundidade -= 1
+        if not conn.profundidade:
+            conn.rollback()
+        raise
+    conn.profundidade -= 1
+    if not conn.profundidade:
+        conn.commit()
+
+
+def confirmar(conn, duravel=False):
+    """Ponto de recuperacao: grava agora o que o run ja escreveu."""
+    if isinstance(conn, ConexaoDB):
+        conn.confirmar(duravel)
+    else:
+        conn.commit()
 
 
 def init_db(db_dir, db_path):
     os.makedirs(db_dir, exist_ok=True)
-    conn = sqlite3.connect(db_path)
+    conn = sqlite3.connect(db_path, timeout=30, factory=ConexaoDB)
+    conn.row_factory = sqlite3.Row
+    if not conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchone():
+        # Banco novo: auto_vacuum antes da primeira tabela
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    if _schema_atual(conn):
+        return conn
+    _criar_schema(conn)
+    return conn
+
+
+def abrir_leitura(db_path, timeout=2):
+    """
+    Conexao somente leitura para subcomandos que so consultam o historico
+    (--check-disk): sem migracoes nem escrita. Levanta sqlite3.Error se o
+    banco nao existe, esta bloqueado ou e de uma versao antiga.
+    """
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=timeout)
     conn.row_factory = sqlite3.Row
+    try:
+        if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSAO:
+            raise sqlite3.OperationalError(f"schema desatualizado em {db_path}")
+    except sqlite3.Error:
+        conn.close()
+        raise
+    return conn
+
+
+def _schema_atual(conn):
+    return (conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSAO
+            and conn.execute("SELECT 1 FROM sqlite_master "
+                             "WHERE type = 'view' AND name = 'v_torrent_snapshots'").fetchone())
+
+
+def _criar_schema(conn):
+    """Tabelas, migracoes e views. So roda com user_version abaixo de SCHEMA_VERSAO."""
     conn.executescript("""
         CREATE TABLE IF NOT EXISTS runs (
-            id                 INTEGER PRIMARY KEY AUTOINCREMENT,
-            started_at         TEXT    NOT NULL,
-            status             TEXT    NOT NULL,
-            checking           INTEGER NOT NULL DEFAULT 0,
-            moving             INTEGER NOT NULL DEFAULT 0,
-            disk_spaces        TEXT,
-            paused_count       INTEGER NOT NULL DEFAULT 0,
-            forcados_checking  INTEGER NOT NULL DEFAULT 0,
-            tracker_forcados   INTEGER NOT NULL DEFAULT 0,
-            tracker_ativados   INTEGER NOT NULL DEFAULT 0,
-            seeding_deletados  INTEGER NOT NULL DEFAULT 0
+            id                   INTEGER PRIMARY KEY AUTOINCREMENT,
+            started_at           TEXT    NOT NULL,
+            status               TEXT    NOT NULL,
+            checking             INTEGER NOT NULL DEFAULT 0,
+            moving               INTEGER NOT NULL DEFAULT 0,
+            disk_spaces          TEXT,
+            paused_count         INTEGER NOT NULL DEFAULT 0,
+            forcados_checking    INTEGER NOT NULL DEFAULT 0,
+            tracker_forcados     INTEGER NOT NULL DEFAULT 0,
+            tracker_ativados     INTEGER NOT NULL DEFAULT 0,
+            seeding_deletados    INTEGER NOT NULL DEFAULT 0,
+            api_fetches          INTEGER NOT NULL DEFAULT 0,
+            api_fetches_evitados INTEGER NOT NULL DEFAULT 0,
+            tracker_fetches      INTEGER NOT NULL DEFAULT 0,
+            previsao             TEXT,
+            espera_delecao_s     REAL,
+            espera_economizada_s REAL,
+            agregado             INTEGER NOT NULL DEFAULT 0
         );
 
         CREATE TABLE IF NOT EXISTS torrent_snapshots (
@@ -41,6 +175,32 @@ def init_db(db_dir, db_path):
             force_start INTEGER NOT NULL DEFAULT 0
         );
 
+        CREATE TABLE IF NOT EXISTS torrents (
+            id               INTEGER PRIMARY KEY AUTOINCREMENT,
+            hash             TEXT    NOT NULL UNIQUE,
+            name             TEXT    NOT NULL,
+            tracker          TEXT,
+            size             INTEGER NOT NULL DEFAULT 0,
+            first_run        INTEGER NOT NULL,
+            last_state       TEXT,
+            last_force_start INTEGER,
+            last_bucket      INTEGER,
+            last_change_at   TEXT
+        );
+
+        CREATE TABLE IF NOT EXISTS torrent_changes (
+            id          INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id      INTEGER NOT NULL REFERENCES runs(id),
+            torrent_id  INTEGER NOT NULL REFERENCES torrents(id),
+            state       TEXT    NOT NULL,
+            progress    REAL    NOT NULL DEFAULT 0,
+            dlspeed     INTEGER NOT NULL DEFAULT 0,
+            upspeed     INTEGER NOT NULL DEFAULT 0,
+            force_start INTEGER NOT NULL DEFAULT 0,
+            keyframe    INTEGER NOT NULL DEFAULT 0,
+            UNIQUE (torrent_id, run_id)
+        );
+
         CREATE TABLE IF NOT EXISTS pause_events (
             id               INTEGER PRIMARY KEY AUTOINCREMENT,
             run_id           INTEGER NOT NULL REFERENCES runs(id),
@@ -50,7 +210,29 @@ def init_db(db_dir, db_path):
             disk_spaces      TEXT,
             discos_criticos  TEXT,
             torrent_hashes   TEXT,
-            torrents_count   INTEGER NOT NULL DEFAULT 0
+            torrents_count   INTEGER NOT NULL DEFAULT 0,
+            pause_ref_id     INTEGER,
+            hashes_adicionados TEXT,
+            hashes_removidos TEXT,
+            repeticoes       INTEGER NOT NULL DEFAULT 1,
+            last_seen_at     TEXT
+        );
+
+        CREATE TABLE IF NOT EXISTS system_state (
+            id               INTEGER PRIMARY KEY CHECK (id = 1),
+            paused           INTEGER NOT NULL DEFAULT 0,
+            reason           TEXT,
+            discos_criticos  TEXT,
+            pause_event_id   INTEGER,
+            last_event_type  TEXT,
+            last_event_at    TEXT,
+            updated_at       TEXT    NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS paused_torrents (
+            hash        TEXT    PRIMARY KEY,
+            paused_at   TEXT    NOT NULL,
+            disk        TEXT
         );
 
         CREATE TABLE IF NOT EXISTS seed_deletions (
@@ -75,50 +257,214 @@ def init_db(db_dir, db_path):
             message     TEXT    NOT NULL
         );
 
+        CREATE TABLE IF NOT EXISTS tracker_cache (
+            hash        TEXT    PRIMARY KEY,
+            hosts       TEXT    NOT NULL,
+            fetched_at  TEXT    NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS sync_state (
+            id          INTEGER PRIMARY KEY CHECK (id = 1),
+            rid         INTEGER NOT NULL DEFAULT 0,
+            updated_at  TEXT    NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS sync_torrents (
+            hash        TEXT    PRIMARY KEY,
+            state       TEXT,
+            dados       TEXT    NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS content_scan (
+            content_path TEXT    PRIMARY KEY,
+            root_ino     INTEGER NOT NULL,
+            root_mtime   REAL    NOT NULL,
+            scanned_at   TEXT    NOT NULL,
+            arquivos     TEXT    NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS content_identity (
+            hash        TEXT    PRIMARY KEY,
+            grupo       TEXT    NOT NULL,
+            impressao   TEXT,
+            falha_at    TEXT,                       -- ultima torrents_files() que falhou
+            updated_at  TEXT    NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS seed_eligibility (
+            hash              TEXT    PRIMARY KEY,
+            grupo             TEXT    NOT NULL,
+            hosts             TEXT    NOT NULL,
+            regras            TEXT    NOT NULL,
+            eligible_at       TEXT,
+            updated_at        TEXT    NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS snapshot_rollups (
+            periodo     TEXT    NOT NULL,           -- 'hora' | 'dia'
+            inicio      TEXT    NOT NULL,           -- 'YYYY-MM-DDTHH' | 'YYYY-MM-DD'
+            tracker     TEXT    NOT NULL,
+            state       TEXT    NOT NULL,
+            runs        INTEGER NOT NULL DEFAULT 0, -- runs em que o par apareceu
+            torrents    INTEGER NOT NULL DEFAULT 0, -- soma por run (media = torrents / runs)
+            dlspeed     INTEGER NOT NULL DEFAULT 0,
+            upspeed     INTEGER NOT NULL DEFAULT 0,
+            size        INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (periodo, inicio, tracker, state)
+        );
+
+        CREATE TABLE IF NOT EXISTS compactacoes (
+            id          INTEGER PRIMARY KEY AUTOINCREMENT,
+            started_at  TEXT    NOT NULL,
+            finished_at TEXT    NOT NULL,
+            completo    INTEGER NOT NULL DEFAULT 0,
+            resumo      TEXT
+        );
+
+        CREATE TABLE IF NOT EXISTS auth_events (
+            id          INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp   TEXT    NOT NULL,
+            event_type  TEXT    NOT NULL,
+            duracao_ms  REAL,
+            motivo      TEXT
+        );
+
         CREATE INDEX IF NOT EXISTS idx_snapshots_run      ON torrent_snapshots(run_id);
         CREATE INDEX IF NOT EXISTS idx_snapshots_hash     ON torrent_snapshots(hash);
         CREATE INDEX IF NOT EXISTS idx_snapshots_state    ON torrent_snapshots(state);
+        CREATE INDEX IF NOT EXISTS idx_changes_run        ON torrent_changes(run_id);
         CREATE INDEX IF NOT EXISTS idx_pause_events_run   ON pause_events(run_id);
         CREATE INDEX IF NOT EXISTS idx_pause_events_type  ON pause_events(event_type);
         CREATE INDEX IF NOT EXISTS idx_seed_deletions_run ON seed_deletions(run_id);
         CREATE INDEX IF NOT EXISTS idx_notifications_type ON notifications(event_type);
+        CREATE INDEX IF NOT EXISTS idx_auth_events_type   ON auth_events(event_type);
+        CREATE INDEX IF NOT EXISTS idx_content_identity_grupo ON content_identity(grupo);
+        CREATE INDEX IF NOT EXISTS idx_seed_eligibility_at    ON seed_eligibility(eligible_at);
+        CREATE INDEX IF NOT EXISTS idx_seed_eligibility_grupo ON seed_eligibility(grupo);
     """)
 
-    # Migracao: adicionar coluna discos_criticos se nao existir
-    try:
-        conn.execute("ALTER TABLE pause_events ADD COLUMN discos_criticos TEXT")
-        conn.commit()
-    except sqlite3.OperationalError:
-        pass
-    conn.commit()
-    return conn
+    # Migracoes: adicionar colunas novas (e remover as que sairam) em bancos antigos
+    for migracao in (
+        "ALTER TABLE pause_events ADD COLUMN discos_criticos TEXT",
+        "ALTER TABLE runs ADD COLUMN api_fetches INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE runs ADD COLUMN api_fetches_evitados INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE runs ADD COLUMN tracker_fetches INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE runs ADD COLUMN previsao TEXT",
+        "ALTER TABLE runs ADD COLUMN espera_delecao_s REAL",
+        "ALTER TABLE runs ADD COLUMN espera_economizada_s REAL",
+        "ALTER TABLE runs ADD COLUMN agregado INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE pause_events ADD COLUMN pause_ref_id INTEGER",
+        "ALTER TABLE pause_events ADD COLUMN hashes_adicionados TEXT",
+        "ALTER TABLE pause_events ADD COLUMN hashes_removidos TEXT",
+        "ALTER TABLE pause_events ADD COLUMN repeticoes INTEGER NOT NULL DEFAULT 1",
+        "ALTER TABLE pause_events ADD COLUMN last_seen_at TEXT",
+        "ALTER TABLE notifications ADD COLUMN priority INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE notifications ADD COLUMN pending_channels TEXT",
+        "ALTER TABLE notifications ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE notifications ADD COLUMN last_error TEXT",
+        "ALTER TABLE seed_eligibility DROP COLUMN grupo_eligible_at",
+        "ALTER TABLE content_identity ADD COLUMN falha_at TEXT",
+    ):
+        try:
+            conn.execute(migracao)
+            conn.commit()
+        except sqlite3.OperationalError:
+            pass
 
+    _migrar_estado_pausa(conn)
 
-def ler_ultimo_estado(conn):
-    cur        = conn.execute("SELECT id, status FROM runs ORDER BY id DESC LIMIT 1")
-    ultimo_run = cur.fetchone()
+    # Notificacoes com canais que ainda nao receberam a mensagem
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_notifications_pendentes
+        ON notifications(id) WHERE pending_channels IS NOT NULL
+    """)
 
-    torrents_pausados = ler_torrents_pausados(conn)
-    motivo_pausa      = ler_motivo_pausa(conn)
+    # Snapshot completo por run reconstruido do log de mudancas: cada registro
+    # vale do seu run ate o proximo registro do mesmo torrent (LEAD), e cobre
+    # os runs de checagem desse intervalo. Os snapshots gravados antes do log
+    # (torrent_snapshots) continuam visiveis.
+    conn.executescript(f"""
+        DROP VIEW IF EXISTS v_torrent_snapshots;
+        CREATE VIEW v_torrent_snapshots AS
+        WITH intervalos AS (
+            SELECT c.*, LEAD(c.run_id) OVER (PARTITION BY c.torrent_id
+                                             ORDER BY c.run_id) AS ate_run
+            FROM torrent_changes c
+        )
+        SELECT r.id AS run_id, r.started_at AS recorded_at, t.hash, t.name,
+               c.state, c.progress, c.dlspeed, c.upspeed, t.size, t.tracker,
+               c.force_start, c.keyframe
+        FROM intervalos c
+        JOIN torrents t ON t.id = c.torrent_id
+        JOIN runs r
+          ON r.id >= c.run_id AND (c.ate_run IS NULL OR r.id < c.ate_run)
+         AND r.status IN ('active', 'paused')
+        WHERE c.state != 'removed'
+        UNION ALL
+        SELECT run_id, recorded_at, hash, name, state, progress, dlspeed, upspeed,
+               size, tracker, force_start, 1 AS keyframe
+        FROM torrent_snapshots;
 
-    discos_criticos = None
+        PRAGMA user_version = {SCHEMA_VERSAO};
+    """)
+    conn.commit()
+
+
+def _migrar_estado_pausa(conn):
+    """
+    Cria a linha de system_state em bancos antigos, derivando o estado do
+    historico de pause_events (ultima pausa sem restauracao depois dela).
+    """
+    if conn.execute("SELECT 1 FROM system_state WHERE id = 1").fetchone():
+        return
+    agora      = datetime.now().isoformat()
     last_pause = conn.execute(
-        "SELECT id, discos_criticos FROM pause_events WHERE event_type='pause' ORDER BY id DESC LIMIT 1"
+        "SELECT * FROM pause_events WHERE event_type='pause' ORDER BY id DESC LIMIT 1"
+    ).fetchone()
+    if last_pause and conn.execute(
+        "SELECT 1 FROM pause_events WHERE event_type='restore' AND id > ?", (last_pause["id"],)
+    ).fetchone():
+        last_pause = None
+    ultimo = conn.execute(
+        "SELECT event_type, event_at FROM pause_events ORDER BY id DESC LIMIT 1"
     ).fetchone()
+
+    conn.execute("""
+        INSERT INTO system_state
+            (id, paused, reason, discos_criticos, pause_event_id,
+             last_event_type, last_event_at, updated_at)
+        VALUES (1, ?, ?, ?, ?, ?, ?, ?)
+    """, (1 if last_pause else 0,
+          last_pause["reason"] if last_pause else None,
+          last_pause["discos_criticos"] if last_pause else None,
+          last_pause["id"] if last_pause else None,
+          ultimo["event_type"] if ultimo else None,
+          ultimo["event_at"] if ultimo else None,
+          agora))
     if last_pause:
-        last_restore = conn.execute(
-            "SELECT id FROM pause_events WHERE event_type='restore' AND id > ?",
-            (last_pause["id"],)
-        ).fetchone()
-        if not last_restore and last_pause["discos_criticos"]:
-            discos_criticos = json.loads(last_pause["discos_criticos"])
+        conn.executemany(
+            "INSERT OR IGNORE INTO paused_torrents (hash, paused_at) VALUES (?, ?)",
+            [(h, last_pause["event_at"]) for h in json.loads(last_pause["torrent_hashes"] or "[]")]
+        )
+    conn.commit()
+
+
+def ler_ultimo_estado(conn):
+    estado = conn.execute("""
+        SELECT s.paused, s.reason, s.discos_criticos, r.id AS run_id, r.status
+        FROM system_state s
+        LEFT JOIN runs r ON r.id = (SELECT MAX(id) FROM runs)
+        WHERE s.id = 1
+    """).fetchone()
+    pausado = bool(estado and estado["paused"])
 
     return {
-        "run_status":        ultimo_run["status"] if ultimo_run else "active",
-        "torrents_pausados": torrents_pausados,
-        "motivo_pausa":      motivo_pausa,
-        "discos_criticos":   discos_criticos,
-        "ultimo_run_id":     ultimo_run["id"] if ultimo_run else None
+        "run_status":        (estado["status"] if estado else None) or "active",
+        "torrents_pausados": ler_torrents_pausados(conn) if pausado else set(),
+        "motivo_pausa":      estado["reason"].split(',') if pausado and estado["reason"] else [],
+        "discos_criticos":   json.loads(estado["discos_criticos"])
+                             if pausado and estado["discos_criticos"] else None,
+        "ultimo_run_id":     estado["run_id"] if estado else None
     }
 
 
@@ -141,6 +487,22 @@ def criar_run(conn, status, checking, moving, espacos, paused_count=0):
     return cur.lastrowid
 
 
+def ler_historico_espacos(conn, desde):
+    """Retorna [(datetime, {disco: {"livre": ..., ...}})] dos runs desde a data."""
+    historico = []
+    for row in conn.execute("""
+        SELECT started_at, disk_spaces FROM runs
+        WHERE started_at >= ? AND disk_spaces IS NOT NULL
+        ORDER BY id
+    """, (desde.isoformat(),)):
+        try:
+            historico.append((datetime.fromisoformat(row["started_at"]),
+                              json.loads(row["disk_spaces"])))
+        except (ValueError, TypeError):
+            continue
+    return historico
+
+
 def atualizar_run(conn, run_id, **kwargs):
     if not kwargs:
         return
@@ -149,43 +511,193 @@ def atualizar_run(conn, run_id, **kwargs):
     conn.commit()
 
 
+def _faixa_progresso(progress):
+    return min(int((progress or 0) * PROGRESSO_FAIXAS), PROGRESSO_FAIXAS)
+
+
 def salvar_snapshots(conn, run_id, todos_torrents, tracker_map):
-    agora = datetime.now().isoformat()
-    rows  = [(
-        run_id, agora, t.hash, t.name, t.state,
-        round(getattr(t, 'progress', 0), 4),
-        getattr(t, 'dlspeed', 0),
-        getattr(t, 'upspeed', 0),
-        getattr(t, 'size', 0),
-        tracker_map.get(t.hash, 'unknown'),
-        1 if getattr(t, 'force_start', False) else 0
-    ) for t in todos_torrents]
+    """
+    Snapshot delta do run: grava em torrent_changes so os torrents cujo state,
+    force_start ou faixa de progresso mudou, os novos, os removidos
+    (state='removed') e um keyframe a cada KEYFRAME_HORAS por torrent.
+    Hash, nome e tracker ficam uma vez na tabela torrents. A view
+    v_torrent_snapshots reconstroi o snapshot completo de cada run.
+
+    Retorna a quantidade de linhas gravadas no log.
+    """
+    agora     = datetime.now()
+    agora_iso = agora.isoformat()
+    keyframe  = (agora - timedelta(hours=KEYFRAME_HORAS)).isoformat()
+
+    dimensao = {row["hash"]: row for row in conn.execute("""
+        SELECT id, hash, name, tracker, size, last_state, last_force_start,
+               last_bucket, last_change_at
+        FROM torrents
+    """)}
+
+    novos, alterados_dim, mudancas = [], [], []
+    for t in todos_torrents:
+        tracker = tracker_map.get(t.hash, 'unknown')
+        size    = getattr(t, 'size', 0)
+        if t.hash not in dimensao:
+            novos.append((t.hash, t.name, tracker, size, run_id))
+            continue
+        d = dimensao[t.hash]
+        if (d["name"], d["tracker"], d["size"]) != (t.name, tracker, size):
+            alterados_dim.append((t.name, tracker, size, d["id"]))
+
+    if novos:
+        conn.executemany("""
+            INSERT INTO torrents (hash, name, tracker, size, first_run) VALUES (?, ?, ?, ?, ?)
+        """, novos)
+        dimensao.update({row["hash"]: row for row in conn.execute("""
+            SELECT id, hash, name, tracker, size, last_state, last_force_start,
+                   last_bucket, last_change_at
+            FROM torrents WHERE first_run = ?
+        """, (run_id,))})
+    if alterados_dim:
+        conn.executemany("UPDATE torrents SET name = ?, tracker = ?, size = ? WHERE id = ?",
+                         alterados_dim)
+
+    presentes = set()
+    for t in todos_torrents:
+        d     = dimensao[t.hash]
+        force = 1 if getattr(t, 'force_start', False) else 0
+        faixa = _faixa_progresso(getattr(t, 'progress', 0))
+        presentes.add(t.hash)
+        mudou = (d["last_state"], d["last_force_start"], d["last_bucket"]) != (t.state, force, faixa)
+        chave = not mudou and (d["last_change_at"] or "") <= keyframe
+        if mudou or chave:
+            mudancas.append((run_id, d["id"], t.state,
+                             round(getattr(t, 'progress', 0), 4),
+                             getattr(t, 'dlspeed', 0), getattr(t, 'upspeed', 0),
+                             force, 1 if chave else 0, faixa))
+
+    # Removidos do qBittorrent desde o ultimo registro
+    for h, d in dimensao.items():
+        if h not in presentes and d["last_state"] not in (None, 'removed'):
+            mudancas.append((run_id, d["id"], 'removed', 0, 0, 0, 0, 0, None))
+
+    conn.executemany("""
+        INSERT INTO torrent_changes
+            (run_id, torrent_id, state, progress, dlspeed, upspeed, force_start, keyframe)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(torrent_id, run_id) DO UPDATE SET
+            state       = excluded.state,
+            progress    = excluded.progress,
+            dlspeed     = excluded.dlspeed,
+            upspeed     = excluded.upspeed,
+            force_start = excluded.force_start
+    """, [m[:8] for m in mudancas])
     conn.executemany("""
-        INSERT INTO torrent_snapshots
-            (run_id, recorded_at, hash, name, state, progress,
-             dlspeed, upspeed, size, tracker, force_start)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, rows)
+        UPDATE torrents SET last_state = ?, last_force_start = ?, last_bucket = ?,
+                            last_change_at = ?
+        WHERE id = ?
+    """, [(m[2], m[6], m[8], agora_iso, m[1]) for m in mudancas])
     conn.commit()
-    return len(rows)
+    return len(mudancas)
 
 
 def registrar_pause_event(conn, run_id, event_type, reason=None, espacos=None,
-                          hashes=None, discos_criticos=None):
+                          hashes=None, discos_criticos=None, discos=None):
+    """
+    Grava o evento no historico (pause_events) e atualiza o estado atual
+    (system_state + paused_torrents) na mesma transacao.
+    discos: {hash: disco} dos torrents pausados (coluna paused_torrents.disk).
+
+    'waiting' nao repete a lista de hashes: referencia a pausa de origem
+    (pause_ref_id) e guarda so a diferenca entre hashes e paused_torrents.
+    Esperas consecutivas iguais viram uma linha (repeticoes, last_seen_at).
+    O evento e confirmado na hora, mesmo dentro de transacao(conn).
+    """
+    agora         = datetime.now().isoformat()
     disk_json     = json.dumps({
         n: {"livre": round(d["livre"], 2), "critico": d["critico"]}
         for n, d in espacos.items()
     }) if espacos else None
-    hashes_json   = json.dumps(list(hashes)) if hashes else "[]"
     criticos_json = json.dumps(discos_criticos) if discos_criticos else None
-    conn.execute("""
+
+    if event_type == 'waiting':
+        _registrar_espera(conn, run_id, agora, reason, disk_json, criticos_json, hashes)
+        return
+
+    hashes_json = json.dumps(list(hashes)) if hashes else "[]"
+    cur = conn.execute("""
         INSERT INTO pause_events
             (run_id, event_at, event_type, reason, disk_spaces,
              discos_criticos, torrent_hashes, torrents_count)
         VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """, (run_id, datetime.now().isoformat(), event_type, reason,
+    """, (run_id, agora, event_type, reason,
           disk_json, criticos_json, hashes_json, len(hashes) if hashes else 0))
-    conn.commit()
+
+    if event_type == 'pause':
+        discos = discos or {}
+        conn.executemany("""
+            INSERT INTO paused_torrents (hash, paused_at, disk) VALUES (?, ?, ?)
+            ON CONFLICT(hash) DO UPDATE SET disk = COALESCE(excluded.disk, disk)
+        """, [(h, agora, discos.get(h)) for h in (hashes or ())])
+        conn.execute("""
+            UPDATE system_state SET paused = 1, reason = ?, discos_criticos = ?,
+                   pause_event_id = ?, last_event_type = ?, last_event_at = ?, updated_at = ?
+            WHERE id = 1
+        """, (reason, criticos_json, cur.lastrowid, event_type, agora, agora))
+    elif event_type == 'restore':
+        conn.execute("DELETE FROM paused_torrents")
+        conn.execute("""
+            UPDATE system_state SET paused = 0, reason = NULL, discos_criticos = NULL,
+                   pause_event_id = NULL, last_event_type = ?, last_event_at = ?, updated_at = ?
+            WHERE id = 1
+        """, (event_type, agora, agora))
+    else:
+        conn.execute("""
+            UPDATE system_state SET last_event_type = ?, last_event_at = ?, updated_at = ?
+            WHERE id = 1
+        """, (event_type, agora, agora))
+
+    # O conjunto pausado e o estado que o proximo run precisa para restaurar
+    # (duravel); os demais eventos so sao confirmados antes das proximas
+    # chamadas ao qBittorrent
+    confirmar(conn, duravel=event_type in ('pause', 'restore'))
+
+
+def _registrar_espera(conn, run_id, agora, reason, disk_json, criticos_json, hashes):
+    """Evento 'waiting' como diferenca sobre a pausa de origem, coalescido."""
+    estado    = conn.execute("SELECT pause_event_id FROM system_state WHERE id = 1").fetchone()
+    pause_ref = estado["pause_event_id"] if estado else None
+    pausados  = ler_torrents_pausados(conn)
+    atuais    = set(hashes) if hashes is not None else pausados
+    adicionados = json.dumps(sorted(atuais - pausados)) if atuais - pausados else None
+    removidos   = json.dumps(sorted(pausados - atuais)) if pausados - atuais else None
+
+    ultimo = conn.execute("""
+        SELECT id, event_type, reason, discos_criticos, pause_ref_id,
+               hashes_adicionados, hashes_removidos, torrents_count
+        FROM pause_events ORDER BY id DESC LIMIT 1
+    """).fetchone()
+    if (ultimo is not None and ultimo["event_type"] == 'waiting'
+            and (ultimo["reason"], ultimo["discos_criticos"], ultimo["pause_ref_id"],
+                 ultimo["hashes_adicionados"], ultimo["hashes_removidos"],
+                 ultimo["torrents_count"])
+            == (reason, criticos_json, pause_ref, adicionados, removidos, len(atuais))):
+        # disk_spaces de cada run continua em runs.disk_spaces; aqui fica o ultimo
+        conn.execute("""
+            UPDATE pause_events SET repeticoes = repeticoes + 1, last_seen_at = ?, disk_spaces = ?
+            WHERE id = ?
+        """, (agora, disk_json, ultimo["id"]))
+    else:
+        conn.execute("""
+            INSERT INTO pause_events
+                (run_id, event_at, event_type, reason, disk_spaces, discos_criticos,
+                 torrents_count, pause_ref_id, hashes_adicionados, hashes_removidos,
+                 repeticoes, last_seen_at)
+            VALUES (?, ?, 'waiting', ?, ?, ?, ?, ?, ?, ?, 1, ?)
+        """, (run_id, agora, reason, disk_json, criticos_json, len(atuais),
+              pause_ref, adicionados, removidos, agora))
+    conn.execute("""
+        UPDATE system_state SET last_event_type = 'waiting', last_event_at = ?, updated_at = ?
+        WHERE id = 1
+    """, (agora, agora))
+    confirmar(conn)
 
 
 def salvar_seed_deletions(conn, run_id, deletados, dry_run):
@@ -204,42 +716,57 @@ def salvar_seed_deletions(conn, run_id, deletados, dry_run):
 
 
 def ler_torrents_pausados(conn):
-    last_pause = conn.execute(
-        "SELECT id, torrent_hashes FROM pause_events WHERE event_type='pause' ORDER BY id DESC LIMIT 1"
-    ).fetchone()
-    if not last_pause:
-        return set()
-    last_restore = conn.execute(
-        "SELECT id FROM pause_events WHERE event_type='restore' AND id > ?",
-        (last_pause["id"],)
-    ).fetchone()
-    if last_restore:
-        return set()
-    hashes = json.loads(last_pause["torrent_hashes"] or "[]")
-    return set(hashes)
+    return {row[0] for row in conn.execute("SELECT hash FROM paused_torrents")}
 
 
 def ler_motivo_pausa(conn):
-    last_pause = conn.execute(
-        "SELECT id, reason FROM pause_events WHERE event_type='pause' ORDER BY id DESC LIMIT 1"
-    ).fetchone()
-    if not last_pause:
-        return []
-    last_restore = conn.execute(
-        "SELECT id FROM pause_events WHERE event_type='restore' AND id > ?",
-        (last_pause["id"],)
-    ).fetchone()
-    if last_restore:
-        return []
-    return last_pause["reason"].split(',') if last_pause["reason"] else []
+    row = conn.execute("SELECT reason FROM system_state WHERE id = 1 AND paused = 1").fetchone()
+    return row["reason"].split(',') if row and row["reason"] else []
 
 
-def registrar_notificacao(conn, run_id, event_type, title, message):
+def registrar_notificacao(conn, run_id, event_type, title, message, priority=0):
+    """Registra a notificacao disparada e retorna o id (usado no controle de entrega)."""
+    cur = conn.execute("""
+        INSERT INTO notifications (run_id, sent_at, event_type, title, message, priority)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (run_id, datetime.now().isoformat(), event_type, title, message, priority))
+    conn.commit()
+    return cur.lastrowid
+
+
+def atualizar_entrega_notificacao(conn, notificacao_id, entregues, falhas, erro=None):
+    """
+    Atualiza pending_channels com o resultado de uma rodada de envio:
+    (pendentes atuais | falhas) - entregues. Retorna True se ainda ha canal pendente.
+    """
+    row = conn.execute("SELECT pending_channels FROM notifications WHERE id = ?",
+                       (notificacao_id,)).fetchone()
+    if row is None:
+        return False
+    atuais    = set(json.loads(row["pending_channels"])) if row["pending_channels"] else set()
+    pendentes = (atuais | set(falhas)) - set(entregues)
+    if pendentes == atuais and not falhas:
+        return bool(pendentes)
     conn.execute("""
-        INSERT INTO notifications (run_id, sent_at, event_type, title, message)
-        VALUES (?, ?, ?, ?, ?)
-    """, (run_id, datetime.now().isoformat(), event_type, title, message))
+        UPDATE notifications
+        SET pending_channels = ?,
+            attempts         = attempts + ?,
+            last_error       = COALESCE(?, last_error)
+        WHERE id = ?
+    """, (json.dumps(sorted(pendentes)) if pendentes else None, 1 if falhas else 0,
+          erro, notificacao_id))
     conn.commit()
+    return bool(pendentes)
+
+
+def ler_notificacoes_pendentes(conn, max_tentativas):
+    """Notificacoes com canais pendentes que ainda podem ser reenviadas (mais antigas primeiro)."""
+    return conn.execute("""
+        SELECT id, event_type, title, message, priority, pending_channels
+        FROM notifications
+        WHERE pending_channels IS NOT NULL AND attempts < ?
+        ORDER BY id
+    """, (max_tentativas,)).fetchall()
 
 
 def minutos_desde_ultima_notificacao(conn, event_type):
@@ -253,3 +780,438 @@ def minutos_desde_ultima_notificacao(conn, event_type):
     ultima = datetime.fromisoformat(row["sent_at"])
     delta  = datetime.now() - ultima
     return delta.total_seconds() / 60
+
+
+def ler_tracker_cache(conn):
+    """Retorna {hash: {"hosts": [...], "fetched_at": datetime}}"""
+    cache = {}
+    for row in conn.execute("SELECT hash, hosts, fetched_at FROM tracker_cache"):
+        cache[row["hash"]] = {
+            "hosts":      json.loads(row["hosts"]),
+            "fetched_at": datetime.fromisoformat(row["fetched_at"]),
+        }
+    return cache
+
+
+def salvar_tracker_cache(conn, entradas):
+    """entradas: {hash: {"hosts": [...], "fetched_at": datetime}}"""
+    if not entradas:
+        return
+    conn.executemany("""
+        INSERT INTO tracker_cache (hash, hosts, fetched_at)
+        VALUES (?, ?, ?)
+        ON CONFLICT(hash) DO UPDATE SET
+            hosts      = excluded.hosts,
+            fetched_at = excluded.fetched_at
+    """, [(h, json.dumps(e["hosts"]), e["fetched_at"].isoformat())
+          for h, e in entradas.items()])
+    conn.commit()
+
+
+def remover_tracker_cache(conn, hashes):
+    if not hashes:
+        return
+    conn.executemany("DELETE FROM tracker_cache WHERE hash = ?", [(h,) for h in hashes])
+    conn.commit()
+
+
+def ler_espelho_sync(conn):
+    """Retorna (rid, {hash: dict}) do espelho local do sync/maindata."""
+    row = conn.execute("SELECT rid FROM sync_state WHERE id = 1").fetchone()
+    rid = row["rid"] if row else 0
+    torrents = {
+        r["hash"]: json.loads(r["dados"])
+        for r in conn.execute("SELECT hash, dados FROM sync_torrents")
+    }
+    return rid, torrents
+
+
+def salvar_espelho_sync(conn, rid, alterados, removidos=(), full_update=False):
+    """
+    Aplica no banco o delta de um sync/maindata.
+    alterados: {hash: dict completo do torrent}; full_update substitui a tabela.
+    """
+    if full_update:
+        conn.execute("DELETE FROM sync_torrents")
+    if alterados:
+        conn.executemany("""
+            INSERT INTO sync_torrents (hash, state, dados) VALUES (?, ?, ?)
+            ON CONFLICT(hash) DO UPDATE SET
+                state = excluded.state,
+                dados = excluded.dados
+        """, [(h, t.get("state"), json.dumps(t)) for h, t in alterados.items()])
+    if removidos:
+        conn.executemany("DELETE FROM sync_torrents WHERE hash = ?", [(h,) for h in removidos])
+    conn.execute("""
+        INSERT INTO sync_state (id, rid, updated_at) VALUES (1, ?, ?)
+        ON CONFLICT(id) DO UPDATE SET rid = excluded.rid, updated_at = excluded.updated_at
+    """, (rid, datetime.now().isoformat()))
+    conn.commit()
+
+
+def registrar_evento_auth(conn, event_type, duracao_ms=None, motivo=None):
+    """event_type: login | login_falhou | reuso"""
+    conn.execute("""
+        INSERT INTO auth_events (timestamp, event_type, duracao_ms, motivo)
+        VALUES (?, ?, ?, ?)
+    """, (datetime.now().isoformat(), event_type,
+          round(duracao_ms, 1) if duracao_ms is not None else None, motivo))
+    conn.commit()
+
+
+def ler_content_scan(conn, content_path):
+    """Retorna {"root_ino", "root_mtime", "scanned_at", "arquivos"} ou None."""
+    row = conn.execute("""
+        SELECT root_ino, root_mtime, scanned_at, arquivos FROM content_scan
+        WHERE content_path = ?
+    """, (content_path,)).fetchone()
+    if not row:
+        return None
+    return {
+        "root_ino":   row["root_ino"],
+        "root_mtime": row["root_mtime"],
+        "scanned_at": datetime.fromisoformat(row["scanned_at"]),
+        "arquivos":   json.loads(row["arquivos"]),
+    }
+
+
+def salvar_content_scan(conn, entradas):
+    """entradas: {content_path: {"root_ino", "root_mtime", "scanned_at", "arquivos"}}"""
+    if not entradas:
+        return
+    conn.executemany("""
+        INSERT INTO content_scan (content_path, root_ino, root_mtime, scanned_at, arquivos)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(content_path) DO UPDATE SET
+            root_ino   = excluded.root_ino,
+            root_mtime = excluded.root_mtime,
+            scanned_at = excluded.scanned_at,
+            arquivos   = excluded.arquivos
+    """, [(p, e["root_ino"], e["root_mtime"], e["scanned_at"].isoformat(),
+           json.dumps(e["arquivos"])) for p, e in entradas.items()])
+    conn.commit()
+
+
+def remover_content_scan(conn, content_paths):
+    if not content_paths:
+        return
+    conn.executemany("DELETE FROM content_scan WHERE content_path = ?",
+                     [(p,) for p in content_paths])
+    conn.commit()
+
+
+def ler_identidade_conteudo(conn):
+    """{hash: {"grupo", "impressao", "falha_at"}} gravado no run anterior."""
+    rows = conn.execute("SELECT hash, grupo, impressao, falha_at FROM content_identity").fetchall()
+    return {r[0]: {"grupo": r[1], "impressao": r[2], "falha_at": r[3]} for r in rows}
+
+
+def salvar_identidade_conteudo(conn, entradas, removidos=()):
+    """
+    entradas: {hash: {"grupo", "impressao", "falha_at"}}; removidos: hashes que
+    sairam do qBittorrent.
+    """
+    if not entradas and not removidos:
+        return
+    agora = datetime.now().isoformat()
+    conn.executemany("""
+        INSERT INTO content_identity (hash, grupo, impressao, falha_at, updated_at)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(hash) DO UPDATE SET
+            grupo      = excluded.grupo,
+            impressao  = excluded.impressao,
+            falha_at   = excluded.falha_at,
+            updated_at = excluded.updated_at
+    """, [(h, e["grupo"], e["impressao"], e.get("falha_at"), agora)
+          for h, e in entradas.items()])
+    conn.executemany("DELETE FROM content_identity WHERE hash = ?",
+                     [(h,) for h in removidos])
+    conn.commit()
+
+
+def _linha_elegibilidade(row):
+    # hosts em texto ("\n" entre hosts) e regras "[]" sem json: a tabela tem
+    # uma linha por torrent e e lida inteira a cada run
+    return {
+        "grupo":       row["grupo"],
+        "hosts":       row["hosts"].split("\n") if row["hosts"] else [],
+        "regras":      [tuple(r) for r in json.loads(row["regras"])] if row["regras"] != "[]" else [],
+        "eligible_at": row["eligible_at"],
+    }
+
+
+def ler_seed_eligibility(conn):
+    """{hash: {"grupo", "hosts", "regras", "eligible_at"}}"""
+    rows = conn.execute("""
+        SELECT hash, grupo, hosts, regras, eligible_at
+        FROM seed_eligibility
+    """).fetchall()
+    return {row["hash"]: _linha_elegibilidade(row) for row in rows}
+
+
+def ler_candidatos_elegiveis(conn, agora):
+    """
+    Torrents com eligible_at <= agora (indice idx_seed_eligibility_at) e os
+    demais membros com regra dos seus grupos: {hash: {"grupo", "regras"}}.
+    """
+    rows = conn.execute("""
+        SELECT hash, grupo, regras FROM seed_eligibility
+        WHERE eligible_at IS NOT NULL AND grupo IN (
+            SELECT grupo FROM seed_eligibility WHERE eligible_at <= ?
+        )
+    """, (agora.isoformat(timespec="seconds"),)).fetchall()
+    return {row["hash"]: {"grupo":  row["grupo"],
+                          "regras": [tuple(r) for r in json.loads(row["regras"])]}
+            for row in rows}
+
+
+def salvar_seed_eligibility(conn, entradas, removidos=()):
+    """entradas: {hash: linha}; datas ja em ISO (timespec=seconds) ou None."""
+    if not entradas and not removidos:
+        return
+    agora = datetime.now().isoformat()
+    conn.executemany("""
+        INSERT INTO seed_eligibility
+            (hash, grupo, hosts, regras, eligible_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(hash) DO UPDATE SET
+            grupo       = excluded.grupo,
+            hosts       = excluded.hosts,
+            regras      = excluded.regras,
+            eligible_at = excluded.eligible_at,
+            updated_at  = excluded.updated_at
+    """, [(h, e["grupo"], "\n".join(e["hosts"]), json.dumps(e["regras"]),
+           e["eligible_at"], agora) for h, e in entradas.items()])
+    conn.executemany("DELETE FROM seed_eligibility WHERE hash = ?",
+                     [(h,) for h in removidos])
+    conn.commit()
+
+
+# ---------------------------------------------------------------------------
+# Compactacao (modulos/compactacao.py) — cada funcao trabalha em um lote e
+# faz commit, para nunca segurar o banco por muito tempo
+# ---------------------------------------------------------------------------
+def _apagar_lote(conn, tabela, condicao, params, lote):
+    cur = conn.execute(f"""
+        DELETE FROM {tabela} WHERE rowid IN (
+            SELECT rowid FROM {tabela} WHERE {condicao} LIMIT ?
+        )
+    """, (*params, lote))
+    conn.commit()
+    return cur.rowcount
+
+
+def runs_para_agregar(conn, antes, limite):
+    """Runs de checagem anteriores a 'antes' ainda nao agregados: [(id, started_at)]."""
+    return [tuple(r) for r in conn.execute("""
+        SELECT id, started_at FROM runs
+        WHERE agregado = 0 AND started_at < ? AND status IN ('active', 'paused')
+        ORDER BY id LIMIT ?
+    """, (antes.isoformat(), limite))]
+
+
+def agregar_runs(conn, runs):
+    """
+    Soma os snapshots dos runs (mesma semantica da v_torrent_snapshots) nos
+    agregados por hora. O log de mudancas e reproduzido em ordem a partir do
+    estado anterior ao primeiro run, com contadores por (tracker, state): o
+    custo e torrents + mudancas, nao torrents x runs.
+    """
+    if not runs:
+        return 0
+    runs     = sorted(runs)
+    primeiro = runs[0][0]
+    ultimo   = runs[-1][0]
+
+    dimensao = {row["id"]: (row["tracker"] or "unknown", row["size"])
+                for row in conn.execute("SELECT id, tracker, size FROM torrents")}
+    atual    = {}     # torrent_id -> (tracker, state, dlspeed, upspeed, size)
+    contador = {}     # (tracker, state) -> [torrents, dlspeed, upspeed, size]
+
+    def _aplicar(torrent_id, state, dlspeed, upspeed):
+        anterior = atual.pop(torrent_id, None)
+        if anterior is not None:
+            c = contador[anterior[:2]]
+            c[0] -= 1; c[1] -= anterior[2]; c[2] -= anterior[3]; c[3] -= anterior[4]
+        if state == 'removed' or torrent_id not in dimensao:
+            return
+        tracker, size = dimensao[torrent_id]
+        atual[torrent_id] = (tracker, state, dlspeed, upspeed, size)
+        c = contador.setdefault((tracker, state), [0, 0, 0, 0])
+        c[0] += 1; c[1] += dlspeed; c[2] += upspeed; c[3] += size
+
+    for row in conn.execute("""
+        SELECT c.torrent_id, c.state, c.dlspeed, c.upspeed FROM torrent_changes c
+        WHERE c.run_id = (SELECT MAX(c2.run_id) FROM torrent_changes c2
+                          WHERE c2.torrent_id = c.torrent_id AND c2.run_id < ?)
+    """, (primeiro,)):
+        _aplicar(*row)
+
+    mudancas = conn.execute("""
+        SELECT run_id, torrent_id, state, dlspeed, upspeed FROM torrent_changes
+        WHERE run_id BETWEEN ? AND ? ORDER BY run_id
+    """, (primeiro, ultimo)).fetchall()
+    legado = {}
+    for row in conn.execute("""
+        SELECT run_id, COALESCE(tracker, 'unknown'), state, COUNT(*),
+               SUM(dlspeed), SUM(upspeed), SUM(size)
+        FROM torrent_snapshots WHERE run_id BETWEEN ? AND ?
+        GROUP BY run_id, tracker, state
+    """, (primeiro, ultimo)):
+        legado.setdefault(row[0], []).append(row[1:])
+
+    linhas = []
+    i = 0
+    for run_id, started_at in runs:
+        while i < len(mudancas) and mudancas[i][0] <= run_id:
+            _aplicar(*mudancas[i][1:])
+            i += 1
+        hora = started_at[:13]
+        linhas.extend((hora, tracker, state, *valores)
+                      for (tracker, state), valores in contador.items() if valores[0] > 0)
+        linhas.extend((hora, *valores) for valores in legado.get(run_id, []))
+
+    conn.executemany("""
+        INSERT INTO snapshot_rollups
+            (periodo, inicio, tracker, state, runs, torrents, dlspeed, upspeed, size)
+        VALUES ('hora', ?, ?, ?, 1, ?, ?, ?, ?)
+        ON CONFLICT(periodo, inicio, tracker, state) DO UPDATE SET
+            runs     = runs + 1,
+            torrents = torrents + excluded.torrents,
+            dlspeed  = dlspeed  + excluded.dlspeed,
+            upspeed  = upspeed  + excluded.upspeed,
+            size     = size     + excluded.size
+    """, linhas)
+    conn.executemany("UPDATE runs SET agregado = 1 WHERE id = ?", [(r[0],) for r in runs])
+    conn.commit()
+    return len(linhas)
+
+
+def agregar_dias(conn, ate_dia):
+    """Agregados diarios a partir dos horarios, para dias completos ainda nao agregados."""
+    ultimo = conn.execute(
+        "SELECT MAX(inicio) FROM snapshot_rollups WHERE periodo = 'dia'").fetchone()[0] or ""
+    cur = conn.execute("""
+        INSERT INTO snapshot_rollups
+            (periodo, inicio, tracker, state, runs, torrents, dlspeed, upspeed, size)
+        SELECT 'dia', substr(inicio, 1, 10), tracker, state,
+               SUM(runs), SUM(torrents), SUM(dlspeed), SUM(upspeed), SUM(size)
+        FROM snapshot_rollups
+        WHERE periodo = 'hora' AND substr(inicio, 1, 10) > ? AND substr(inicio, 1, 10) < ?
+        GROUP BY substr(inicio, 1, 10), tracker, state
+    """, (ultimo, ate_dia))
+    conn.commit()
+    return cur.rowcount
+
+
+def primeiro_run_desde(conn, desde):
+    row = conn.execute("SELECT MIN(id) FROM runs WHERE started_at >= ?",
+                       (desde.isoformat(),)).fetchone()
+    return row[0]
+
+
+def apagar_snapshots_antigos(conn, ate_run_id, lote):
+    """
+    Mudancas de runs < ate_run_id que ja foram substituidas por uma mais nova
+    (ate ate_run_id) ou de torrents removidos, e os snapshots antigos
+    (torrent_snapshots) desses runs. A ultima mudanca de cada torrent ativo
+    fica, entao a view continua exata para os runs retidos.
+    """
+    return (_apagar_lote(conn, "torrent_changes", """
+                run_id < ? AND (
+                    EXISTS (SELECT 1 FROM torrent_changes c2
+                            WHERE c2.torrent_id = torrent_changes.torrent_id
+                              AND c2.run_id > torrent_changes.run_id AND c2.run_id <= ?)
+                    OR torrent_id IN (
+                        SELECT t.id FROM torrents t
+                        WHERE t.last_state = 'removed' AND NOT EXISTS (
+                            SELECT 1 FROM torrent_changes c3
+                            WHERE c3.torrent_id = t.id AND c3.run_id >= ?))
+                )
+            """, (ate_run_id, ate_run_id, ate_run_id), lote)
+            or _apagar_lote(conn, "torrent_snapshots", "run_id < ?", (ate_run_id,), lote))
+
+
+def apagar_torrents_removidos(conn, lote):
+    """Linhas da dimensao torrents de torrents removidos sem nenhum registro no log."""
+    return _apagar_lote(conn, "torrents", """
+        last_state = 'removed'
+        AND NOT EXISTS (SELECT 1 FROM torrent_changes c WHERE c.torrent_id = torrents.id)
+    """, (), lote)
+
+
+def apagar_rollups_horarios(conn, antes, lote):
+    return _apagar_lote(conn, "snapshot_rollups", "periodo = 'hora' AND inicio < ?",
+                        (antes.isoformat()[:13],), lote)
+
+
+def apagar_runs_antigos(conn, antes, lote):
+    """Runs antigos ja agregados (ou manuais), sempre mantendo o ultimo."""
+    return _apagar_lote(conn, "runs", """
+        started_at < ?
+        AND (agregado = 1 OR status NOT IN ('active', 'paused'))
+        AND id < (SELECT MAX(id) FROM runs)
+    """, (antes.isoformat(),), lote)
+
+
+def compactar_pause_events(conn, antes, lote):
+    """
+    Apaga eventos 'waiting' antigos e esvazia a lista de hashes das pausas e
+    restauracoes antigas (o estado atual fica em system_state/paused_torrents).
+    """
+    apagados = _apagar_lote(conn, "pause_events",
+                            "event_type = 'waiting' AND COALESCE(last_seen_at, event_at) < ?",
+                            (antes.isoformat(),), lote)
+    cur = conn.execute("""
+        UPDATE pause_events SET torrent_hashes = '[]'
+        WHERE rowid IN (
+            SELECT rowid FROM pause_events
+            WHERE event_at < ? AND event_type IN ('pause', 'restore')
+              AND torrent_hashes != '[]'
+            LIMIT ?
+        )
+    """, (antes.isoformat(), lote))
+    conn.commit()
+    return apagados + cur.rowcount
+
+
+def apagar_eventos_antigos(conn, antes, lote):
+    """Notificacoes (mantendo a ultima de cada tipo) e auth_events antigos."""
+    return (_apagar_lote(conn, "notifications", """
+                sent_at < ?
+                AND id NOT IN (SELECT MAX(id) FROM notifications GROUP BY event_type)
+            """, (antes.isoformat(),), lote)
+            or _apagar_lote(conn, "auth_events", "timestamp < ?", (antes.isoformat(),), lote))
+
+
+def auto_vacuum_incremental(conn):
+    return conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+
+def converter_auto_vacuum(conn):
+    """Liga auto_vacuum=INCREMENTAL num banco existente (VACUUM completo, bloqueia)."""
+    conn.commit()
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("VACUUM")
+
+
+def vacuum_incremental(conn, paginas):
+    """Devolve ao sistema ate 'paginas' paginas livres; retorna quantas restam."""
+    conn.execute(f"PRAGMA incremental_vacuum({int(paginas)})").fetchall()
+    conn.commit()
+    return conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+
+def registrar_compactacao(conn, inicio, completo, resumo):
+    conn.execute("""
+        INSERT INTO compactacoes (started_at, finished_at, completo, resumo)
+        VALUES (?, ?, ?, ?)
+    """, (inicio.isoformat(), datetime.now().isoformat(), 1 if completo else 0,
+          json.dumps(resumo)))
+    conn.commit()
+
+
+def ultima_compactacao_completa(conn):
+    row = conn.execute(
+        "SELECT MAX(started_at) FROM compactacoes WHERE completo = 1").fetchone()
+    return datetime.fromisoformat(row[0]) if row[0] else None
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# modulos/elegibilidade.py — Indice de elegibilidade do seed cleaner
+#
+# Um torrent cumpre TRACKER_RULES quando seeding_time chega ao maior minimo de
+# dias dos seus trackers. Com o torrent seedando, esse instante e fixo:
+#
+#   eligible_at = agora + (max(dias) * 86400 - seeding_time)
+#
+# A tabela seed_eligibility guarda, por hash, o grupo de cross-seed (ver
+# identidade.py), os hosts dos trackers, as regras casadas e eligible_at. Ela e
+# mantida a cada run fora do caminho critico, regravando so as linhas cujo
+# grupo, hosts, regras ou eligible_at mudaram:
+#
+#   - hash novo ou tracker atual fora dos hosts gravados → torrents_trackers()
+#   - regras recalculadas a partir dos hosts gravados (TRACKER_RULES mudou)
+#   - torrent parado/baixando: seeding_time nao anda e eligible_at atrasa;
+#     so e regravado quando desloca mais que TOLERANCIA
+#
+# O valor gravado nunca e posterior ao real, entao o seed cleaner busca os
+# candidatos com um SELECT indexado (eligible_at <= agora) e confirma cada um
+# com o seeding_time do inventario.
+
+from datetime import datetime, timedelta
+
+from modulos.db import ler_seed_eligibility, salvar_seed_eligibility
+from modulos.helpers import IndiceRegras, get_tracker_rules_for_torrent
+from modulos.identidade import indexar_identidade
+
+# Deslocamento de eligible_at que provoca regravacao
+TOLERANCIA = timedelta(hours=1)
+
+
+def _iso(dt):
+    return dt.isoformat(timespec="seconds") if dt is not None else None
+
+
+def atualizar_elegibilidade(conn, inventario, tracker_rules):
+    """
+    Atualiza seed_eligibility com o inventario do run.
+    Retorna (e guarda em inventario.elegibilidade) o resumo
+    {"torrents", "alterados", "removidos"}.
+    """
+    agora      = datetime.now()
+    indice     = IndiceRegras(tracker_rules)
+    identidade = indexar_identidade(inventario, conn)
+    anteriores = ler_seed_eligibility(conn)
+
+    linhas = {}
+    for t in inventario.todos():
+        anterior = anteriores.get(t.hash)
+        host     = inventario.host_atual(t.hash)
+        if anterior is None or (host and host not in anterior["hosts"]):
+            hosts = inventario.hosts_trackers(t.hash)
+        else:
+            hosts = anterior["hosts"]
+
+        regras      = get_tracker_rules_for_torrent(hosts, indice)
+        eligible_at = None
+        if regras:
+            faltam      = max(d for _, d in regras) * 86400 - (getattr(t, 'seeding_time', 0) or 0)
+            eligible_at = agora + timedelta(seconds=faltam)
+            if anterior and anterior["eligible_at"] and anterior["regras"] == regras:
+                gravado = datetime.fromisoformat(anterior["eligible_at"])
+                if abs(eligible_at - gravado) <= TOLERANCIA:
+                    eligible_at = gravado
+
+        linhas[t.hash] = {
+            "grupo":       identidade.get(t.hash, t.hash),
+            "hosts":       hosts,
+            "regras":      regras,
+            "eligible_at": eligible_at,
+        }
+    inventario.persistir_trackers()
+
+    alterados = {}
+    for h, e in linhas.items():
+        e["eligible_at"] = _iso(e["eligible_at"])
+        if anteriores.get(h) != e:
+            alterados[h] = e
+    removidos = [h for h in anteriores if h not in linhas]
+    salvar_seed_eligibility(conn, alterados, removidos)
+
+    inventario.elegibilidade = {
+        "torrents":  len(linhas),
+        "alterados": len(alterados),
+        "removidos": len(removidos),
+    }
+    return inventario.elegibilidade
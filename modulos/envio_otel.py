@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# modulos/envio_otel.py — Envio OTLP em segundo plano com spool em disco
+#
+# O flush() do otel.py so monta os payloads (logs, traces, metricas) e os
+# entrega aqui com enfileirar(). Uma thread envia cada um comprimido (gzip)
+# para o collector, sem segurar o run.
+#
+# Payload que falha (collector fora, timeout, HTTP >= 300) vai para o spool:
+# um JSONL append-only em DB_DIR/otel-spool.jsonl, limitado a SPOOL_MAX_MB
+# (acima disso as linhas mais antigas sao descartadas). Antes de enviar algo
+# novo a thread reenvia o spool na ordem em que foi gravado, juntando ate
+# LOTE_REENVIO payloads do mesmo sinal (logs, traces, metricas) num POST. Com o
+# collector ainda fora, o payload novo vai direto para o spool.
+#
+# aguardar_envio() limita o tempo de espera no fim do run (OTEL_PRAZO_ENVIO_SEGUNDOS):
+# o que nao foi enviado ate la (inclusive o POST em andamento) e gravado no
+# spool e sai no proximo run. Um POST que termine depois do prazo pode chegar
+# duas vezes ao collector — preferivel a perder o run.
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from importlib.util import find_spec
+
+# Config — sobrescritos por configurar_envio()
+_config = {
+    "spool":          None,       # caminho do JSONL (None = sem spool)
+    "spool_max_mb":   20,
+    "prazo_segundos": 5,
+}
+
+# Payloads do spool reenviados por POST
+LOTE_REENVIO = 50
+
+# Chave da lista de recursos de cada sinal (concatenada no reenvio em lote)
+_RECURSOS = {
+    "/v1/logs":    "resourceLogs",
+    "/v1/traces":  "resourceSpans",
+    "/v1/metrics": "resourceMetrics",
+}
+
+_trava    = threading.Condition()
+_fila     = deque()
+_estado   = {"thread": None, "em_envio": None, "falhas": 0, "seq": 0, "http": None}
+
+
+def configurar_envio(spool_dir=None, spool_max_mb=None, prazo_segundos=None):
+    if spool_dir is not None:
+        _config["spool"] = os.path.join(spool_dir, "otel-spool.jsonl")
+    if spool_max_mb is not None:
+        _config["spool_max_mb"] = spool_max_mb
+    if prazo_segundos is not None:
+        _config["prazo_segundos"] = prazo_segundos
+
+
+def http_disponivel():
+    # Sem importar o requests (so a thread de envio precisa dele)
+    return find_spec("requests") is not None
+
+
+# ----------------------------------------------------------------------
+# Spool (JSONL: {"id", "caminho", "ts", "payload"} por linha)
+# ----------------------------------------------------------------------
+def _ler_spool():
+    caminho = _config["spool"]
+    if not caminho or not os.path.exists(caminho):
+        return []
+    linhas = []
+    with open(caminho, encoding="utf-8") as f:
+        for linha in f:
+            try:
+                linhas.append(json.loads(linha))
+            except ValueError:
+                continue        # linha truncada (processo morto no meio da escrita)
+    return linhas
+
+
+def _reescrever_spool(itens):
+    caminho = _config["spool"]
+    if not itens:
+        if os.path.exists(caminho):
+            os.remove(caminho)
+        return
+    temp = caminho + ".tmp"
+    with open(temp, "w", encoding="utf-8") as f:
+        for item in itens:
+            f.write(json.dumps(item, separators=(",", ":")) + "\n")
+    os.replace(temp, caminho)
+
+
+def _gravar_spool(itens):
+    """Acrescenta itens ao spool, descartando os mais antigos acima do limite."""
+    caminho = _config["spool"]
+    if not caminho or not itens:
+        if itens:
+            print(f"   ⚠️  [OTEL] Sem spool configurado — {len(itens)} envio(s) descartado(s)")
+        return
+    novas  = [json.dumps(i, separators=(",", ":")) + "\n" for i in itens]
+    limite = int(_config["spool_max_mb"] * 1024 ** 2)
+    with _trava:
+        try:
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            atual = os.path.getsize(caminho) if os.path.exists(caminho) else 0
+            if atual + sum(len(l.encode()) for l in novas) <= limite:
+                with open(caminho, "a", encoding="utf-8") as f:
+                    f.writelines(novas)
+            else:
+                # Mantem as linhas mais novas que cabem no limite
+                todas = [json.dumps(i, separators=(",", ":")) + "\n" for i in _ler_spool()] + novas
+                total, inicio = 0, len(todas)
+                while inicio > 0 and total + len(todas[inicio - 1].encode()) <= limite:
+                    inicio -= 1
+                    total  += len(todas[inicio].encode())
+                _reescrever_spool([json.loads(l) for l in todas[inicio:]])
+                print(f"   ⚠️  [OTEL] Spool no limite ({_config['spool_max_mb']} MB) — "
+                      f"{inicio} envio(s) antigo(s) descartado(s)")
+        except OSError as e:
+            print(f"   ❌ [OTEL] Erro ao gravar o spool {caminho}: {e}")
+            return
+    print(f"   💾 [OTEL] {len(itens)} envio(s) guardado(s) no spool para o próximo run")
+
+
+def _remover_do_spool(ids):
+    with _trava:
+        try:
+            _reescrever_spool([i for i in _ler_spool() if i.get("id") not in ids])
+        except OSError as e:
+            print(f"   ❌ [OTEL] Erro ao atualizar o spool: {e}")
+
+
+# ----------------------------------------------------------------------
+# HTTP
+# ----------------------------------------------------------------------
+def _post(endpoint, caminho, payload):
+    """POST gzip do payload. Retorna (ok, motivo)."""
+    import gzip
+    import requests
+
+    if _estado["http"] is None:
+        _estado["http"] = requests.Session()
+    corpo = gzip.compress(json.dumps(payload, separators=(",", ":")).encode(), 6)
+    try:
+        resp = _estado["http"].post(
+            f"{endpoint}{caminho}",
+            data=corpo,
+            headers={"Content-Type": "application/json", "Content-Encoding": "gzip"},
+            timeout=_config["prazo_segundos"],
+        )
+    except Exception as e:
+        return False, str(e)
+    if resp.status_code < 300:
+        return True, None
+    return False, f"HTTP {resp.status_code}"
+
+
+def _reenviar_spool(endpoint):
+    """
+    Reenvia o spool em lotes de ate LOTE_REENVIO payloads do mesmo sinal,
+    mantendo a ordem de gravacao dentro de cada sinal. Retorna True se esvaziou.
+    """
+    with _trava:
+        pendentes = _ler_spool()
+    if not pendentes:
+        return True
+
+    por_sinal = {}
+    for item in pendentes:
+        por_sinal.setdefault(item["caminho"], []).append(item)
+
+    enviados = 0
+    for caminho, itens in por_sinal.items():
+        chave = _RECURSOS.get(caminho)
+        for i in range(0, len(itens), LOTE_REENVIO):
+            lote    = itens[i:i + LOTE_REENVIO]
+            payload = {chave: [r for item in lote for r in item["payload"].get(chave, [])]}
+            ok, motivo = _post(endpoint, caminho, payload)
+            if not ok:
+                print(f"   ⚠️  [OTEL] Reenvio do spool falhou ({motivo}) — "
+                      f"{len(pendentes) - enviados} envio(s) continuam guardados")
+                return False
+            _remover_do_spool({item["id"] for item in lote})
+            enviados += len(lote)
+    print(f"   ✅ [OTEL] Spool reenviado ({enviados} envio(s) de runs anteriores)")
+    return True
+
+
+def _trabalhar():
+    while True:
+        with _trava:
+            while not _fila:
+                _trava.wait()
+            item = _fila.popleft()
+            _estado["em_envio"] = item
+
+        # Nenhuma excecao pode matar a thread nem deixar em_envio preso: o
+        # aguardar_envio() do run esperaria o prazo inteiro a cada ciclo
+        try:
+            ok, motivo = False, "collector indisponível"
+            try:
+                if _reenviar_spool(item["endpoint"]):
+                    ok, motivo = _post(item["endpoint"], item["caminho"], item["payload"])
+            except Exception as e:
+                ok, motivo = False, f"{type(e).__name__}: {e}"
+
+            with _trava:
+                # aguardar_envio() ja gravou este item no spool se o prazo acabou
+                if ok:
+                    print(f"   ✅ [OTEL] {item['descricao']}")
+                elif not item.get("abandonado"):
+                    print(f"   ⚠️  [OTEL] Falha ao enviar {item['caminho']}: {motivo}")
+                    _estado["falhas"] += 1
+                    _gravar_spool([_para_spool(item)])
+        except Exception as e:
+            print(f"   ❌ [OTEL] Erro ao processar {item['caminho']}: {e}")
+        finally:
+            with _trava:
+                _estado["em_envio"] = None
+                _trava.notify_all()
+
+
+def _para_spool(item):
+    return {k: item[k] for k in ("id", "caminho", "ts", "payload")}
+
+
+# ----------------------------------------------------------------------
+# API
+# ----------------------------------------------------------------------
+def enfileirar(endpoint, caminho, payload, descricao):
+    """Entrega um payload OTLP a thread de envio (retorna na hora)."""
+    with _trava:
+        _estado["seq"] += 1
+        _fila.append({
+            "id":        f"{time.time_ns():x}-{os.getpid()}-{_estado['seq']}",
+            "endpoint":  endpoint,
+            "caminho":   caminho,
+            "ts":        time.time(),
+            "payload":   payload,
+            "descricao": descricao,
+        })
+        if _estado["thread"] is None or not _estado["thread"].is_alive():
+            _estado["thread"] = threading.Thread(target=_trabalhar, name="otel-envio", daemon=True)
+            _estado["thread"].start()
+        _trava.notify_all()
+
+
+def aguardar_envio(prazo_segundos=None):
+    """
+    Espera a fila esvaziar por ate prazo_segundos (padrao: OTEL_PRAZO_ENVIO_SEGUNDOS).
+    O que sobrar vai para o spool. Retorna True se tudo que foi enfileirado desde
+    a ultima chamada chegou ao collector.
+    """
+    prazo  = _config["prazo_segundos"] if prazo_segundos is None else prazo_segundos
+    limite = time.monotonic() + prazo
+    with _trava:
+        while _fila or _estado["em_envio"] is not None:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            _trava.wait(restante)
+        sobras = list(_fila)
+        falhas = _estado["falhas"]
+        _estado["falhas"] = 0
+        _fila.clear()
+        if _estado["em_envio"] is not None:
+            _estado["em_envio"]["abandonado"] = True
+            sobras.insert(0, _estado["em_envio"])
+    if sobras:
+        print(f"   ⏱️  [OTEL] Prazo de envio ({prazo}s) esgotado")
+        _gravar_spool([_para_spool(i) for i in sobras])
+        return False
+    return falhas == 0
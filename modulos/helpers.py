@@ -2,20 +2,91 @@
 # modulos/helpers.py — Utilitarios compartilhados
 
 import shutil
+from functools import lru_cache
 from urllib.parse import urlparse
-from modulos.db import (
-    minutos_desde_ultima_notificacao,
-    registrar_notificacao,
-)
 
 
-def extrair_dominio_tracker(url):
+# Os mesmos announce URLs se repetem em milhares de torrents: o parse e
+# memoizado e compartilhado por inventario, limpeza e tracker_list.
+@lru_cache(maxsize=65536)
+def extrair_host_tracker(url):
     try:
-        domain = urlparse(url).netloc.lower().split(':')[0]
-        parts  = domain.split('.')
-        return '.'.join(parts[-2:]) if len(parts) >= 2 else domain
+        return urlparse(url).netloc.lower().split('@')[-1].split(':')[0]
     except:
+        return ""
+
+
+@lru_cache(maxsize=65536)
+def dominio_de_host(host):
+    if not host:
         return "unknown"
+    parts = host.split('.')
+    return '.'.join(parts[-2:]) if len(parts) >= 2 else host
+
+
+def extrair_dominio_tracker(url):
+    return dominio_de_host(extrair_host_tracker(url))
+
+
+def _normalizar_dominio(dominio):
+    dominio = dominio.strip().lower().rstrip('.')
+    for prefixo in ("*.", "."):
+        if dominio.startswith(prefixo):
+            dominio = dominio[len(prefixo):]
+    return dominio
+
+
+class IndiceRegras:
+    """
+    TRACKER_RULES compilado em um indice de sufixos de dominio.
+
+    Uma regra "ab.cc" vale para o host "ab.cc" e qualquer subdominio
+    ("tracker.ab.cc"), mas nao para "xab.cc". Com varias regras para o
+    mesmo host vence a mais especifica (sufixo mais longo). O resultado
+    por host e memoizado, entao cada announce URL custa um lookup.
+
+    Uso:
+        indice = IndiceRegras(TRACKER_RULES)
+        indice.regra("tracker.ab.cc")   # -> ("ab.cc", 30) ou None
+    """
+
+    def __init__(self, tracker_rules):
+        self.sufixos = {}
+        for dominio, dias in (tracker_rules or {}).items():
+            self.sufixos[_normalizar_dominio(dominio)] = (dominio, dias)
+        self._por_host = {}
+
+    def __bool__(self):
+        return bool(self.sufixos)
+
+    def __len__(self):
+        return len(self.sufixos)
+
+    def regra(self, host):
+        try:
+            return self._por_host[host]
+        except KeyError:
+            pass
+        encontrada = None
+        labels = host.split('.') if host else []
+        for i in range(len(labels)):
+            encontrada = self.sufixos.get('.'.join(labels[i:]))
+            if encontrada is not None:
+                break
+        self._por_host[host] = encontrada
+        return encontrada
+
+
+def get_tracker_rules_for_torrent(hosts, indice):
+    """Regras (dominio, dias) que se aplicam aos hosts de um torrent."""
+    if not isinstance(indice, IndiceRegras):
+        indice = IndiceRegras(indice)
+    rules = []
+    for host in hosts:
+        regra = indice.regra(host)
+        if regra is not None:
+            rules.append(regra)
+    return rules
 
 
 def verificar_espacos(paths_config):
@@ -49,6 +120,18 @@ def verificar_espacos(paths_config):
     return resultados
 
 
+def disco_do_caminho(caminho, espacos):
+    """Nome do disco (chave de espacos) cujo path contem o caminho, ou None."""
+    if not caminho:
+        return None
+    for nome, info in espacos.items():
+        for p in info["paths"]:
+            raiz = p.rstrip('/')
+            if caminho == raiz or caminho.startswith(raiz + '/'):
+                return nome
+    return None
+
+
 def imprimir_espacos(espacos):
     for nome, info in espacos.items():
         icon = "🔴" if info["critico"] else "🟢" if info["ok"] else "🟡"
@@ -56,37 +139,25 @@ def imprimir_espacos(espacos):
               f"(min: {info['limite_min']}, max: {info['limite_max']})")
 
 
-def obter_contagem_checking_moving(client):
-    todos    = client.torrents_info()
-    checking = [t for t in todos if t.state in ('checkingDL', 'checkingUP', 'checkingResumeData')]
-    moving   = [t for t in todos if t.state == 'moving']
+def obter_contagem_checking_moving(inventario):
+    checking = inventario.por_estado('checkingDL', 'checkingUP', 'checkingResumeData')
+    moving   = inventario.por_estado('moving')
     return len(checking), len(moving), checking, moving
 
 
-def obter_downloads_ativos(client):
-    return [
-        t for t in client.torrents_info()
-        if t.state == 'forcedDL'
-    ]
+def obter_downloads_ativos(inventario):
+    return inventario.por_estado('forcedDL')
 
 
-def construir_tracker_map(client, todos_torrents):
-    tracker_map = {}
-    for t in todos_torrents:
-        try:
-            for tr in client.torrents_trackers(t.hash):
-                if tr.url and not tr.url.startswith('**'):
-                    tracker_map[t.hash] = extrair_dominio_tracker(tr.url)
-                    break
-        except:
-            pass
-        if t.hash not in tracker_map:
-            tracker_map[t.hash] = 'unknown'
-    return tracker_map
+def construir_tracker_map(inventario):
+    return inventario.tracker_map()
 
 
 def notificar_se_necessario(conn, run_id, event_type, enviar_notificacao_fn,
                              intervalo_minutos=60):
+    # Import local: helpers tambem serve subcomandos sem banco (--check-config)
+    from modulos.db import confirmar, minutos_desde_ultima_notificacao, registrar_notificacao
+
     NOTIFICACOES = {
         'paused':         ("Torrents Status",          "Downloads Pausados",     1),
         'restored':       ("Torrents Status",          "Download em andamento",  0),
@@ -114,6 +185,7 @@ def notificar_se_necessario(conn, run_id, event_type, enviar_notificacao_fn,
                   f"(intervalo: {intervalo_minutos} min) — pulando")
             return
 
-    enviar_notificacao_fn(titulo, mensagem, priority, event_type)
-    registrar_notificacao(conn, run_id, event_type, titulo, mensagem)
-    print(f"   📲 Notificação '{event_type}' enviada — {titulo}: {mensagem}")
+    notificacao_id = registrar_notificacao(conn, run_id, event_type, titulo, mensagem, priority)
+    confirmar(conn)
+    enviar_notificacao_fn(titulo, mensagem, priority, event_type, notificacao_id=notificacao_id)
+    print(f"   📲 Notificação '{event_type}' disparada — {titulo}: {mensagem}")
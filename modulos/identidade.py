@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# modulos/identidade.py — Agrupamento de cross-seeds pela identidade do conteudo
+#
+# O seed cleaner agrupava cross-seeds pelo nome do torrent: cross-seeds com a
+# raiz renomeada ficavam separados e torrents diferentes com o mesmo nome
+# eram acoplados. Aqui cada torrent recebe chaves de identidade e torrents que
+# compartilham qualquer chave caem no mesmo grupo (union-find, O(n)):
+#
+#   cp:<content_path>               mesmo dado no disco (exceto content_path
+#                                   igual ao save_path: multi-arquivo sem
+#                                   pasta raiz, que nao identifica o conteudo)
+#   v2:<infohash_v2>                mesmo info dict v2 (torrents hibridos/v2)
+#   fp:<tamanho>:<impressao>        mesmo tamanho total e mesma lista de
+#                                   arquivos (raiz renomeada)
+#
+# A impressao (quantidade de arquivos + hash dos caminhos relativos a raiz e
+# tamanhos) so e calculada para torrents com tamanho total repetido e
+# content_path diferente — sao os unicos que podem ser cross-seeds
+# renomeados. Ela nao muda para um hash, entao fica salva na tabela
+# content_identity junto com o grupo de cada torrent. Uma consulta que falha
+# (torrents_files indisponivel, torrent sumiu no meio do run) tambem fica
+# gravada (falha_at) e so e repetida depois de NOVA_TENTATIVA.
+
+import hashlib
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from modulos.db import confirmar, ler_identidade_conteudo, salvar_identidade_conteudo
+
+# Intervalo minimo entre consultas torrents_files() de um hash que falhou
+NOVA_TENTATIVA = timedelta(hours=6)
+
+
+class UniaoBusca:
+    """Union-find com compressao de caminho (halving)."""
+
+    def __init__(self):
+        self.pai = {}
+
+    def achar(self, x):
+        pai = self.pai
+        if x not in pai:
+            pai[x] = x
+            return x
+        while pai[x] != x:
+            pai[x] = pai[pai[x]]
+            x = pai[x]
+        return x
+
+    def unir(self, a, b):
+        ra, rb = self.achar(a), self.achar(b)
+        if ra != rb:
+            self.pai[rb] = ra
+
+
+def _caminho_relativo(nome):
+    """Caminho do arquivo sem a pasta raiz (a parte que muda no cross-seed renomeado)."""
+    partes = nome.replace("\\", "/").split("/", 1)
+    return partes[1] if len(partes) == 2 else partes[0]
+
+
+def impressao_arquivos(arquivos):
+    """
+    Impressao da lista de arquivos: "<quantidade>:<hash curto>" dos pares
+    (caminho relativo a raiz, tamanho), ordenados.
+    """
+    pares = sorted(f"{_caminho_relativo(f.name)}\0{f.size}" for f in arquivos)
+    return f"{len(pares)}:" + hashlib.sha1("\n".join(pares).encode()).hexdigest()[:16]
+
+
+def _impressao_torrent(client, torrent_hash):
+    try:
+        return impressao_arquivos(client.torrents_files(torrent_hash=torrent_hash))
+    except Exception:
+        return None
+
+
+def indexar_identidade(inventario, conn=None):
+    """
+    Monta o indice de identidade de conteudo do inventario do run.
+
+    Retorna {hash: grupo} — grupo e o menor hash do grupo, estavel entre runs.
+    """
+    torrents = inventario.todos()
+    cache    = ler_identidade_conteudo(conn) if conn is not None else {}
+    uniao    = UniaoBusca()
+
+    por_tamanho = defaultdict(list)
+    for t in torrents:
+        uniao.achar(t.hash)
+        content_path = (getattr(t, 'content_path', '') or '').rstrip('/')
+        if content_path == (getattr(t, 'save_path', '') or '').rstrip('/'):
+            content_path = ''
+        if content_path:
+            uniao.unir(t.hash, "cp:" + content_path)
+        v2 = getattr(t, 'infohash_v2', '') or ''
+        if v2:
+            uniao.unir(t.hash, "v2:" + v2)
+        tamanho = getattr(t, 'total_size', 0) or getattr(t, 'size', 0)
+        if tamanho:
+            por_tamanho[tamanho].append((t, content_path))
+
+    impressoes = {}
+    falhas     = {}
+    buscas     = 0
+    agora      = datetime.now()
+    for tamanho, lista in por_tamanho.items():
+        caminhos = {cp for _, cp in lista}
+        if len(lista) < 2 or (len(caminhos) < 2 and '' not in caminhos):
+            continue
+        for t, _ in lista:
+            anterior  = cache.get(t.hash) or {}
+            impressao = anterior.get("impressao")
+            if impressao is None or ":" not in impressao:    # ausente ou formato antigo
+                falha_at = anterior.get("falha_at")
+                if falha_at and agora - datetime.fromisoformat(falha_at) < NOVA_TENTATIVA:
+                    continue
+                impressao = _impressao_torrent(inventario.client, t.hash)
+                buscas += 1
+                if impressao is None:
+                    falhas[t.hash] = agora.isoformat(timespec="seconds")
+            if impressao:
+                impressoes[t.hash] = impressao
+                uniao.unir(t.hash, f"fp:{tamanho}:{impressao}")
+
+    # Id do grupo = menor hash entre os membros
+    menor = {}
+    for t in torrents:
+        raiz = uniao.achar(t.hash)
+        if raiz not in menor or t.hash < menor[raiz]:
+            menor[raiz] = t.hash
+    grupos = {t.hash: menor[uniao.achar(t.hash)] for t in torrents}
+
+    inventario.files_fetches += buscas
+    if conn is not None:
+        alterados = {}
+        for h, g in grupos.items():
+            anterior = cache.get(h) or {}
+            entrada  = {
+                "grupo":     g,
+                "impressao": impressoes.get(h, anterior.get("impressao")),
+                "falha_at":  falhas.get(h, None if h in impressoes else anterior.get("falha_at")),
+            }
+            if entrada != anterior:
+                alterados[h] = entrada
+        salvar_identidade_conteudo(conn, alterados, set(cache) - set(grupos))
+        confirmar(conn)     # antes das buscas de trackers que vem em seguida
+    return grupos
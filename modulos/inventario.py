@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# modulos/inventario.py — Inventario de torrents compartilhado durante um run
+#
+# Busca a lista completa de torrents uma unica vez e indexa por hash, estado
+# e tracker. Os modulos (checagem_disco, ativacao, limpeza) recebem o mesmo
+# inventario e so provocam uma nova busca depois de uma acao que altera o
+# estado dos torrents (pausa, restauracao, delecao) via invalidar().
+#
+# Com um EspelhoTorrents (modulos/sincronizacao.py) cada busca e um delta do
+# sync/maindata aplicado ao espelho local, em vez do torrents_info completo.
+#
+# Os trackers de cada torrent ficam no cache tracker_cache (SQLite): so ha
+# chamada torrents_trackers() para hashes novos, para entradas com TTL
+# expirado ou quando o campo 'tracker' do torrents_info aponta para um host
+# que nao esta no cache.
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from modulos.db import ler_tracker_cache, salvar_tracker_cache, remover_tracker_cache
+from modulos.helpers import extrair_host_tracker, dominio_de_host
+
+
+class CacheTrackers:
+    """
+    Cache hash -> hosts dos trackers, persistido na tabela tracker_cache.
+    Carregado do banco sob demanda; no modo daemon a mesma instancia e
+    reaproveitada entre os ciclos.
+    """
+
+    def __init__(self, conn=None, ttl_horas=None):
+        self.conn      = conn
+        self.ttl       = timedelta(hours=ttl_horas) if ttl_horas else None
+        self._entradas = None   # hash -> {"hosts": [...], "fetched_at": datetime}
+        self._pendente = {}     # entradas novas ainda nao gravadas
+
+    def _carregar(self):
+        if self._entradas is None:
+            self._entradas = ler_tracker_cache(self.conn) if self.conn else {}
+
+    def valido(self, torrent_hash, hint=''):
+        """Hosts em cache se ainda validos (TTL e hint do torrents_info), senao None."""
+        self._carregar()
+        entrada = self._entradas.get(torrent_hash)
+        if entrada is None:
+            return None
+        if self.ttl and datetime.now() - entrada["fetched_at"] > self.ttl:
+            return None
+        if hint and hint not in entrada["hosts"]:
+            return None
+        return entrada["hosts"]
+
+    def registrar(self, torrent_hash, hosts):
+        self._carregar()
+        entrada = {"hosts": hosts, "fetched_at": datetime.now()}
+        self._entradas[torrent_hash] = entrada
+        self._pendente[torrent_hash] = entrada
+
+    def persistir(self, hashes_atuais=None):
+        """Grava entradas novas; se hashes_atuais for informado, remove as que sairam."""
+        if not self.conn or self._entradas is None:
+            return
+        salvar_tracker_cache(self.conn, self._pendente)
+        self._pendente = {}
+        if hashes_atuais is not None:
+            removidos = [h for h in self._entradas if h not in hashes_atuais]
+            remover_tracker_cache(self.conn, removidos)
+            for h in removidos:
+                del self._entradas[h]
+
+
+class InventarioTorrents:
+    """
+    Lista de torrents do run, com indices e contadores de busca.
+
+    Uso:
+        inventario = InventarioTorrents(client, conn, espelho=EspelhoTorrents(client, conn))
+        inventario.todos()                      # lista completa
+        inventario.por_estado('forcedDL')       # filtrado por estado
+        inventario.por_hash(h)                  # torrent ou None
+        inventario.tracker_map()                # hash -> dominio principal
+        inventario.hosts_trackers(h)            # hosts dos trackers (cache SQLite)
+        inventario.invalidar()                  # proxima leitura busca de novo
+        inventario.persistir_trackers()         # grava o cache de trackers
+    """
+
+    def __init__(self, client, conn=None, tracker_ttl_horas=None, espelho=None,
+                 cache_trackers=None):
+        self.client  = client
+        self.conn    = conn
+        self.espelho = espelho
+        self.cache_trackers   = cache_trackers or CacheTrackers(conn, tracker_ttl_horas)
+        self.fetches          = 0   # buscas feitas na API (torrents_info ou delta do sync)
+        self.fetches_evitados = 0   # todos()/por_estado() atendidos sem nova busca
+        self.tracker_fetches  = 0   # chamadas torrents_trackers() feitas
+        self.sync_alterados   = 0   # torrents recebidos nos deltas do sync/maindata
+        self.files_fetches    = 0   # chamadas torrents_files() feitas (identidade de conteudo)
+        self.elegibilidade    = None  # resumo da atualizacao do seed_eligibility neste run
+        self._torrents   = []
+        self._por_hash   = {}
+        self._por_estado = defaultdict(list)
+        self._sujo       = True
+
+    # ------------------------------------------------------------------
+    # Carga e invalidacao
+    # ------------------------------------------------------------------
+    def _buscar(self):
+        if self.espelho is not None:
+            try:
+                torrents = self.espelho.atualizar()
+                self.sync_alterados += self.espelho.ultimo_delta["alterados"]
+                return torrents
+            except Exception as e:
+                print(f"   ⚠️  sync/maindata indisponível ({e}) — usando torrents_info")
+                self.espelho = None
+        return list(self.client.torrents_info())
+
+    def _carregar(self):
+        self._torrents   = self._buscar()
+        self._por_hash   = {t.hash: t for t in self._torrents}
+        self._por_estado = defaultdict(list)
+        for t in self._torrents:
+            self._por_estado[t.state].append(t)
+        self.fetches += 1
+        self._sujo    = False
+
+    def _garantir(self, consumidor=False):
+        # So as entradas publicas de lista (um consumidor ou fase que antes
+        # buscava na API) contam como busca evitada; por_hash() em laco nao
+        if self._sujo:
+            self._carregar()
+        elif consumidor:
+            self.fetches_evitados += 1
+
+    def invalidar(self):
+        """Marca o inventario como desatualizado apos uma acao que muda estado."""
+        self._sujo = True
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+    def todos(self):
+        self._garantir(consumidor=True)
+        return self._torrents
+
+    def por_estado(self, *estados):
+        self._garantir(consumidor=True)
+        resultado = []
+        for estado in estados:
+            resultado.extend(self._por_estado.get(estado, []))
+        return resultado
+
+    def por_hash(self, torrent_hash):
+        self._garantir()
+        return self._por_hash.get(torrent_hash)
+
+    # ------------------------------------------------------------------
+    # Trackers (via CacheTrackers)
+    # ------------------------------------------------------------------
+    def host_atual(self, torrent_hash):
+        """Host do tracker atual (campo 'tracker' do torrents_info), ou ''."""
+        t = self._por_hash.get(torrent_hash)
+        url = getattr(t, 'tracker', '') if t is not None else ''
+        return extrair_host_tracker(url) if url else ''
+
+    def hosts_trackers(self, torrent_hash):
+        """
+        Hosts dos trackers do torrent (sem DHT/PeX/LSD), na ordem do qBittorrent.
+        So chama torrents_trackers() para hashes novos, com TTL expirado ou
+        cujo tracker atual (campo 'tracker' do torrents_info) nao esta no cache.
+        """
+        hosts = self.cache_trackers.valido(torrent_hash, self.host_atual(torrent_hash))
+        if hosts is not None:
+            return hosts
+
+        hosts = []
+        try:
+            for tr in self.client.torrents_trackers(torrent_hash):
+                url = getattr(tr, 'url', '') or ''
+                if not url or url.startswith('**'):
+                    continue
+                host = extrair_host_tracker(url)
+                if host and host not in hosts:
+                    hosts.append(host)
+        except Exception:
+            return []
+        self.tracker_fetches += 1
+        self.cache_trackers.registrar(torrent_hash, hosts)
+        return hosts
+
+    def tracker_principal(self, torrent_hash, padrao='unknown'):
+        """
+        Dominio do tracker atual (campo 'tracker' do torrents_info); sem ele, o
+        do primeiro host dos trackers. A mesma regra com ou sem cache: o cache
+        so vale quando contem o tracker atual (CacheTrackers.valido).
+        """
+        hint = self.host_atual(torrent_hash)
+        if hint:
+            return dominio_de_host(hint)
+        hosts = self.hosts_trackers(torrent_hash)
+        return dominio_de_host(hosts[0]) if hosts else padrao
+
+    def persistir_trackers(self):
+        """Grava no banco as entradas novas e remove hashes que sairam do qBittorrent."""
+        self.cache_trackers.persistir(None if self._sujo else self._por_hash)
+
+    def tracker_map(self, padrao='unknown'):
+        return {t.hash: self.tracker_principal(t.hash, padrao) for t in self.todos()}
+
+    def por_tracker(self, padrao='no_tracker'):
+        indice = defaultdict(list)
+        for t in self.todos():
+            indice[self.tracker_principal(t.hash, padrao)].append(t)
+        return dict(indice)
+
+    def resumo(self):
+        return {
+            "fetches":          self.fetches,
+            "fetches_evitados": self.fetches_evitados,
+            "tracker_fetches":  self.tracker_fetches,
+            "sync_alterados":   self.sync_alterados,
+            "files_fetches":    self.files_fetches,
+        }
@@ -1,33 +1,211 @@
 #!/usr/bin/env python3
 # modulos/limpeza.py — Seed Cleaner (limpeza de torrents por tempo de seeding)
 
+import shutil
 import time
 from collections import defaultdict
-from modulos.helpers import extrair_dominio_tracker
-from modulos.db import salvar_seed_deletions
-from modulos.otel import log, log_seed_cleaner
+from datetime import datetime
+from modulos.acoes import executar_em_lote
+from modulos.helpers import disco_do_caminho
+from modulos.db import (
+    salvar_seed_deletions,
+    atualizar_run,
+    ler_candidatos_elegiveis,
+    salvar_seed_eligibility,
+    confirmar,
+)
+from modulos.conteudo import AnalisadorConteudo
+from modulos.elegibilidade import atualizar_elegibilidade
+from modulos.inventario import InventarioTorrents
+from modulos.otel import log, log_seed_cleaner, span
 
 
-def get_tracker_rules_for_torrent(trackers, tracker_rules):
-    rules = []
-    for tracker in trackers:
-        url = tracker.get("url", "") if isinstance(tracker, dict) else getattr(tracker, 'url', '')
-        if url.startswith("**"):
+GB = 1024 ** 3
+
+# Espera fixa usada antes do watcher — base para calcular o tempo economizado
+ESPERA_FIXA_ANTERIOR = 120
+
+# Fracao dos bytes esperados que conta como liberacao concluida
+# (metadados, arquivos extras do torrent, arredondamento do filesystem)
+FRACAO_LIBERADA = 0.9
+
+
+def bytes_liberados(grupo):
+    """Tamanho do grupo segundo o qBittorrent: cross-seeds com o mesmo content_path contam uma vez."""
+    por_conteudo = {}
+    for t in grupo:
+        chave = t["content_path"] or t["hash"]
+        por_conteudo[chave] = max(por_conteudo.get(chave, 0), t["size"])
+    return sum(por_conteudo.values())
+
+
+def _preferencia(g):
+    # Mais antigo no seed primeiro, depois maior ratio
+    return (-g["dias"], -g["ratio"])
+
+
+def _escolher_para_disco(candidatos, necessario):
+    """
+    Conjunto pequeno de grupos cuja soma de bytes cobre 'necessario'.
+
+    1. Se algum grupo sozinho cobre a necessidade, escolhe o menor deles.
+    2. Senao, guloso pelos maiores ate cobrir e depois descarta os que
+       se tornaram desnecessarios (menores primeiro).
+    """
+    # Grupos cujos arquivos tem hardlink fora do conjunto nao liberam nada
+    candidatos  = [g for g in candidatos if g["bytes"] > 0]
+    suficientes = [g for g in candidatos if g["bytes"] >= necessario]
+    if suficientes:
+        return [min(suficientes, key=lambda g: (g["bytes"],) + _preferencia(g))]
+
+    escolhidos = []
+    total      = 0
+    for g in sorted(candidatos, key=lambda g: (-g["bytes"],) + _preferencia(g)):
+        if total >= necessario:
+            break
+        escolhidos.append(g)
+        total += g["bytes"]
+
+    for g in sorted(escolhidos, key=lambda g: (g["bytes"],) + tuple(-x for x in _preferencia(g))):
+        if total - g["bytes"] >= necessario:
+            escolhidos.remove(g)
+            total -= g["bytes"]
+    return escolhidos
+
+
+def selecionar_grupos(grupos, espacos, discos_criticos):
+    """
+    Escolhe os grupos elegiveis necessarios para levar cada disco critico
+    de volta a limite_max. Grupos sem disco identificado (save_path fora dos
+    paths configurados, ex.: qBittorrent em container) contam para todos.
+
+    Retorna (selecionados, necessidade_gb {disco: GB}, projecao_gb {disco: GB livre}).
+    """
+    necessidade = {nome: max(0.0, espacos[nome]["limite_max"] - espacos[nome]["livre"])
+                   for nome in discos_criticos}
+    restante    = {nome: gb * GB for nome, gb in necessidade.items()}
+    selecionados = []
+    ja_escolhidos = set()
+
+    for nome in discos_criticos:
+        if restante[nome] <= 0:
             continue
-        domain = extrair_dominio_tracker(url)
-        for rule_domain, days in tracker_rules.items():
-            if rule_domain in domain:
-                rules.append((rule_domain, days))
-                break
-    return rules
+        candidatos = [g for g in grupos
+                      if id(g) not in ja_escolhidos and g["disco"] in (nome, None)]
+        for g in _escolher_para_disco(candidatos, restante[nome]):
+            selecionados.append(g)
+            ja_escolhidos.add(id(g))
+            for outro in discos_criticos:
+                if g["disco"] in (outro, None):
+                    restante[outro] -= g["bytes"]
+
+    projecao = {}
+    for nome in discos_criticos:
+        liberado = sum(g["bytes"] for g in selecionados if g["disco"] in (nome, None))
+        projecao[nome] = espacos[nome]["livre"] + liberado / GB
+    return selecionados, necessidade, projecao
+
+
+def _livre_bytes(paths):
+    livre = None
+    for path in paths:
+        try:
+            free = shutil.disk_usage(path).free
+        except OSError:
+            free = 0
+        if livre is None or free < livre:
+            livre = free
+    return livre or 0
+
+
+def _agrupar_por_disco(torrents):
+    por_disco = defaultdict(list)
+    for t in torrents:
+        por_disco[t["disco"]].append(t)
+    return por_disco
+
 
+def _hashes_restantes(client, hashes):
+    try:
+        return {t.hash for t in client.torrents_info(torrent_hashes="|".join(hashes))}
+    except Exception:
+        return set(hashes)
 
-def executar_seed_cleaner(client, conn, run_id, espacos, tracker_rules, dry_run):
+
+def _esperado_por_disco(por_disco, discos):
+    """{disco|None: bytes} → {disco: bytes}; bytes sem disco identificado contam para todos."""
+    return {nome: por_disco.get(nome, 0) + por_disco.get(None, 0) for nome in discos}
+
+
+def aguardar_liberacao(client, espacos, deletados, livre_antes, prazo_segundos,
+                       esperado=None):
+    """
+    Espera o qBittorrent remover os torrents e o filesystem devolver o espaco.
+
+    Consulta shutil.disk_usage dos discos afetados e torrents_info dos hashes
+    apagados com backoff exponencial (1s, 2s, 4s... ate 15s). Retorna assim
+    que os hashes sumiram e cada disco recuperou FRACAO_LIBERADA dos bytes
+    esperados (ou ja esta acima de limite_max), ou quando o prazo acaba.
+
+    livre_antes: {disco: bytes livres medidos antes da delecao}
+    esperado:    {disco: bytes recuperaveis}; sem ele usa o size do qBittorrent.
+                 Disco sem bytes esperados (conteudo todo com hardlink em outro
+                 lugar) nao entra na espera — downloads ativos podem deixar o
+                 liberado negativo e ele nunca chegaria a FRACAO_LIBERADA.
+    Retorna {"segundos", "completo", "esperado_gb", "liberado_gb"}.
+    """
+    if esperado is None:
+        por_disco = defaultdict(int)
+        for disco, grupo in _agrupar_por_disco(deletados).items():
+            por_disco[disco] += bytes_liberados(grupo)
+        esperado = _esperado_por_disco(por_disco, livre_antes)
+
+    inicio    = time.monotonic()
+    pendentes = [t["hash"] for t in deletados]
+    espera    = 1.0
+    liberado  = {nome: 0 for nome in livre_antes}
+    discos    = [nome for nome in livre_antes if esperado.get(nome, 0) > 0]
+    while True:
+        if pendentes:
+            pendentes = list(_hashes_restantes(client, pendentes))
+
+        concluido = not pendentes
+        for nome in discos:
+            livre_agora    = _livre_bytes(espacos[nome]["paths"])
+            liberado[nome] = livre_agora - livre_antes[nome]
+            acima_do_max   = livre_agora >= espacos[nome]["limite_max"] * GB
+            if liberado[nome] < esperado[nome] * FRACAO_LIBERADA and not acima_do_max:
+                concluido = False
+
+        decorrido = time.monotonic() - inicio
+        if concluido or decorrido >= prazo_segundos:
+            break
+        time.sleep(min(espera, prazo_segundos - decorrido))
+        espera = min(espera * 2, 15)
+
+    return {
+        "segundos":    round(time.monotonic() - inicio, 1),
+        "completo":    concluido,
+        "esperado_gb": round(sum(esperado.values()) / GB, 2),
+        "liberado_gb": round(sum(max(0, v) for v in liberado.values()) / GB, 2),
+    }
+
+
+@span("seed_cleaner")
+def executar_seed_cleaner(client, conn, run_id, espacos, tracker_rules, dry_run,
+                          inventario=None, modo_alvo=True, prazo_espera=300):
     """
     Limpa torrents elegiveis por tempo de seeding.
     - So executa se disco estiver critico
     - Respeita cross-seed: so deleta quando TODOS os trackers do grupo
-      (mesmo nome) satisfizerem o minimo de dias configurado em TRACKER_RULES
+      (mesmo conteudo, ver modulos/identidade.py) satisfizerem o minimo de dias configurado em TRACKER_RULES
+    - Candidatos lidos do indice seed_eligibility (modulos/elegibilidade.py)
+    - modo_alvo: apaga so os grupos necessarios para voltar a limite_max
+      (selecionar_grupos); False apaga todos os elegiveis
+
+    Recebe o inventario do run (cria um proprio se nao for informado).
+    Apos delecoes reais espera a liberacao do espaco (aguardar_liberacao)
+    por no maximo prazo_espera segundos.
 
     Retorna: quantidade de torrents deletados (ou elegiveis em dry_run)
     """
@@ -49,36 +227,46 @@ def executar_seed_cleaner(client, conn, run_id, espacos, tracker_rules, dry_run)
         log_seed_cleaner("sem_regras", 0)
         return 0
 
-    # Coletar torrents com regras aplicaveis
-    torrent_data = []
-    for t in client.torrents_info():
-        seeding_days = getattr(t, 'seeding_time', 0) / 86400
-        try:
-            trackers = client.torrents_trackers(t.hash)
-        except:
-            trackers = []
+    if inventario is None:
+        inventario = InventarioTorrents(client, conn)
 
-        rules = get_tracker_rules_for_torrent(trackers, tracker_rules)
-        if not rules:
+    # Candidatos vem do indice seed_eligibility (eligible_at <= agora) e de seus
+    # grupos de cross-seed (identidade do conteudo); o seeding_time do
+    # inventario confirma cada um. Fora do checagem_disco o indice e
+    # atualizado aqui mesmo.
+    if inventario.elegibilidade is None:
+        atualizar_elegibilidade(conn, inventario, tracker_rules)
+    candidatos   = ler_candidatos_elegiveis(conn, datetime.now())
+    analisador   = AnalisadorConteudo(conn, espacos)
+    torrent_data = []
+    for h, e in candidatos.items():
+        t = inventario.por_hash(h)
+        if t is None or not e["regras"]:
             continue
 
         torrent_data.append({
             "hash":         t.hash,
             "name":         t.name,
-            "seeding_days": seeding_days,
+            "seeding_days": getattr(t, 'seeding_time', 0) / 86400,
             "size":         getattr(t, 'size', 0),
-            "rules":        rules,
+            "ratio":        getattr(t, 'ratio', 0) or 0,
+            "content_path": getattr(t, 'content_path', ''),
+            "disco":        disco_do_caminho(getattr(t, 'save_path', ''), espacos),
+            "rules":        e["regras"],
+            "grupo":        e["grupo"],
         })
+    print(f"   📇 {len(torrent_data)} candidato(s) no índice de elegibilidade")
 
-    # Agrupar por nome para detectar cross-seeds
     groups = defaultdict(list)
     for t in torrent_data:
-        groups[t["name"]].append(t)
+        groups[t["grupo"]].append(t)
 
     to_delete      = []
     kept_crossseed = []
+    grupos_elegiveis = []
 
-    for name, group in groups.items():
+    for group in groups.values():
+        name          = group[0]["name"]
         all_satisfied = True
         details       = []
 
@@ -96,17 +284,20 @@ def executar_seed_cleaner(client, conn, run_id, espacos, tracker_rules, dry_run)
                     all_satisfied = False
 
         if all_satisfied:
-            for t in group:
-                max_rule = max(d for _, d in t["rules"])
-                to_delete.append({
-                    "hash":       t["hash"],
-                    "name":       t["name"],
-                    "days":       t["seeding_days"],
-                    "rule":       max_rule,
-                    "size":       t["size"],
-                    "tracker":    ", ".join(set(d for d, _ in t["rules"])),
-                    "group_size": len(group),
-                })
+            # Espaco real: hardlinks fora do grupo (biblioteca do Radarr/Sonarr) nao liberam nada
+            recuperavel, por_disco, _ = analisador.recuperavel(group)
+            discos = {d for d, b in por_disco.items() if b > 0} - {None}
+            if not discos:
+                discos = {t["disco"] for t in group} - {None}
+            grupos_elegiveis.append({
+                "nome":     name,
+                "torrents": group,
+                "bytes":    recuperavel,
+                "tamanho":  bytes_liberados(group),
+                "disco":    discos.pop() if len(discos) == 1 else None,
+                "dias":     min(t["seeding_days"] for t in group),
+                "ratio":    min(t["ratio"] for t in group),
+            })
         else:
             unsatisfied = [d for d in details if not d["satisfied"]]
             for t in group:
@@ -123,16 +314,61 @@ def executar_seed_cleaner(client, conn, run_id, espacos, tracker_rules, dry_run)
                         ],
                     })
 
-    print(f"\n   📋 Elegíveis para deleção: {len(to_delete)}")
+    total_elegiveis = sum(len(g["torrents"]) for g in grupos_elegiveis)
+    print(f"\n   📋 Elegíveis para deleção: {total_elegiveis} "
+          f"({len(grupos_elegiveis)} grupo(s))")
+
+    if modo_alvo:
+        selecionados, necessidade, projecao = selecionar_grupos(
+            grupos_elegiveis, espacos, discos_criticos)
+        # Projecao com o conjunto inteiro (hardlinks entre grupos selecionados contam)
+        _, por_disco_sel, _ = analisador.recuperavel(
+            [t for g in selecionados for t in g["torrents"]])
+        for nome, b in _esperado_por_disco(por_disco_sel, discos_criticos).items():
+            projecao[nome] = espacos[nome]["livre"] + b / GB
+        print(f"\n   🎯 Seleção por espaço (alvo: limite_max):")
+        for nome in discos_criticos:
+            falta = projecao[nome] < espacos[nome]["limite_max"]
+            print(f"      {nome}: precisa liberar {necessidade[nome]:.1f} GB → "
+                  f"{espacos[nome]['livre']:.1f} GB livre → {projecao[nome]:.1f} GB projetado "
+                  f"(max: {espacos[nome]['limite_max']})"
+                  f"{'  ⚠️ elegíveis insuficientes' if falta else ''}")
+        mantidos = len(grupos_elegiveis) - len(selecionados)
+        if mantidos:
+            print(f"      {mantidos} grupo(s) elegível(is) mantido(s) — espaço já suficiente")
+    else:
+        selecionados = grupos_elegiveis
+
+    for g in selecionados:
+        for t in g["torrents"]:
+            to_delete.append({
+                "hash":       t["hash"],
+                "name":       t["name"],
+                "days":       t["seeding_days"],
+                "rule":       max(d for _, d in t["rules"]),
+                "size":       t["size"],
+                "tracker":    ", ".join(set(d for d, _ in t["rules"])),
+                "group_size": len(g["torrents"]),
+                "content_path": t["content_path"],
+                "disco":      t["disco"],
+            })
 
     if to_delete:
+        liberado, _, escaneado = analisador.recuperavel(to_delete)
+        tamanho_gb = sum(g["tamanho"] for g in selecionados) / GB
+        print(f"\n   🗑️  Selecionados: {len(to_delete)} torrent(s), "
+              f"{len(selecionados)} grupo(s), {tamanho_gb:.1f} GB no qBittorrent → "
+              f"{liberado / GB:.1f} GB recuperáveis"
+              f"{'' if escaneado else ' (alguns caminhos não encontrados — usando size)'}")
         print(f"\n   {'TRACKER':<35} {'SEED':>7} {'REGRA':>6}  NOME")
         print("   " + "-" * 100)
         for t in sorted(to_delete, key=lambda x: x["tracker"]):
             cross   = f" [x{t['group_size']}]" if t["group_size"] > 1 else ""
             size_gb = t["size"] / (1024 ** 3)
+            real_gb = analisador.recuperavel([t])[0] / GB
+            link    = f", libera {real_gb:.1f} GB 🔗" if real_gb < size_gb - 0.05 else ""
             print(f"   {t['tracker']:<35} {t['days']:>6.1f}d {t['rule']:>5}d{cross}  "
-                  f"{t['name'][:50]}  ({size_gb:.1f} GB)")
+                  f"{t['name'][:50]}  ({size_gb:.1f} GB{link})")
 
     if kept_crossseed:
         print(f"\n   ⏳ Mantidos por cross-seed ({len(kept_crossseed)}):")
@@ -146,32 +382,45 @@ def executar_seed_cleaner(client, conn, run_id, espacos, tracker_rules, dry_run)
         if to_delete:
             salvar_seed_deletions(conn, run_id, to_delete, dry_run=True)
             print(f"\n   ℹ️  DRY RUN — mude SEED_CLEANER_DRY_RUN = False no config.py para apagar de verdade")
+        analisador.persistir()
+        confirmar(conn)
         log_seed_cleaner("dry_run", len(to_delete), dry_run=True)
         return len(to_delete) if to_delete else 0
 
     # Delecao real
     if not to_delete:
+        analisador.persistir()
+        confirmar(conn)
         log_seed_cleaner("sem_elegiveis", 0, dry_run=False)
         return 0
 
+    livre_antes = {nome: _livre_bytes(espacos[nome]["paths"]) for nome in discos_criticos}
+
+    # Escritas do indice (elegibilidade/identidade) gravadas antes das chamadas de delecao
+    confirmar(conn)
     print(f"\n   🗑️  Deletando {len(to_delete)} torrents...")
     deletados_confirmados = []
     falhas = []
 
+    resultados = executar_em_lote(client, "delete", [t["hash"] for t in to_delete],
+                                  delete_files=True)
     for t in to_delete:
-        try:
-            client.torrents_delete(delete_files=True, torrent_hashes=t["hash"])
-            salvar_seed_deletions(conn, run_id, [t], dry_run=False)
+        erro = resultados.get(t["hash"])
+        if erro is None:
             size_gb = t["size"] / (1024 ** 3)
             print(f"   ✅ {t['name'][:55]}  ({size_gb:.1f} GB)")
             deletados_confirmados.append(t)
-        except Exception as e:
-            print(f"   ❌ {t['name'][:50]}: {e}")
+        else:
+            print(f"   ❌ {t['name'][:50]}: {erro}")
             falhas.append(t)
-        time.sleep(0.5)
+    salvar_seed_deletions(conn, run_id, deletados_confirmados, dry_run=False)
+    salvar_seed_eligibility(conn, {}, removidos=[t["hash"] for t in deletados_confirmados])
 
-    total_gb = sum(t["size"] for t in deletados_confirmados) / (1024 ** 3)
-    print(f"\n   ✅ {len(deletados_confirmados)} deletados ({total_gb:.1f} GB liberados)")
+    liberado, por_disco_del, _ = analisador.recuperavel(deletados_confirmados)
+    total_gb = liberado / GB
+    analisador.persistir(removidos={t["content_path"] for t in deletados_confirmados
+                                    if t["content_path"]})
+    print(f"\n   ✅ {len(deletados_confirmados)} deletados ({total_gb:.1f} GB recuperáveis)")
     if falhas:
         print(f"   ❌ {len(falhas)} falhas — verifique o log acima")
 
@@ -179,7 +428,25 @@ def executar_seed_cleaner(client, conn, run_id, espacos, tracker_rules, dry_run)
                      liberado_gb=total_gb, dry_run=False)
 
     if deletados_confirmados:
-        print(f"\n   ⏳ Aguardando 2 minutos para o sistema processar as deleções...")
-        time.sleep(120)
+        inventario.invalidar()
+        # Delecoes ja feitas no qBittorrent: gravar antes da espera (libera o banco)
+        confirmar(conn, duravel=True)
+        print(f"\n   ⏳ Aguardando liberação do espaço (prazo: {prazo_espera}s)...")
+        espera = aguardar_liberacao(client, espacos, deletados_confirmados,
+                                    livre_antes, prazo_espera,
+                                    _esperado_por_disco(por_disco_del, livre_antes))
+        economizado = ESPERA_FIXA_ANTERIOR - espera["segundos"]
+        if espera["completo"]:
+            print(f"   ✅ Espaço liberado em {espera['segundos']:.0f}s "
+                  f"({espera['liberado_gb']:.1f} de {espera['esperado_gb']:.1f} GB esperados)")
+        else:
+            print(f"   ⚠️  Prazo de {prazo_espera}s esgotado — "
+                  f"{espera['liberado_gb']:.1f} de {espera['esperado_gb']:.1f} GB liberados")
+        atualizar_run(conn, run_id,
+                      espera_delecao_s=espera["segundos"],
+                      espera_economizada_s=round(economizado, 1))
+        log("Espera pós-deleção", level="info", **espera,
+            economizado_s=round(economizado, 1))
 
+    confirmar(conn)
     return len(deletados_confirmados)
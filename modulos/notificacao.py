@@ -10,17 +10,44 @@
 #       "bot_token": "123456:ABC...",
 #       "chat_id":   "123456789",
 #   }
+#
+# Varios canais ao mesmo tempo: lista de tipos e a config de cada um pelo tipo
+#   NOTIFICACAO_TIPO   = ["telegram", "discord"]
+#   NOTIFICACAO_CONFIG = {"telegram": {...}, "discord": {"webhook_url": "..."}}
+#
+# O envio nao bloqueia quem chama: cada canal tem uma thread com sua propria
+# requests.Session (conexao reaproveitada) e os canais enviam em paralelo.
+# Respostas 429/503 respeitam o Retry-After (ou o retry_after do Telegram e do
+# Discord); falhas de rede e 5xx tentam de novo com backoff exponencial.
+# concluir(conn) no fim do run espera os envios (com prazo) e grava em
+# notifications.pending_channels os canais que nao receberam a mensagem;
+# reenviar_pendentes(conn) no inicio do proximo run tenta de novo.
+#
+# requests, o banco e o resto do envio so sao importados quando ha canal
+# configurado, para nao pesar na partida dos subcomandos que so leem a
+# configuracao (--check-config usa canais_do_config()).
+
+import threading
+import time
+from collections import deque
+
+# Tentativas de um envio dentro do mesmo run
+TENTATIVAS_POR_ENVIO = 3
 
-try:
-    import requests
-except ImportError:
-    requests = None
+# Backoff entre tentativas (segundos): BACKOFF_BASE * 2^n, com jitter
+BACKOFF_BASE = 1.0
 
+# Retry-After acima disso nao e esperado no run: a mensagem fica pendente
+ESPERA_MAXIMA = 30
 
-def _enviar_telegram(titulo, mensagem, priority, event_type, config):
+# Runs em que uma notificacao pendente ainda e reenviada
+MAX_TENTATIVAS = 10
+
+
+def _enviar_telegram(sessao, titulo, mensagem, priority, event_type, config):
     bot_token = config["bot_token"]
     chat_id   = config["chat_id"]
-    requests.post(
+    return sessao.post(
         f"https://api.telegram.org/bot{bot_token}/sendMessage",
         json={
             "chat_id":    chat_id,
@@ -31,10 +58,10 @@ def _enviar_telegram(titulo, mensagem, priority, event_type, config):
     )
 
 
-def _enviar_discord(titulo, mensagem, priority, event_type, config):
+def _enviar_discord(sessao, titulo, mensagem, priority, event_type, config):
     webhook_url = config["webhook_url"]
     cor = {0: 0x2ecc71, 1: 0xe74c3c}.get(priority, 0xf39c12)
-    requests.post(webhook_url, json={
+    return sessao.post(webhook_url, json={
         "embeds": [{
             "title":       titulo,
             "description": mensagem,
@@ -43,35 +70,35 @@ def _enviar_discord(titulo, mensagem, priority, event_type, config):
     }, timeout=10)
 
 
-def _enviar_slack(titulo, mensagem, priority, event_type, config):
+def _enviar_slack(sessao, titulo, mensagem, priority, event_type, config):
     webhook_url = config["webhook_url"]
-    requests.post(webhook_url, json={
+    return sessao.post(webhook_url, json={
         "text": f"*{titulo}*\n{mensagem}"
     }, timeout=10)
 
 
-def _enviar_ntfy(titulo, mensagem, priority, event_type, config):
+def _enviar_ntfy(sessao, titulo, mensagem, priority, event_type, config):
     url        = config["url"]
     prioridade = {0: "default", 1: "high"}.get(priority, "default")
     headers    = {"Title": titulo, "Priority": prioridade}
     # Autenticacao opcional
     if config.get("token"):
         headers["Authorization"] = f"Bearer {config['token']}"
-    requests.post(url, data=mensagem.encode("utf-8"), headers=headers, timeout=10)
+    return sessao.post(url, data=mensagem.encode("utf-8"), headers=headers, timeout=10)
 
 
-def _enviar_gotify(titulo, mensagem, priority, event_type, config):
+def _enviar_gotify(sessao, titulo, mensagem, priority, event_type, config):
     url   = config["url"].rstrip("/")
     token = config["token"]
-    requests.post(f"{url}/message", json={
+    return sessao.post(f"{url}/message", json={
         "title":    titulo,
         "message":  mensagem,
         "priority": priority
     }, headers={"X-Gotify-Key": token}, timeout=10)
 
 
-def _enviar_pushover(titulo, mensagem, priority, event_type, config):
-    requests.post("https://api.pushover.net/1/messages.json", data={
+def _enviar_pushover(sessao, titulo, mensagem, priority, event_type, config):
+    return sessao.post("https://api.pushover.net/1/messages.json", data={
         "token":    config["app_token"],
         "user":     config["user_key"],
         "title":    titulo,
@@ -91,39 +118,257 @@ _CANAIS = {
 }
 
 
+def _retry_after(resp):
+    """Segundos pedidos pelo servidor (header Retry-After ou corpo JSON), ou None."""
+    valor = resp.headers.get("Retry-After")
+    if valor:
+        try:
+            return max(0.0, float(valor))
+        except ValueError:
+            from datetime import datetime, timezone
+            from email.utils import parsedate_to_datetime
+            try:
+                quando = parsedate_to_datetime(valor)
+                return max(0.0, (quando - datetime.now(timezone.utc)).total_seconds())
+            except (TypeError, ValueError):
+                pass
+    try:
+        corpo = resp.json()
+    except ValueError:
+        return None
+    if isinstance(corpo, dict):
+        # Telegram: {"parameters": {"retry_after": 5}} — Discord: {"retry_after": 1.5}
+        espera = (corpo.get("parameters") or {}).get("retry_after", corpo.get("retry_after"))
+        if isinstance(espera, (int, float)):
+            return max(0.0, float(espera))
+    return None
+
+
+class _Canal:
+    """Fila + thread de envio de um canal, com requests.Session reaproveitada."""
+
+    def __init__(self, tipo, fn, config, sessao, resultados, trava):
+        self.tipo       = tipo
+        self.fn         = fn
+        self.config     = config
+        self.fila       = deque()
+        self.em_envio   = None
+        self.sessao     = sessao
+        self.resultados = resultados
+        self.trava      = trava
+        self.encerrado  = False
+        self.thread     = threading.Thread(target=self._trabalhar, name=f"notificacao-{tipo}",
+                                           daemon=True)
+        self.thread.start()
+
+    def ocioso(self):
+        return not self.fila and self.em_envio is None
+
+    def _entregar(self, msg):
+        """Envia com retentativas. Retorna None se entregou, ou a descricao do erro."""
+        import random
+
+        erro = None
+        for tentativa in range(TENTATIVAS_POR_ENVIO):
+            espera = BACKOFF_BASE * 2 ** tentativa * (0.5 + random.random())
+            try:
+                resp = self.fn(self.sessao, msg["titulo"], msg["mensagem"], msg["priority"],
+                               msg["event_type"], self.config)
+            except Exception as e:
+                erro = str(e)
+            else:
+                if resp.status_code < 300:
+                    return None
+                erro = f"HTTP {resp.status_code}"
+                if resp.status_code in (429, 503):
+                    pedido = _retry_after(resp)
+                    if pedido is not None:
+                        if pedido > ESPERA_MAXIMA:
+                            return f"{erro} (Retry-After {pedido:.0f}s)"
+                        espera = pedido
+                elif resp.status_code < 500:
+                    return erro     # 4xx: credencial/URL errada, repetir nao adianta
+            if tentativa + 1 < TENTATIVAS_POR_ENVIO:
+                time.sleep(espera)
+        return erro
+
+    def _trabalhar(self):
+        while True:
+            with self.trava:
+                while not self.fila and not self.encerrado:
+                    self.trava.wait()
+                if not self.fila:
+                    break
+                msg = self.em_envio = self.fila.popleft()
+            erro = self._entregar(msg)
+            with self.trava:
+                if erro:
+                    print(f"   ❌ Erro ao enviar notificação ({self.tipo}): {erro}")
+                self.resultados.append({"id": msg["id"], "canal": self.tipo, "erro": erro})
+                self.em_envio = None
+                self.trava.notify_all()
+        self.sessao.close()
+
+
+class Notificador:
+    """
+    enviar_notificacao(titulo, mensagem, priority, event_type, notificacao_id)
+    para um ou mais canais. Retorna na hora; a entrega acontece nas threads
+    dos canais.
+    """
+
+    def __init__(self, canais=None, sessao_fn=None):
+        self.trava      = threading.Condition()
+        self.resultados = []
+        self.canais     = {tipo: _Canal(tipo, fn, config, sessao_fn(), self.resultados, self.trava)
+                           for tipo, (fn, config) in (canais or {}).items()}
+
+    def __call__(self, titulo, mensagem, priority=0, event_type=None, notificacao_id=None,
+                 canais=None):
+        msg = {"id": notificacao_id, "titulo": titulo, "mensagem": mensagem,
+               "priority": priority, "event_type": event_type}
+        with self.trava:
+            for tipo, canal in self.canais.items():
+                if canais is None or tipo in canais:
+                    canal.fila.append(msg)
+            self.trava.notify_all()
+
+    def aguardar(self, prazo_segundos=15):
+        """
+        Espera os canais esvaziarem por ate prazo_segundos. Retorna (e esquece)
+        os resultados [{"id", "canal", "erro"}]; o que nao saiu no prazo volta
+        com erro "prazo esgotado" (o envio em andamento continua e seu
+        resultado entra na proxima chamada).
+        """
+        limite = time.monotonic() + prazo_segundos
+        with self.trava:
+            while not all(c.ocioso() for c in self.canais.values()):
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                self.trava.wait(restante)
+            resultados = list(self.resultados)
+            self.resultados.clear()
+            for tipo, canal in self.canais.items():
+                pendentes = list(canal.fila)
+                if canal.em_envio is not None:
+                    pendentes.append(canal.em_envio)
+                canal.fila.clear()
+                resultados += [{"id": m["id"], "canal": tipo, "erro": "prazo esgotado"}
+                               for m in pendentes]
+        return resultados
+
+    def _gravar_resultados(self, conn, resultados):
+        """Aplica os resultados em notifications.pending_channels; retorna quantas ficaram pendentes."""
+        from modulos.db import atualizar_entrega_notificacao
+
+        por_id = {}
+        for r in resultados:
+            if r["id"] is None:
+                continue
+            entregues, falhas, erros = por_id.setdefault(r["id"], (set(), set(), []))
+            if r["erro"]:
+                falhas.add(r["canal"])
+                erros.append(f"{r['canal']}: {r['erro']}")
+            else:
+                entregues.add(r["canal"])
+        pendentes = 0
+        for notificacao_id, (entregues, falhas, erros) in por_id.items():
+            if atualizar_entrega_notificacao(conn, notificacao_id, entregues, falhas,
+                                             "; ".join(erros) or None):
+                pendentes += 1
+        return pendentes
+
+    def concluir(self, conn, prazo_segundos=15):
+        """Fim do run: espera os envios e grava os canais pendentes em notifications."""
+        if not self.canais:
+            return
+        pendentes = self._gravar_resultados(conn, self.aguardar(prazo_segundos))
+        if pendentes:
+            print(f"   📵 {pendentes} notificação(ões) pendente(s) — reenvio no próximo run")
+
+    def encerrar(self, conn=None, prazo_segundos=15):
+        """
+        Conclui os envios (com conn, grava os pendentes como concluir()) e
+        encerra as threads dos canais. Usado ao trocar de notificador na
+        recarga do --daemon e no fim dele.
+        """
+        if conn is not None:
+            self.concluir(conn, prazo_segundos)
+        else:
+            self.aguardar(prazo_segundos)
+        with self.trava:
+            for canal in self.canais.values():
+                canal.encerrado = True
+            self.trava.notify_all()
+
+    def reenviar_pendentes(self, conn):
+        """Reenfileira as notificacoes com canais pendentes de runs anteriores."""
+        import json
+        from modulos.db import ler_notificacoes_pendentes
+
+        if not self.canais:
+            return 0
+        # Envios que terminaram depois do prazo do run anterior
+        with self.trava:
+            atrasados = list(self.resultados)
+            self.resultados.clear()
+        self._gravar_resultados(conn, atrasados)
+
+        em_andamento = set()
+        with self.trava:
+            for canal in self.canais.values():
+                em_andamento.update(m["id"] for m in canal.fila)
+                if canal.em_envio is not None:
+                    em_andamento.add(canal.em_envio["id"])
+        total = 0
+        for n in ler_notificacoes_pendentes(conn, MAX_TENTATIVAS):
+            canais = set(json.loads(n["pending_channels"])) & set(self.canais)
+            if not canais or n["id"] in em_andamento:
+                continue
+            self(n["title"], n["message"], n["priority"], n["event_type"],
+                 notificacao_id=n["id"], canais=canais)
+            total += 1
+        if total:
+            print(f"📲 Reenviando {total} notificação(ões) pendente(s)")
+        return total
+
+
+def canais_do_config(tipo, config):
+    """NOTIFICACAO_TIPO (str ou lista) + NOTIFICACAO_CONFIG -> [(tipo, config_do_canal)]"""
+    tipos = [tipo] if isinstance(tipo, str) else list(tipo or [])
+    tipos = [t for t in tipos if t and t != "nenhum"]
+    return [(t, config[t] if isinstance(config.get(t), dict) else config) for t in tipos]
+
+
 def criar_notificador(tipo, config):
     """
-    Retorna uma funcao enviar_notificacao(titulo, mensagem, priority, event_type)
-    configurada para o canal escolhido.
+    Retorna um Notificador — chamavel como
+    enviar_notificacao(titulo, mensagem, priority, event_type) —
+    configurado para o(s) canal(is) escolhido(s).
 
     Uso:
         enviar = criar_notificador("telegram", {"bot_token": "...", "chat_id": "..."})
         enviar("Titulo", "Mensagem", priority=1, event_type="paused")
+        enviar.concluir(conn)
     """
-    if not tipo or tipo == "nenhum":
-        def _noop(titulo, mensagem, priority=0, event_type=None):
-            pass
-        return _noop
+    canais = canais_do_config(tipo, config or {})
+    if not canais:
+        return Notificador()
 
-    if not requests:
+    try:
+        import requests
+    except ImportError:
         print(f"⚠️  Módulo 'requests' não instalado — notificações desativadas")
         print(f"   Instale com: pip install requests")
-        def _noop(titulo, mensagem, priority=0, event_type=None):
-            pass
-        return _noop
-
-    fn = _CANAIS.get(tipo)
-    if not fn:
-        tipos_validos = ", ".join(sorted(_CANAIS.keys()))
-        print(f"⚠️  NOTIFICACAO_TIPO '{tipo}' não reconhecido. Válidos: {tipos_validos}, nenhum")
-        def _noop(titulo, mensagem, priority=0, event_type=None):
-            pass
-        return _noop
-
-    def _enviar(titulo, mensagem, priority=0, event_type=None):
-        try:
-            fn(titulo, mensagem, priority, event_type, config)
-        except Exception as e:
-            print(f"   ❌ Erro ao enviar notificação ({tipo}): {e}")
+        return Notificador()
 
-    return _enviar
+    validos = {}
+    for t, cfg_canal in canais:
+        fn = _CANAIS.get(t)
+        if not fn:
+            tipos_validos = ", ".join(sorted(_CANAIS.keys()))
+            print(f"⚠️  NOTIFICACAO_TIPO '{t}' não reconhecido. Válidos: {tipos_validos}, nenhum")
+            continue
+        validos[t] = (fn, cfg_canal)
+    return Notificador(validos, requests.Session)
@@ -1,22 +1,42 @@
 #!/usr/bin/env python3
-# modulos/otel.py — OpenTelemetry Logging (batch)
+# modulos/otel.py — OpenTelemetry Logging + Traces (batch)
 #
 # Acumula todos os logs durante a execucao e envia um unico registro
 # para o OTEL Collector via OTLP/HTTP no final (flush).
 #
+# Traces: span("fase") marca as fases do run (span raiz "run" com filhos
+# disco, snapshot, seed_cleaner, pausa, trackers...) e instrumentar_cliente()
+# cronometra cada chamada a API do qBittorrent. As fases e os totais por
+# endpoint sao sempre registrados (imprimir_fases() no fim do run); os spans
+# individuais das chamadas so quando o OTEL esta ligado. flush() envia os
+# spans para /v1/traces junto com o log.
+#
+# Envio: flush() so monta os payloads e entrega a envio_otel.py, que envia em
+# segundo plano (gzip) e guarda no spool em disco o que falhar, para reenviar
+# no proximo run. aguardar_envio() no fim do run limita a espera.
+#
+# Metricas: gauge()/contador() acumulam valores tipados durante o run (os
+# log_* ja alimentam disco, fila de trackers, pausas e delecoes) e o flush()
+# manda um unico payload para /v1/metrics, com histogramas da duracao das
+# fases e das chamadas da API montados a partir dos spans. Com o OTEL
+# desligado nada e acumulado, a menos que outro exportador peca a coleta
+# (coletar_metricas(), usado pelo prometheus.py); metricas_do_run() entrega
+# o retrato do run antes do flush().
+#
 # Configuracao no config.py:
 #   OTEL_ENDPOINT     = "http://localhost:4318"
 #   OTEL_SERVICE_NAME = "qbit-manager"
 #   OTEL_ENVIRONMENT  = "production"
 #   OTEL_ENABLED      = True
+#   OTEL_SPOOL_MAX_MB = 20
+#   OTEL_PRAZO_ENVIO_SEGUNDOS = 5
 
 import json
+import os
 import time
+from contextlib import contextmanager
 
-try:
-    import requests as _requests
-except ImportError:
-    _requests = None
+from modulos.envio_otel import configurar_envio, enfileirar, http_disponivel
 
 # Config — sobrescritos por configurar_otel()
 _config = {
@@ -24,6 +44,7 @@ _config = {
     "service_name": "qbit-manager",
     "environment":  "production",
     "enabled":      False,
+    "coletar":      False,      # acumular metricas mesmo com o OTEL desligado
 }
 
 # Buffer de logs acumulados durante o run
@@ -32,6 +53,27 @@ _buffer = []
 # Severity mais alta encontrada no run (para o registro final)
 _max_severity = {"level": "info", "number": 9}
 
+# Spans do run: pilha dos abertos e lista dos finalizados (ordem de termino)
+_traco = {"trace_id": None, "pilha": [], "spans": [], "api_spans": 0}
+
+# Metricas do run: (nome, atributos) -> valor
+_metricas = {"inicio_ns": None, "gauges": {}, "contadores": {}, "unidades": {},
+             "api_duracoes": {}}
+
+# Limites (segundos) dos histogramas de duracao
+LIMITES_DURACAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+# Maximo de spans de chamadas da API por run (acima disso so os totais)
+MAX_SPANS_API = 500
+
+# Metodos do client cronometrados por instrumentar_cliente()
+ENDPOINTS_API = (
+    "auth_log_in", "app_version",
+    "torrents_info", "sync_maindata", "torrents_trackers", "torrents_files",
+    "torrents_pause", "torrents_resume", "torrents_set_force_start",
+    "torrents_recheck", "torrents_delete",
+)
+
 _SEVERITY_MAP = {
     "debug": 5,
     "info":  9,
@@ -40,7 +82,8 @@ _SEVERITY_MAP = {
 }
 
 
-def configurar_otel(endpoint=None, service_name=None, environment=None, enabled=None):
+def configurar_otel(endpoint=None, service_name=None, environment=None, enabled=None,
+                    spool_dir=None, spool_max_mb=None, prazo_envio_segundos=None):
     if endpoint is not None:
         _config["endpoint"] = endpoint.rstrip("/")
     if service_name is not None:
@@ -49,8 +92,11 @@ def configurar_otel(endpoint=None, service_name=None, environment=None, enabled=
         _config["environment"] = environment
     if enabled is not None:
         _config["enabled"] = enabled
+    configurar_envio(spool_dir, spool_max_mb, prazo_envio_segundos)
     # Limpar buffer a cada configuracao (novo run)
     _buffer.clear()
+    _limpar_traco()
+    _limpar_metricas()
     _max_severity["level"]  = "info"
     _max_severity["number"] = 9
 
@@ -78,6 +124,352 @@ def log(mensagem, level="info", **attrs):
     _buffer.append(entry)
 
 
+# ----------------------------------------------------------------------
+# Traces
+# ----------------------------------------------------------------------
+def _limpar_traco():
+    _traco["trace_id"]  = None
+    _traco["pilha"]     = []
+    _traco["spans"]     = []
+    _traco["api_spans"] = 0
+
+
+@contextmanager
+def span(nome, **attrs):
+    """
+    Marca uma fase do run. Aninhavel; o primeiro span aberto e a raiz do trace.
+    Tambem serve como decorator.
+
+    Uso:
+        with span("snapshot") as s:
+            ...
+            s["attrs"]["torrents"] = len(todos)
+
+        @span("seed_cleaner")
+        def executar_seed_cleaner(...): ...
+    """
+    if not _traco["pilha"]:
+        # Nova raiz: descarta spans de um trace anterior nao enviado
+        _limpar_traco()
+        _traco["trace_id"] = os.urandom(16).hex()
+    pilha = _traco["pilha"]
+    atual = {
+        "nome":      nome,
+        "span_id":   os.urandom(8).hex(),
+        "pai":       pilha[-1]["span_id"] if pilha else None,
+        "nivel":     len(pilha),
+        "inicio_ns": time.time_ns(),
+        "t0":        time.perf_counter(),
+        "attrs":     attrs,
+        "api":       {},      # endpoint -> [chamadas, segundos]
+        "erro":      None,
+        "kind":      1,       # SPAN_KIND_INTERNAL
+    }
+    pilha.append(atual)
+    try:
+        yield atual
+    except BaseException as e:
+        atual["erro"] = f"{e.__class__.__name__}: {e}"
+        raise
+    finally:
+        pilha.remove(atual)
+        atual["segundos"] = time.perf_counter() - atual["t0"]
+        atual["fim_ns"]   = atual["inicio_ns"] + int(atual["segundos"] * 1e9)
+        _traco["spans"].append(atual)
+
+
+def _cronometrar(endpoint, metodo):
+    def chamada(*args, **kwargs):
+        inicio_ns = time.time_ns()
+        t0        = time.perf_counter()
+        erro      = None
+        try:
+            return metodo(*args, **kwargs)
+        except Exception as e:
+            erro = f"{e.__class__.__name__}: {e}"
+            raise
+        finally:
+            segundos = time.perf_counter() - t0
+            pilha    = _traco["pilha"]
+            for aberto in pilha:
+                total = aberto["api"].setdefault(endpoint, [0, 0.0])
+                total[0] += 1
+                total[1] += segundos
+            if _coletando():
+                _metricas["api_duracoes"].setdefault(endpoint, []).append(segundos)
+            if pilha and _config["enabled"] and _traco["api_spans"] < MAX_SPANS_API:
+                _traco["api_spans"] += 1
+                _traco["spans"].append({
+                    "nome":      f"qbittorrent {endpoint}",
+                    "span_id":   os.urandom(8).hex(),
+                    "pai":       pilha[-1]["span_id"],
+                    "nivel":     len(pilha),
+                    "inicio_ns": inicio_ns,
+                    "fim_ns":    inicio_ns + int(segundos * 1e9),
+                    "segundos":  segundos,
+                    "attrs":     {"qbittorrent.endpoint": endpoint,
+                                  "duracao_ms": round(segundos * 1000, 3)},
+                    "api":       {},
+                    "erro":      erro,
+                    "kind":      3,   # SPAN_KIND_CLIENT
+                })
+    return chamada
+
+
+def instrumentar_cliente(client):
+    """Cronometra os metodos da API do qBittorrent no proprio client (idempotente)."""
+    if getattr(client, "_otel_instrumentado", False):
+        return client
+    for endpoint in ENDPOINTS_API:
+        metodo = getattr(client, endpoint, None)
+        if callable(metodo):
+            setattr(client, endpoint, _cronometrar(endpoint, metodo))
+    client._otel_instrumentado = True
+    return client
+
+
+def imprimir_fases():
+    """Tabela local com o tempo de cada fase do ultimo trace e as chamadas da API."""
+    fases = [s for s in _traco["spans"] if s["kind"] == 1]
+    raiz  = next((s for s in fases if s["pai"] is None), None)
+    if raiz is None:
+        return
+    # Ordem de inicio, aninhada pelo nivel
+    fases.sort(key=lambda s: s["inicio_ns"])
+    print(f"\n⏱️  Fases do run:")
+    print(f"   {'FASE':<28} {'TEMPO':>9} {'%':>5}  API")
+    for s in fases:
+        nome     = ("  " * s["nivel"] + s["nome"])[:28]
+        pct      = s["segundos"] / raiz["segundos"] * 100 if raiz["segundos"] else 0
+        chamadas = "  ".join(f"{e}×{n} ({seg * 1000:.0f} ms)"
+                             for e, (n, seg) in sorted(s["api"].items()))
+        marca    = " ❌" if s["erro"] else ""
+        print(f"   {nome:<28} {s['segundos']:>8.2f}s {pct:>4.0f}%  {chamadas}{marca}".rstrip())
+
+
+def _valor_otlp(v):
+    if isinstance(v, bool):
+        return {"boolValue": v}
+    if isinstance(v, int):
+        return {"intValue": str(v)}
+    if isinstance(v, float):
+        return {"doubleValue": v}
+    return {"stringValue": str(v)}
+
+
+def _span_otlp(s, trace_id):
+    attrs = dict(s["attrs"])
+    for endpoint, (n, seg) in s["api"].items():
+        attrs[f"api.{endpoint}.chamadas"] = n
+        attrs[f"api.{endpoint}.ms"]       = round(seg * 1000, 1)
+    span_otlp = {
+        "traceId":           trace_id,
+        "spanId":            s["span_id"],
+        "name":              s["nome"],
+        "kind":              s["kind"],
+        "startTimeUnixNano": str(s["inicio_ns"]),
+        "endTimeUnixNano":   str(s["fim_ns"]),
+        "attributes":        [{"key": k, "value": _valor_otlp(v)} for k, v in attrs.items()],
+        "status":            {"code": 2, "message": s["erro"]} if s["erro"] else {"code": 1},
+    }
+    if s["pai"]:
+        span_otlp["parentSpanId"] = s["pai"]
+    return span_otlp
+
+
+def _recurso():
+    return {
+        "attributes": [
+            {"key": "service.name",
+             "value": {"stringValue": _config["service_name"]}},
+            {"key": "deployment.environment",
+             "value": {"stringValue": _config["environment"]}}
+        ]
+    }
+
+
+def _enviar_traces():
+    """Enfileira os spans finalizados para /v1/traces. Retorna True se havia spans."""
+    spans = [s for s in _traco["spans"] if "fim_ns" in s]
+    if not spans or _traco["pilha"]:
+        return False
+    payload = {
+        "resourceSpans": [{
+            "resource": _recurso(),
+            "scopeSpans": [{
+                "scope": {"name": "qbit-manager"},
+                "spans": [_span_otlp(s, _traco["trace_id"]) for s in spans],
+            }]
+        }]
+    }
+    enfileirar(_config["endpoint"], "/v1/traces", payload,
+               f"Trace enviado ({len(spans)} spans)")
+    return True
+
+
+# ----------------------------------------------------------------------
+# Metricas
+# ----------------------------------------------------------------------
+def _limpar_metricas():
+    _metricas["inicio_ns"] = None
+    _metricas["gauges"].clear()
+    _metricas["contadores"].clear()
+    _metricas["unidades"].clear()
+    _metricas["api_duracoes"].clear()
+
+
+def _chave(nome, unidade, attrs):
+    if _metricas["inicio_ns"] is None:
+        _metricas["inicio_ns"] = time.time_ns()
+    _metricas["unidades"][nome] = unidade
+    return nome, tuple(sorted(attrs.items()))
+
+
+def coletar_metricas(ativo=True):
+    """Liga a coleta de metricas independente do OTEL (exportadores locais)."""
+    _config["coletar"] = ativo
+
+
+def _coletando():
+    return _config["enabled"] or _config["coletar"]
+
+
+def gauge(nome, valor, unidade="1", **attrs):
+    """Valor instantaneo (o ultimo do run vale). Ex: gauge("qbit.disco.livre", 42.1, "GiBy", disco="p2p")"""
+    if _coletando():
+        _metricas["gauges"][_chave(nome, unidade, attrs)] = valor
+
+
+def contador(nome, incremento=1, unidade="1", **attrs):
+    """Soma no run (exportado como delta). Ex: contador("qbit.acoes.pausados", 3)"""
+    if _coletando() and incremento:
+        chave = _chave(nome, unidade, attrs)
+        _metricas["contadores"][chave] = _metricas["contadores"].get(chave, 0) + incremento
+
+
+def _atributos_otlp(attrs):
+    return [{"key": k, "value": _valor_otlp(v)} for k, v in attrs]
+
+
+def _ponto_numero(valor):
+    if isinstance(valor, bool):
+        valor = int(valor)
+    return {"asInt": str(valor)} if isinstance(valor, int) else {"asDouble": float(valor)}
+
+
+def _histogramas_duracao():
+    """{(nome, attrs): [duracoes]} das fases do trace e de todas as chamadas da API."""
+    series = {}
+    for s in _traco["spans"]:
+        if s["kind"] == 1 and "fim_ns" in s:
+            series.setdefault(("qbit.fase.duracao", (("fase", s["nome"]),)), []).append(s["segundos"])
+    for endpoint, duracoes in _metricas["api_duracoes"].items():
+        series[("qbit.api.duracao", (("endpoint", endpoint),))] = duracoes
+    return series
+
+
+def _ponto_histograma(attrs, valores, inicio_ns, agora_ns):
+    contagens = [0] * (len(LIMITES_DURACAO) + 1)
+    for v in valores:
+        i = 0
+        while i < len(LIMITES_DURACAO) and v > LIMITES_DURACAO[i]:
+            i += 1
+        contagens[i] += 1
+    return {
+        "attributes":        _atributos_otlp(attrs),
+        "startTimeUnixNano": str(inicio_ns),
+        "timeUnixNano":      str(agora_ns),
+        "count":             str(len(valores)),
+        "sum":               sum(valores),
+        "min":               min(valores),
+        "max":               max(valores),
+        "bucketCounts":      [str(c) for c in contagens],
+        "explicitBounds":    list(LIMITES_DURACAO),
+    }
+
+
+def metricas_do_run():
+    """
+    Retrato das metricas acumuladas no run (chame antes do flush()):
+    {"gauges", "contadores": {(nome, attrs): valor}, "unidades": {nome: unidade},
+     "fases": {fase: segundos}, "api": {endpoint: (chamadas, segundos)}}
+    """
+    fases = {}
+    for s in _traco["spans"]:
+        if s["kind"] == 1 and "fim_ns" in s:
+            fases[s["nome"]] = fases.get(s["nome"], 0) + s["segundos"]
+    return {
+        "gauges":     dict(_metricas["gauges"]),
+        "contadores": dict(_metricas["contadores"]),
+        "unidades":   dict(_metricas["unidades"]),
+        "fases":      fases,
+        "api":        {e: (len(d), sum(d)) for e, d in _metricas["api_duracoes"].items()},
+    }
+
+
+def _payload_metricas():
+    agora_ns  = time.time_ns()
+    inicios   = [s["inicio_ns"] for s in _traco["spans"]]
+    if _metricas["inicio_ns"] is not None:
+        inicios.append(_metricas["inicio_ns"])
+    inicio_ns = min(inicios) if inicios else agora_ns
+    por_nome  = {}
+
+    for (nome, attrs), valor in _metricas["gauges"].items():
+        metrica = por_nome.setdefault(nome, {
+            "name": nome, "unit": _metricas["unidades"][nome], "gauge": {"dataPoints": []}})
+        metrica["gauge"]["dataPoints"].append({
+            "attributes": _atributos_otlp(attrs), "timeUnixNano": str(agora_ns),
+            **_ponto_numero(valor)})
+
+    for (nome, attrs), valor in _metricas["contadores"].items():
+        metrica = por_nome.setdefault(nome, {
+            "name": nome, "unit": _metricas["unidades"][nome],
+            "sum": {"aggregationTemporality": 1, "isMonotonic": True, "dataPoints": []}})
+        metrica["sum"]["dataPoints"].append({
+            "attributes": _atributos_otlp(attrs), "startTimeUnixNano": str(inicio_ns),
+            "timeUnixNano": str(agora_ns), **_ponto_numero(valor)})
+
+    for endpoint, duracoes in sorted(_metricas["api_duracoes"].items()):
+        metrica = por_nome.setdefault("qbit.api.chamadas", {
+            "name": "qbit.api.chamadas", "unit": "1",
+            "sum": {"aggregationTemporality": 1, "isMonotonic": True, "dataPoints": []}})
+        metrica["sum"]["dataPoints"].append({
+            "attributes": _atributos_otlp((("endpoint", endpoint),)),
+            "startTimeUnixNano": str(inicio_ns), "timeUnixNano": str(agora_ns),
+            "asInt": str(len(duracoes))})
+
+    for (nome, attrs), valores in _histogramas_duracao().items():
+        metrica = por_nome.setdefault(nome, {
+            "name": nome, "unit": "s",
+            "histogram": {"aggregationTemporality": 1, "dataPoints": []}})
+        metrica["histogram"]["dataPoints"].append(
+            _ponto_histograma(attrs, valores, inicio_ns, agora_ns))
+
+    if not por_nome:
+        return None
+    return {
+        "resourceMetrics": [{
+            "resource": _recurso(),
+            "scopeMetrics": [{
+                "scope":   {"name": "qbit-manager"},
+                "metrics": list(por_nome.values()),
+            }]
+        }]
+    }
+
+
+def _enviar_metricas():
+    """Enfileira as metricas do run para /v1/metrics. Retorna True se havia metricas."""
+    payload = _payload_metricas()
+    if payload is None:
+        return False
+    total = len(payload["resourceMetrics"][0]["scopeMetrics"][0]["metrics"])
+    enfileirar(_config["endpoint"], "/v1/metrics", payload,
+               f"Métricas enviadas ({total} séries)")
+    return True
+
+
 def log_disco(espacos):
     for nome, info in espacos.items():
         level = "warn" if info["critico"] else "info"
@@ -91,9 +483,13 @@ def log_disco(espacos):
             critico=info["critico"],
             ok=info["ok"],
         )
+        gauge("qbit.disco.livre",      round(info["livre"], 3), "GiBy", disco=nome)
+        gauge("qbit.disco.limite_min", info["limite_min"],      "GiBy", disco=nome)
+        gauge("qbit.disco.limite_max", info["limite_max"],      "GiBy", disco=nome)
+        gauge("qbit.disco.critico",    int(info["critico"]),          disco=nome)
 
 
-def log_pausa(event_type, espacos, hashes_count, discos_criticos=None):
+def log_pausa(event_type, espacos, hashes_count, discos_criticos=None, novos=None):
     log(
         f"Evento: {event_type}",
         level="warn" if event_type != "restore" else "info",
@@ -101,6 +497,11 @@ def log_pausa(event_type, espacos, hashes_count, discos_criticos=None):
         torrents_afetados=hashes_count,
         discos_criticos=json.dumps(discos_criticos or []),
     )
+    contador("qbit.pausa.eventos", tipo=event_type)
+    if event_type == "pause":
+        contador("qbit.acoes.pausados", hashes_count if novos is None else novos)
+    elif event_type == "restore":
+        contador("qbit.acoes.restaurados", hashes_count)
 
 
 def log_seed_cleaner(acao, total, liberado_gb=0, dry_run=True):
@@ -112,6 +513,9 @@ def log_seed_cleaner(acao, total, liberado_gb=0, dry_run=True):
         liberado_gb=round(liberado_gb, 2),
         dry_run=dry_run,
     )
+    if acao in ("dry_run", "deletados"):
+        contador("qbit.acoes.deletados", total, dry_run=dry_run)
+        contador("qbit.seed_cleaner.liberado", round(liberado_gb, 3), "GiBy", dry_run=dry_run)
 
 
 def log_tracker(tracker, ativo, fila, forcados, ativados):
@@ -124,6 +528,10 @@ def log_tracker(tracker, ativo, fila, forcados, ativados):
         forcados=forcados,
         ativados=ativados,
     )
+    gauge("qbit.tracker.downloads_ativos", ativo, tracker=tracker)
+    gauge("qbit.tracker.fila",             fila,  tracker=tracker)
+    contador("qbit.acoes.forcados", forcados, tracker=tracker)
+    contador("qbit.acoes.ativados", ativados, tracker=tracker)
 
 
 def log_run(run_id, status, resumo):
@@ -134,6 +542,10 @@ def log_run(run_id, status, resumo):
         status=status,
         **resumo,
     )
+    contador("qbit.runs", status=status)
+    contador("qbit.acoes.forcados_checking", resumo.get("forcados_checking", 0))
+    if "pausados" in resumo:
+        gauge("qbit.torrents.pausados", resumo["pausados"])
 
 
 def flush():
@@ -144,12 +556,25 @@ def flush():
     para evitar sobrescrita (ex: p2p.livre_gb, videos.livre_gb).
     Limpa o buffer apos o envio.
 
-    Retorna True se enviou com sucesso, False se nao.
+    Os spans do run (se houver) vao para /v1/traces e as metricas para
+    /v1/metrics. Nada e enviado aqui: os payloads vao para a thread de
+    envio (envio_otel.py) — use aguardar_envio() antes de encerrar.
+
+    Retorna True se enfileirou o log, False se nao.
     """
+    ativo = _config["enabled"] and _config["endpoint"] and http_disponivel()
+    if ativo:
+        _enviar_metricas()
+        if not _traco["pilha"]:
+            _enviar_traces()
+    _limpar_metricas()
+    if not _traco["pilha"]:
+        _limpar_traco()
+
     if not _buffer:
         return False
 
-    if not _config["enabled"] or not _config["endpoint"] or not _requests:
+    if not ativo:
         _buffer.clear()
         return False
 
@@ -190,14 +615,7 @@ def flush():
 
     payload = {
         "resourceLogs": [{
-            "resource": {
-                "attributes": [
-                    {"key": "service.name",
-                     "value": {"stringValue": _config["service_name"]}},
-                    {"key": "deployment.environment",
-                     "value": {"stringValue": _config["environment"]}}
-                ]
-            },
+            "resource": _recurso(),
             "scopeLogs": [{
                 "scope": {"name": "qbit-manager"},
                 "logRecords": [log_record],
@@ -205,21 +623,7 @@ def flush():
         }]
     }
 
-    sucesso = False
-    try:
-        resp = _requests.post(
-            f"{_config['endpoint']}/v1/logs",
-            json=payload,
-            headers={"Content-Type": "application/json"},
-            timeout=10,
-        )
-        sucesso = resp.status_code < 300
-        if sucesso:
-            print(f"   ✅ [OTEL] Log enviado ({len(_buffer)} entradas)")
-        else:
-            print(f"   ⚠️  [OTEL] Falha ao enviar: HTTP {resp.status_code}")
-    except Exception as e:
-        print(f"   ❌ [OTEL] Erro ao enviar: {e}")
-
+    enfileirar(_config["endpoint"], "/v1/logs", payload,
+               f"Log enviado ({len(_buffer)} entradas)")
     _buffer.clear()
-    return sucesso
+    return True
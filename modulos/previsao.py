@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# modulos/previsao.py — Previsao de enchimento dos discos
+#
+# Cada run grava o espaco livre por disco em runs.disk_spaces. Aqui uma reta
+# (minimos quadrados) e ajustada sobre a janela recente desse historico para
+# estimar a taxa de consumo (GB/h) e o tempo ate cada disco cruzar limite_min.
+#
+#   - saltos para cima (seed cleaner, Radarr/Sonarr movendo arquivos) cortam
+#     a janela: so entra na reta o trecho depois do ultimo salto
+#   - sem historico suficiente usa a soma do dlspeed dos downloads do disco
+#   - amount_left dos downloads ativos no disco e mostrado como "pendente":
+#     se for maior que a margem, os downloads atuais sozinhos enchem o disco
+#
+# Configuracao no config.py:
+#   PREVISAO_JANELA_HORAS      = 6
+#   PREVISAO_HORIZONTE_MINUTOS = 60   # 0 desativa a acao preventiva
+
+from datetime import datetime, timedelta
+
+from modulos.db import ler_historico_espacos
+from modulos.helpers import disco_do_caminho
+
+GB = 1024 ** 3
+
+# Aumento de espaco livre (GB) entre dois runs tratado como liberacao externa
+SALTO_GB = 1.0
+
+# Minimo de pontos no trecho para confiar na reta
+MIN_PONTOS = 3
+
+ESTADOS_DOWNLOAD = ('downloading', 'forcedDL', 'stalledDL', 'metaDL', 'forcedMetaDL',
+                    'queuedDL', 'allocating')
+
+
+def _ajustar_reta(pontos):
+    """pontos: [(horas, livre_gb)] → inclinacao em GB/h (None se indefinida)."""
+    n = len(pontos)
+    media_x = sum(x for x, _ in pontos) / n
+    media_y = sum(y for _, y in pontos) / n
+    var_x   = sum((x - media_x) ** 2 for x, _ in pontos)
+    if var_x <= 0:
+        return None
+    cov = sum((x - media_x) * (y - media_y) for x, y in pontos)
+    return cov / var_x
+
+
+def _trecho_recente(pontos):
+    """Descarta o historico anterior ao ultimo salto de espaco livre."""
+    inicio = 0
+    for i in range(1, len(pontos)):
+        if pontos[i][1] - pontos[i - 1][1] > SALTO_GB:
+            inicio = i
+    return pontos[inicio:]
+
+
+def downloads_por_disco(inventario, espacos):
+    """Retorna {disco: {"pendente_gb": float, "dlspeed_gbh": float}}"""
+    resultado = {nome: {"pendente_gb": 0.0, "dlspeed_gbh": 0.0} for nome in espacos}
+    for t in inventario.por_estado(*ESTADOS_DOWNLOAD):
+        nome = disco_do_caminho(getattr(t, 'save_path', '') or getattr(t, 'content_path', ''),
+                                espacos)
+        if nome is None:
+            continue
+        resultado[nome]["pendente_gb"] += getattr(t, 'amount_left', 0) / GB
+        resultado[nome]["dlspeed_gbh"] += getattr(t, 'dlspeed', 0) * 3600 / GB
+    return resultado
+
+
+def prever_discos(conn, espacos, janela_horas=6, downloads=None):
+    """
+    Estima, para cada disco, a taxa de consumo e o tempo ate limite_min.
+
+    Retorna {disco: {
+        "taxa_gbh":    consumo estimado em GB/h (> 0 = enchendo),
+        "eta_horas":   horas ate cruzar limite_min (None = nao enche / sem dados),
+        "pendente_gb": amount_left dos downloads ativos no disco,
+        "fonte":       "historico" | "dlspeed" | "sem_dados",
+        "pontos":      pontos usados na reta,
+    }}
+    """
+    agora     = datetime.now()
+    historico = ler_historico_espacos(conn, agora - timedelta(hours=janela_horas))
+    downloads = downloads or {}
+
+    previsoes = {}
+    for nome, d in espacos.items():
+        pontos = [((quando - agora).total_seconds() / 3600, discos[nome]["livre"])
+                  for quando, discos in historico if nome in discos]
+        # O run atual ja pode estar no historico; garantir o valor medido agora
+        pontos = [p for p in pontos if p[0] < -1 / 60] + [(0.0, d["livre"])]
+        pontos = _trecho_recente(pontos)
+
+        dl       = downloads.get(nome, {})
+        pendente = dl.get("pendente_gb", 0.0)
+        taxa     = None
+        fonte    = "sem_dados"
+        if len(pontos) >= MIN_PONTOS:
+            inclinacao = _ajustar_reta(pontos)
+            if inclinacao is not None:
+                taxa  = -inclinacao
+                fonte = "historico"
+        if taxa is None and dl.get("dlspeed_gbh"):
+            taxa  = dl["dlspeed_gbh"]
+            fonte = "dlspeed"
+
+        margem = d["livre"] - d["limite_min"]
+        eta    = None
+        if taxa and taxa > 0:
+            eta = max(0.0, margem / taxa)
+            # Pela taxa de download so enche se o que falta baixar cobre a margem
+            if fonte == "dlspeed" and pendente < margem:
+                eta = None
+
+        previsoes[nome] = {
+            "taxa_gbh":    round(taxa, 3) if taxa is not None else None,
+            "eta_horas":   round(eta, 2) if eta is not None else None,
+            "pendente_gb": round(pendente, 2),
+            "fonte":       fonte,
+            "pontos":      len(pontos),
+        }
+    return previsoes
+
+
+def discos_em_risco(espacos, previsoes, horizonte_minutos):
+    """Discos ainda nao criticos que devem cruzar limite_min dentro do horizonte."""
+    if not horizonte_minutos:
+        return []
+    horizonte_h = horizonte_minutos / 60
+    return [nome for nome, p in previsoes.items()
+            if not espacos[nome]["critico"]
+            and p["eta_horas"] is not None and p["eta_horas"] <= horizonte_h]
+
+
+def formatar_eta(eta_horas):
+    if eta_horas is None:
+        return "sem previsão"
+    if eta_horas < 1:
+        return f"{eta_horas * 60:.0f} min"
+    if eta_horas < 48:
+        return f"{eta_horas:.1f} h"
+    return f"{eta_horas / 24:.1f} dias"
+
+
+def imprimir_previsoes(espacos, previsoes):
+    for nome, p in previsoes.items():
+        if p["taxa_gbh"] is None:
+            print(f"   📈 {nome}: sem dados suficientes ({p['pontos']} ponto(s))")
+            continue
+        tendencia = f"-{p['taxa_gbh']:.2f} GB/h" if p["taxa_gbh"] > 0 else \
+                    f"+{abs(p['taxa_gbh']):.2f} GB/h"
+        linha = f"   📈 {nome}: {tendencia} → limite_min em {formatar_eta(p['eta_horas'])}"
+        if p["taxa_gbh"] <= 0:
+            linha = f"   📈 {nome}: {tendencia} → estável"
+        if p["pendente_gb"]:
+            margem = espacos[nome]["livre"] - espacos[nome]["limite_min"]
+            alerta = " ⚠️" if p["pendente_gb"] >= margem else ""
+            linha += f"  (downloads pendentes: {p['pendente_gb']:.1f} GB{alerta})"
+        print(linha)
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# modulos/prometheus.py — Metricas do run no formato texto do Prometheus
+#
+# Reaproveita as metricas que o run ja acumula no otel.py (gauge()/contador()
+# dos log_*, classificacao por tracker, duracao das fases e das chamadas da
+# API) — nenhuma chamada extra ao qBittorrent. Cada valor e o do ultimo run
+# (os contadores do OTEL viram gauges "no ultimo run"), com o timestamp do run
+# em qbit_ultimo_run_timestamp_seconds para detectar metricas paradas.
+#
+# Saidas (config.py):
+#   PROMETHEUS_TEXTFILE = "/var/lib/node_exporter/textfile/qbit.prom"
+#       arquivo para o textfile collector do node_exporter, gravado de forma
+#       atomica (temporario + rename) no fim de cada run — cron ou daemon
+#   PROMETHEUS_PORTA    = 9835
+#       so no --daemon: servidor HTTP leve com GET /metrics
+#   PROMETHEUS_ENDERECO = "0.0.0.0"
+
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from modulos.otel import coletar_metricas, metricas_do_run
+
+# Config — sobrescritos por configurar_prometheus()
+_config = {
+    "textfile": None,
+    "porta":    None,
+    "endereco": "0.0.0.0",
+}
+
+# Ultimo texto publicado e servidor HTTP do daemon
+_estado = {"texto": "", "servidor": None}
+_trava  = threading.Lock()
+
+# Conversao das unidades do otel.py: unidade -> (sufixo, fator)
+_UNIDADES = {
+    "GiBy": ("_bytes", 1024 ** 3),
+    "s":    ("_seconds", 1),
+}
+
+_AJUDA = {
+    "qbit_disco_livre_bytes":             "Espaco livre do disco",
+    "qbit_disco_limite_min_bytes":        "limite_min do disco (abaixo dele o disco e critico)",
+    "qbit_disco_limite_max_bytes":        "limite_max do disco (acima dele os downloads voltam)",
+    "qbit_disco_critico":                 "1 se o disco esta abaixo de limite_min",
+    "qbit_torrents_checking":             "Torrents em checking",
+    "qbit_torrents_moving":               "Torrents em moving",
+    "qbit_torrents_pausados":             "Torrents pausados pelo manager",
+    "qbit_tracker_torrents":              "Torrents por tracker e classe (analisar_torrents_por_tracker)",
+    "qbit_tracker_downloads_ativos":      "Downloads ativos do tracker (trackers com acao no run)",
+    "qbit_tracker_fila":                  "Downloads na fila do tracker (trackers com acao no run)",
+    "qbit_seed_cleaner_liberado_bytes":   "Espaco liberado pelo seed cleaner no ultimo run",
+    "qbit_acoes_deletados":               "Torrents deletados pelo seed cleaner no ultimo run",
+    "qbit_acoes_pausados":                "Torrents pausados no ultimo run",
+    "qbit_acoes_restaurados":             "Torrents restaurados no ultimo run",
+    "qbit_acoes_forcados":                "Torrents com force start no ultimo run",
+    "qbit_acoes_ativados":                "Torrents ativados no ultimo run",
+    "qbit_acoes_forcados_checking":       "Torrents em checking com force start no ultimo run",
+    "qbit_pausa_eventos":                 "Eventos de pausa registrados no ultimo run",
+    "qbit_runs":                          "Status do ultimo run",
+    "qbit_fase_duracao_seconds":          "Duracao de cada fase do ultimo run",
+    "qbit_api_chamadas":                  "Chamadas a API do qBittorrent no ultimo run",
+    "qbit_api_duracao_seconds":           "Tempo total das chamadas a API no ultimo run",
+    "qbit_ultimo_run_timestamp_seconds":  "Fim do ultimo run (unix)",
+}
+
+
+def configurar_prometheus(textfile=None, porta=None, endereco=None):
+    _config["textfile"] = textfile
+    _config["porta"]    = porta
+    if endereco is not None:
+        _config["endereco"] = endereco
+    coletar_metricas(bool(textfile or porta))
+
+
+# ----------------------------------------------------------------------
+# Formato texto (exposition format 0.0.4)
+# ----------------------------------------------------------------------
+def _nome(nome, unidade):
+    sufixo, fator = _UNIDADES.get(unidade, ("", 1))
+    return nome.replace(".", "_") + sufixo, fator
+
+
+def _rotulo(valor):
+    if isinstance(valor, bool):
+        valor = str(valor).lower()
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _valor(valor):
+    if isinstance(valor, bool):
+        return str(int(valor))
+    if isinstance(valor, float):
+        return repr(round(valor, 6))
+    return str(valor)
+
+
+def renderizar(metricas, agora=None):
+    """Texto do /metrics a partir de otel.metricas_do_run()."""
+    series = {}
+
+    def _adicionar(nome, attrs, valor):
+        series.setdefault(nome, []).append((attrs, valor))
+
+    for origem in ("gauges", "contadores"):
+        for (nome, attrs), valor in metricas[origem].items():
+            nome, fator = _nome(nome, metricas["unidades"].get(nome, "1"))
+            _adicionar(nome, attrs, round(valor * fator) if fator != 1 else valor)
+    for fase, segundos in metricas["fases"].items():
+        _adicionar("qbit_fase_duracao_seconds", (("fase", fase),), segundos)
+    for endpoint, (chamadas, segundos) in metricas["api"].items():
+        _adicionar("qbit_api_chamadas", (("endpoint", endpoint),), chamadas)
+        _adicionar("qbit_api_duracao_seconds", (("endpoint", endpoint),), segundos)
+    _adicionar("qbit_ultimo_run_timestamp_seconds", (), round(agora or time.time(), 3))
+
+    linhas = []
+    for nome in sorted(series):
+        linhas.append(f"# HELP {nome} {_AJUDA.get(nome, nome)}")
+        linhas.append(f"# TYPE {nome} gauge")
+        for attrs, valor in sorted(series[nome], key=lambda s: s[0]):
+            rotulos = ",".join(f'{k}="{_rotulo(v)}"' for k, v in attrs)
+            linhas.append(f"{nome}{{{rotulos}}} {_valor(valor)}" if rotulos
+                          else f"{nome} {_valor(valor)}")
+    return "\n".join(linhas) + "\n"
+
+
+def _gravar_textfile(caminho, texto):
+    temp = f"{caminho}.{os.getpid()}.tmp"
+    try:
+        with open(temp, "w", encoding="utf-8") as f:
+            f.write(texto)
+        os.chmod(temp, 0o644)
+        os.replace(temp, caminho)
+    except OSError as e:
+        print(f"   ❌ [Prometheus] Erro ao gravar {caminho}: {e}")
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+        return False
+    return True
+
+
+def publicar_metricas():
+    """
+    Publica as metricas do run (textfile e/ou /metrics). Chame no fim do run,
+    antes do otel.flush() (que limpa as metricas acumuladas).
+    """
+    if not (_config["textfile"] or _config["porta"]):
+        return
+    texto = renderizar(metricas_do_run())
+    with _trava:
+        _estado["texto"] = texto
+    if _config["textfile"] and _gravar_textfile(_config["textfile"], texto):
+        print(f"   📈 [Prometheus] {_config['textfile']} ({texto.count(chr(10))} linhas)")
+
+
+# ----------------------------------------------------------------------
+# Servidor HTTP (--daemon)
+# ----------------------------------------------------------------------
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        with _trava:
+            corpo = _estado["texto"].encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        pass
+
+
+def iniciar_servidor():
+    """
+    Sobe (ou troca, se a porta mudou) o servidor /metrics em uma thread.
+    Sem PROMETHEUS_PORTA, encerra o servidor em execucao.
+    """
+    servidor = _estado["servidor"]
+    endereco = (_config["endereco"], _config["porta"])
+    if servidor is not None:
+        if _config["porta"] and servidor.server_address[1] == _config["porta"]:
+            return
+        parar_servidor()
+    if not _config["porta"]:
+        return
+    try:
+        servidor = ThreadingHTTPServer(endereco, _Handler)
+    except OSError as e:
+        print(f"   ❌ [Prometheus] Não foi possível abrir {endereco[0]}:{endereco[1]}: {e}")
+        return
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, name="prometheus", daemon=True).start()
+    _estado["servidor"] = servidor
+    print(f"📈 Prometheus: http://{endereco[0]}:{endereco[1]}/metrics")
+
+
+def parar_servidor():
+    servidor = _estado["servidor"]
+    if servidor is not None:
+        servidor.shutdown()
+        servidor.server_close()
+        _estado["servidor"] = None
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# modulos/sessao.py — Reuso do cookie de sessao (SID) do qBittorrent entre runs
+#
+# Cada run fazia auth_log_in(); atras de proxy reverso com hash de senha
+# lento isso custa centenas de ms. O cookie da sessao fica salvo em
+# DB_DIR/qb_session.json (permissao 0600) e e reaplicado no proximo run.
+#
+#   cookie valido          → nenhuma chamada de login
+#   cookie expirado (TTL)  → login normal
+#   403 durante o run      → o qbittorrentapi refaz o login sozinho; o novo SID
+#                            e salvo aqui
+#
+# Cada login (com a latencia) e cada reuso ficam na tabela auth_events.
+#
+# O reuso usa atributos internos do qbittorrentapi (_http_session, _session,
+# _url.build_base_url), conferidos de 2023.11.57 a 2026.10.0 (faixa fixada no
+# readme). Se uma versao nova nao tiver algum deles, o run faz o login normal.
+#
+# Configuracao no config.py:
+#   QB_SESSAO_TTL_MINUTOS = 50   # 0 desativa o reuso
+
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+from modulos.db import registrar_evento_auth
+
+ARQUIVO_SESSAO = "qb_session.json"
+
+
+def _caminho(db_dir):
+    return os.path.join(db_dir, ARQUIVO_SESSAO)
+
+
+def _cookie_atual(client):
+    """Retorna (nome, valor) do cookie de sessao atual (SID ou QBT_SID_<porta>)."""
+    sessao = getattr(client, "_http_session", None)
+    if sessao is None:
+        return None, None
+    for cookie in sessao.cookies:
+        if cookie.name == "SID" or cookie.name.startswith("QBT_SID_"):
+            return cookie.name, cookie.value
+    return None, None
+
+
+def ler_sessao(db_dir, url, usuario, ttl_minutos):
+    """Retorna o dict salvo se ainda valido para este URL/usuario, senao None."""
+    if not ttl_minutos:
+        return None
+    try:
+        with open(_caminho(db_dir)) as f:
+            dados = json.load(f)
+        usado_em = datetime.fromisoformat(dados["usado_em"])
+    except (OSError, ValueError, KeyError):
+        return None
+    if dados.get("url") != url or dados.get("usuario") != usuario:
+        return None
+    if datetime.now() - usado_em > timedelta(minutes=ttl_minutos):
+        return None
+    return dados
+
+
+def salvar_sessao(db_dir, url, usuario, nome, valor):
+    """Grava o cookie com permissao 0600 (escrita atomica)."""
+    caminho = _caminho(db_dir)
+    tmp     = f"{caminho}.tmp"
+    dados = {
+        "url":      url,
+        "usuario":  usuario,
+        "cookie":   nome,
+        "sid":      valor,
+        "usado_em": datetime.now().isoformat(),
+    }
+    try:
+        os.makedirs(db_dir, exist_ok=True)
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(dados, f)
+        os.chmod(tmp, 0o600)
+        os.replace(tmp, caminho)
+    except OSError as e:
+        print(f"   ⚠️  Não foi possível salvar a sessão do qBittorrent: {e}")
+
+
+def remover_sessao(db_dir):
+    try:
+        os.remove(_caminho(db_dir))
+    except OSError:
+        pass
+
+
+class SessaoQbittorrent:
+    """
+    Gerencia login/reuso de cookie de um qbittorrentapi.Client.
+
+    Uso:
+        sessao = SessaoQbittorrent(client, db_dir, url, usuario, ttl, conn)
+        sessao.conectar()    # reusa o cookie salvo ou faz login
+        ...
+        sessao.salvar()      # atualiza o arquivo ao fim do run
+    """
+
+    def __init__(self, client, db_dir, url, usuario, ttl_minutos, conn=None):
+        self.client      = client
+        self.db_dir      = db_dir
+        self.url         = url
+        self.usuario     = usuario
+        self.ttl_minutos = ttl_minutos
+        self.conn        = conn
+        self.logins      = 0
+        self.login_ms    = 0.0
+        self.reusada     = False
+        self._login_original = client.auth_log_in
+        # O qbittorrentapi chama self.auth_log_in() ao receber 403; substituir
+        # no objeto permite medir tambem os re-logins automaticos.
+        client.auth_log_in = self._login_medido
+        client.sessao_qb   = self
+
+    def _registrar(self, tipo, duracao_ms=None, motivo=None):
+        if self.conn is not None:
+            try:
+                registrar_evento_auth(self.conn, tipo, duracao_ms, motivo)
+            except Exception:
+                pass
+
+    def _login_medido(self, *args, **kwargs):
+        motivo = kwargs.pop("_motivo", "403")
+        inicio = time.monotonic()
+        try:
+            self._login_original(*args, **kwargs)
+        except Exception:
+            self._registrar("login_falhou", (time.monotonic() - inicio) * 1000, motivo)
+            remover_sessao(self.db_dir)
+            raise
+        duracao_ms = (time.monotonic() - inicio) * 1000
+        self.logins   += 1
+        self.login_ms += duracao_ms
+        self._registrar("login", duracao_ms, motivo)
+        self.salvar()
+
+    def conectar(self):
+        """
+        Aplica o cookie salvo e valida com uma chamada leve (app/version).
+        Se o cookie nao for aceito o qbittorrentapi refaz o login (403).
+        Sem cookie salvo (ou expirado) faz o login direto.
+        """
+        dados = ler_sessao(self.db_dir, self.url, self.usuario, self.ttl_minutos)
+        if not dados:
+            self.client.auth_log_in(_motivo="sem_sessao" if self.ttl_minutos else "desativado")
+            return
+
+        # A primeira montagem da URL base recria a sessao HTTP; montar antes
+        # de aplicar o cookie para ele nao ser descartado.
+        try:
+            self.client._url.build_base_url(headers={}, requests_kwargs={})
+            self.client._session.cookies.set(dados["cookie"], dados["sid"])
+        except (AttributeError, TypeError) as e:
+            print(f"   ⚠️  Versão do qbittorrentapi sem suporte ao reuso da sessão ({e}) — login normal")
+            remover_sessao(self.db_dir)
+            self.client.auth_log_in(_motivo="sem_suporte")
+            return
+        self.client.app_version()
+        if self.logins == 0:
+            self.reusada = True
+            self._registrar("reuso")
+            self.salvar()
+
+    def salvar(self):
+        """Grava o cookie atual (renova o prazo do TTL)."""
+        if not self.ttl_minutos:
+            return
+        nome, valor = _cookie_atual(self.client)
+        if valor:
+            salvar_sessao(self.db_dir, self.url, self.usuario, nome, valor)
+
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# modulos/sincronizacao.py — Espelho local de torrents via /api/v2/sync/maindata
+#
+# Em vez de baixar a lista completa (torrents_info) a cada run, guarda o
+# ultimo 'rid' e uma copia dos torrents no SQLite (sync_state/sync_torrents).
+# Cada atualizacao pede ao qBittorrent apenas o que mudou desde o rid salvo;
+# quando o servidor responde full_update (rid desconhecido, restart etc.)
+# o espelho e reconstruido do zero.
+
+from modulos.db import confirmar, ler_espelho_sync, salvar_espelho_sync
+
+
+class TorrentLocal(dict):
+    """Torrent do espelho com acesso por atributo (igual ao TorrentDictionary)."""
+
+    def __getattr__(self, nome):
+        try:
+            return self[nome]
+        except KeyError:
+            raise AttributeError(nome)
+
+
+class EspelhoTorrents:
+    """
+    Espelho incremental dos torrents do qBittorrent.
+
+    Uso:
+        espelho  = EspelhoTorrents(client, conn)
+        torrents = espelho.atualizar()   # lista de TorrentLocal
+    """
+
+    def __init__(self, client, conn):
+        self.client   = client
+        self.conn     = conn
+        self.rid      = 0
+        self.torrents = None     # hash -> TorrentLocal (carregado sob demanda)
+        self.ultimo_delta = {"full_update": False, "alterados": 0, "removidos": 0}
+
+    def _carregar_local(self):
+        rid, dados = ler_espelho_sync(self.conn)
+        self.rid      = rid
+        self.torrents = {h: TorrentLocal(t) for h, t in dados.items()}
+
+    def atualizar(self):
+        """Aplica o delta do sync/maindata e retorna a lista atual de torrents."""
+        if self.torrents is None:
+            self._carregar_local()
+
+        data = self.client.sync_maindata(rid=self.rid)
+        full_update = bool(data.get("full_update"))
+        recebidos   = data.get("torrents") or {}
+        removidos   = [h for h in (data.get("torrents_removed") or []) if h in self.torrents]
+
+        if full_update:
+            self.torrents = {}
+        alterados = {}
+        for h, delta in recebidos.items():
+            t = self.torrents.get(h)
+            if t is None:
+                t = self.torrents[h] = TorrentLocal(hash=h)
+            t.update(delta)
+            alterados[h] = t
+        for h in removidos:
+            self.torrents.pop(h, None)
+
+        self.rid = data.get("rid", self.rid)
+        salvar_espelho_sync(self.conn, self.rid, alterados, removidos, full_update)
+        confirmar(self.conn)     # quem chamou ainda vai falar com o qBittorrent
+
+        self.ultimo_delta = {
+            "full_update": full_update,
+            "alterados":   len(alterados),
+            "removidos":   len(removidos),
+        }
+        return list(self.torrents.values())
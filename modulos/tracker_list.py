@@ -4,17 +4,21 @@
 # Chamado pelo qbit-manager.py com --tracker-list
 
 from collections import defaultdict
-from modulos.helpers import extrair_dominio_tracker
+from modulos.helpers import dominio_de_host
+from modulos.inventario import InventarioTorrents
 
 
-def gerar_lista_trackers(client):
+def gerar_lista_trackers(client, conn=None, tracker_cache_ttl_horas=None, espelho=None):
     """
     Varre todos os torrents do qBittorrent e gera o bloco TRACKER_RULES
     pronto para colar no config.py.
 
-    Recebe um client qbittorrentapi ja autenticado.
+    Recebe um client qbittorrentapi ja autenticado e, opcionalmente, a
+    conexao do banco para reaproveitar o cache de trackers (tracker_cache)
+    e o espelho do sync/maindata.
     """
-    torrents = client.torrents_info()
+    inventario = InventarioTorrents(client, conn, tracker_cache_ttl_horas, espelho)
+    torrents   = inventario.todos()
     print(f"📦 Total de torrents: {len(torrents)}\n")
 
     tracker_count = defaultdict(int)
@@ -23,19 +27,13 @@ def gerar_lista_trackers(client):
         if i % 100 == 0:
             print(f"   Processando... {i}/{len(torrents)}")
 
-        try:
-            trackers = client.torrents_trackers(torrent.hash)
-        except:
-            continue
-
-        for tracker in trackers:
-            url = getattr(tracker, 'url', '')
-            if url.startswith("**"):
-                continue
-            domain = extrair_dominio_tracker(url)
+        dominios = {dominio_de_host(h) for h in inventario.hosts_trackers(torrent.hash)}
+        for domain in dominios:
             if domain and domain != "unknown":
                 tracker_count[domain] += 1
 
+    inventario.persistir_trackers()
+
     # Tabela resumo
     print(f"\n{'TRACKER':<50} {'TORRENTS':>8}")
     print("-" * 60)
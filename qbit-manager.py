@@ -11,10 +11,12 @@
 #   python3 qbit-manager.py --test-notification     # testar envio de notificacao
 #   python3 qbit-manager.py --check-send-log        # testar envio de log ao OTEL
 #   python3 qbit-manager.py --check-config          # validar configuracao
+#   python3 qbit-manager.py --daemon                # loop continuo (substitui o cron)
 #
 # Flags globais:
 #   --config PATH     # caminho do diretorio de configuracao (padrao: /etc/qbit-manager)
 #   --modules PATH    # caminho do diretorio dos modulos (sobrescreve INSTALL_DIR do config)
+#   --interval SEG    # intervalo entre ciclos no modo --daemon
 
 import os
 import sys
@@ -66,25 +68,97 @@ def _parse_args():
         "--check-config", action="store_true",
         help="Validar se a configuração está correta"
     )
+    group.add_argument(
+        "--compact", action="store_true",
+        help="Agregar snapshots antigos, aplicar a retenção e compactar o banco"
+    )
+    group.add_argument(
+        "--daemon", action="store_true",
+        help="Executar em loop (substitui o cron), mantendo conexões e caches"
+    )
+    parser.add_argument(
+        "--interval", metavar="SEGUNDOS", type=int, default=None,
+        help="Intervalo entre ciclos no modo --daemon (padrão: DAEMON_INTERVALO_SEGUNDOS)"
+    )
 
     return parser.parse_args()
 
 
+# Cache da configuracao ja com os defaults aplicados, invalidado pelo mtime/
+# tamanho de config.py, tracker_rules.py e deste arquivo (que define os defaults)
+CACHE_CONFIG = os.path.join("__pycache__", "qbit-manager-config.marshal")
+
+
+def _assinatura_config(config_dir):
+    assinatura = []
+    for caminho in (os.path.abspath(__file__),
+                    os.path.join(config_dir, "config.py"),
+                    os.path.join(config_dir, "tracker_rules.py")):
+        try:
+            st = os.stat(caminho)
+            assinatura.append((caminho, st.st_mtime_ns, st.st_size))
+        except OSError:
+            assinatura.append((caminho, None, None))
+    return tuple(assinatura)
+
+
 def _carregar_config(config_dir):
-    """Carrega config.py e tracker_rules.py do diretorio especificado."""
-    if config_dir not in sys.path:
-        sys.path.insert(0, config_dir)
+    """
+    Carrega config.py e tracker_rules.py do diretorio especificado.
+
+    O resultado (so as variaveis em maiusculas, ja com os defaults) fica em
+    CONFIG_DIR/__pycache__ serializado com marshal (ja carregado pelo
+    interpretador, sem custo de import); enquanto os arquivos nao mudam, as
+    proximas execucoes leem o cache em vez de executar config.py.
+    """
+    import marshal
+
+    # config_dir sempre na frente (no --daemon o INSTALL_DIR ja esta no path
+    # e pode conter o config.py de template)
+    if config_dir in sys.path:
+        sys.path.remove(config_dir)
+    sys.path.insert(0, config_dir)
+
+    cache      = os.path.join(config_dir, CACHE_CONFIG)
+    assinatura = _assinatura_config(config_dir)
+    try:
+        with open(cache, "rb") as f:
+            salvo = marshal.load(f)
+        if salvo["assinatura"] == assinatura:
+            return salvo["cfg"]
+    except Exception:
+        pass        # sem cache, cache antigo ou corrompido
+
+    cfg, cacheavel = _ler_config(config_dir)
+    if cacheavel:
+        try:
+            os.makedirs(os.path.dirname(cache), exist_ok=True)
+            temp = f"{cache}.{os.getpid()}.tmp"
+            dados = marshal.dumps({"assinatura": assinatura, "cfg": cfg})
+            with open(temp, "wb") as f:
+                f.write(dados)
+            os.replace(temp, cache)
+        except (OSError, ValueError):
+            pass    # CONFIG_DIR somente leitura ou valor nao serializavel: segue sem cache
+    return cfg
+
 
-    cfg = {}
+def _ler_config(config_dir):
+    """Executa config.py / tracker_rules.py e aplica os defaults. Retorna (cfg, cacheavel)."""
+    cfg       = {}
+    cacheavel = True
     try:
         # Forçar reload caso config já esteja cacheado com outro path
-        if "config" in sys.modules:
-            del sys.modules["config"]
+        # (ou tenha sido alterado, no modo --daemon)
+        for modulo in ("config", "tracker_rules"):
+            if modulo in sys.modules:
+                del sys.modules[modulo]
         import config as _cfg_mod
         for attr in dir(_cfg_mod):
-            if not attr.startswith("_"):
+            if not attr.startswith("_") and attr.isupper():
                 cfg[attr] = getattr(_cfg_mod, attr)
     except ImportError:
+        cacheavel = False
         print(f"⚠️  config.py não encontrado em {config_dir}")
         print(f"   Copie o template: sudo cp config.py {config_dir}/config.py")
 
@@ -92,18 +166,40 @@ def _carregar_config(config_dir):
     cfg.setdefault("QB_URL",                    "https://torrent.exemplo.com")
     cfg.setdefault("QB_USER",                   "admin")
     cfg.setdefault("QB_PASS",                   "senha")
+    cfg.setdefault("QB_SESSAO_TTL_MINUTOS",     50)
     cfg.setdefault("MIN_DOWNLOADS_PER_TRACKER", 4)
     cfg.setdefault("MIN_TORRENTS_PER_TRACKER",  4)
     cfg.setdefault("SEED_CLEANER_DRY_RUN",      True)
+    cfg.setdefault("SEED_CLEANER_ALVO",         True)
+    cfg.setdefault("SEED_CLEANER_PRAZO_SEGUNDOS", 300)
+    cfg.setdefault("CONTEUDO_CACHE_TTL_HORAS",  6)
+    cfg.setdefault("TRACKER_CACHE_TTL_HORAS",   0)
+    cfg.setdefault("SYNC_MAINDATA",             True)
+    cfg.setdefault("ACOES_TAMANHO_LOTE",        100)
+    cfg.setdefault("DAEMON_INTERVALO_SEGUNDOS", 300)
+    cfg.setdefault("PREVISAO_JANELA_HORAS",     6)
+    cfg.setdefault("PREVISAO_HORIZONTE_MINUTOS", 60)
+    cfg.setdefault("RETENCAO_SNAPSHOTS_DIAS",   14)
+    cfg.setdefault("RETENCAO_HORARIO_DIAS",     90)
+    cfg.setdefault("RETENCAO_RUNS_DIAS",        90)
+    cfg.setdefault("COMPACTAR_HORAS",           [3, 4])
+    cfg.setdefault("COMPACTAR_PRAZO_SEGUNDOS",  60)
+    cfg.setdefault("COMPACTAR_LOTE",            5000)
     cfg.setdefault("INSTALL_DIR",               os.path.dirname(os.path.abspath(__file__)))
     cfg.setdefault("DB_DIR",                    "/var/lib/qbit-manager")
     cfg.setdefault("DB_PATH",                   f"{cfg['DB_DIR']}/qbit.db")
     cfg.setdefault("NOTIFICACAO_TIPO",          "nenhum")
     cfg.setdefault("NOTIFICACAO_CONFIG",        {})
+    cfg.setdefault("NOTIFICACAO_PRAZO_SEGUNDOS", 15)
     cfg.setdefault("OTEL_ENDPOINT",             None)
     cfg.setdefault("OTEL_SERVICE_NAME",         "qbit-manager")
     cfg.setdefault("OTEL_ENVIRONMENT",          "production")
     cfg.setdefault("OTEL_ENABLED",              False)
+    cfg.setdefault("OTEL_SPOOL_MAX_MB",         20)
+    cfg.setdefault("OTEL_PRAZO_ENVIO_SEGUNDOS", 5)
+    cfg.setdefault("PROMETHEUS_TEXTFILE",       None)
+    cfg.setdefault("PROMETHEUS_PORTA",          None)
+    cfg.setdefault("PROMETHEUS_ENDERECO",       "0.0.0.0")
     cfg.setdefault("PATHS", {
         "p2p": {
             "path": "/mnt/p2p/", "limite_min": 100, "limite_max": 150,
@@ -118,12 +214,15 @@ def _carregar_config(config_dir):
 
     # Importar tracker_rules.py separado (sobrescreve config se existir)
     try:
-        from tracker_rules import TRACKER_RULES
-        cfg["TRACKER_RULES"] = TRACKER_RULES
-    except ImportError:
+        import tracker_rules
+        cfg["TRACKER_RULES"] = tracker_rules.TRACKER_RULES
+        # tracker_rules.py fora do CONFIG_DIR nao entra na assinatura do cache
+        if os.path.dirname(os.path.abspath(tracker_rules.__file__)) != os.path.abspath(config_dir):
+            cacheavel = False
+    except (ImportError, AttributeError):
         pass
 
-    return cfg
+    return cfg, cacheavel
 
 
 def _setup_modules(cfg, modules_override=None):
@@ -134,28 +233,45 @@ def _setup_modules(cfg, modules_override=None):
     return install_dir
 
 
-def _conectar_qbittorrent(cfg, enviar_notificacao):
-    """Conecta ao qBittorrent e retorna o client autenticado."""
+def _conectar_qbittorrent(cfg, enviar_notificacao, conn=None):
+    """Conecta ao qBittorrent (reusando o cookie de sessao salvo) e retorna o client."""
     import qbittorrentapi
-    client = qbittorrentapi.Client(
+    from modulos.otel import instrumentar_cliente
+    from modulos.sessao import SessaoQbittorrent
+    client = instrumentar_cliente(qbittorrentapi.Client(
         host=cfg["QB_URL"], username=cfg["QB_USER"], password=cfg["QB_PASS"]
-    )
+    ))
+    sessao = SessaoQbittorrent(client, cfg["DB_DIR"], cfg["QB_URL"], cfg["QB_USER"],
+                               cfg["QB_SESSAO_TTL_MINUTOS"], conn)
     try:
-        client.auth_log_in()
-        print("✅ Conectado ao qBittorrent")
+        sessao.conectar()
+        if sessao.reusada:
+            print("✅ Conectado ao qBittorrent (sessão reutilizada)")
+        else:
+            print(f"✅ Conectado ao qBittorrent (login em {sessao.login_ms:.0f} ms)")
         return client
     except qbittorrentapi.LoginFailed:
         print("❌ Falha ao autenticar")
         enviar_notificacao("❌ qBittorrent - Erro de Autenticação",
                            f"Falha em {cfg['QB_URL']}", priority=1)
+        enviar_notificacao.aguardar(cfg["NOTIFICACAO_PRAZO_SEGUNDOS"])
         sys.exit(1)
     except Exception as e:
         print(f"❌ Erro ao conectar: {e}")
         enviar_notificacao("❌ qBittorrent - Erro de Conexão",
                            f"{cfg['QB_URL']}\n\n{e}", priority=1)
+        enviar_notificacao.aguardar(cfg["NOTIFICACAO_PRAZO_SEGUNDOS"])
         sys.exit(1)
 
 
+def _criar_espelho(cfg, client, conn):
+    """Espelho incremental (sync/maindata) se habilitado no config."""
+    if not cfg["SYNC_MAINDATA"]:
+        return None
+    from modulos.sincronizacao import EspelhoTorrents
+    return EspelhoTorrents(client, conn)
+
+
 # ==========================================================================
 # SUBCOMANDOS
 # ==========================================================================
@@ -218,12 +334,8 @@ def cmd_check_config(cfg, config_dir):
     # Notificações
     print("── Notificações ──")
     print(f"   Tipo: {cfg['NOTIFICACAO_TIPO']}")
-    if cfg["NOTIFICACAO_TIPO"] != "nenhum":
-        for k, v in cfg["NOTIFICACAO_CONFIG"].items():
-            valor = str(v)
-            if "token" in k.lower() or "key" in k.lower():
-                valor = valor[:8] + "..." if len(valor) > 8 else "***"
-            print(f"   {k}: {valor}")
+    _imprimir_canais(cfg)
+    print(f"   Prazo de envio no fim do run: {cfg['NOTIFICACAO_PRAZO_SEGUNDOS']}s")
     print()
 
     # OTEL
@@ -232,14 +344,28 @@ def cmd_check_config(cfg, config_dir):
     print(f"   Endpoint:    {cfg['OTEL_ENDPOINT'] or '(não configurado)'}")
     print(f"   Service:     {cfg['OTEL_SERVICE_NAME']}")
     print(f"   Environment: {cfg['OTEL_ENVIRONMENT']}")
+    print(f"   Spool:       {cfg['DB_DIR']}/otel-spool.jsonl (máx. {cfg['OTEL_SPOOL_MAX_MB']} MB)")
+    print(f"   Prazo envio: {cfg['OTEL_PRAZO_ENVIO_SEGUNDOS']}s")
+    print()
+
+    # Prometheus
+    print("── Prometheus ──")
+    print(f"   Textfile:    {cfg['PROMETHEUS_TEXTFILE'] or '(desligado)'}")
+    if cfg["PROMETHEUS_PORTA"]:
+        print(f"   /metrics:    http://{cfg['PROMETHEUS_ENDERECO']}:{cfg['PROMETHEUS_PORTA']}/metrics (só --daemon)")
+    else:
+        print("   /metrics:    (desligado)")
     print()
 
     # Modulos
     print("── Módulos ──")
     modulos_dir = os.path.join(cfg["INSTALL_DIR"], "modulos")
     modulos_esperados = [
-        "__init__.py", "db.py", "helpers.py", "otel.py", "notificacao.py",
-        "limpeza.py", "ativacao.py", "checagem_disco.py", "tracker_list.py"
+        "__init__.py", "db.py", "helpers.py", "otel.py", "envio_otel.py", "notificacao.py",
+        "limpeza.py", "ativacao.py", "checagem_disco.py", "tracker_list.py",
+        "inventario.py", "sincronizacao.py", "acoes.py", "daemon.py", "sessao.py",
+        "previsao.py", "conteudo.py", "identidade.py", "elegibilidade.py",
+        "compactacao.py", "prometheus.py",
     ]
     for mod in modulos_esperados:
         caminho = os.path.join(modulos_dir, mod)
@@ -262,19 +388,40 @@ def cmd_check_config(cfg, config_dir):
 
 def cmd_check_disk(cfg):
     """Verifica espaço em disco sem executar nenhuma ação."""
+    import sqlite3
     from modulos.helpers import verificar_espacos, imprimir_espacos
+    from modulos.db import abrir_leitura
+    from modulos.previsao import prever_discos, imprimir_previsoes, discos_em_risco
 
     print("🔍 Verificando espaço em disco...")
     print("=" * 60)
     espacos = verificar_espacos(cfg["PATHS"])
     imprimir_espacos(espacos)
 
+    # Previsao pelo historico de runs (sem consultar o qBittorrent)
+    # Conexao somente leitura: nao migra nem espera o run em andamento
+    print(f"\n📈 Previsão ({cfg['PREVISAO_JANELA_HORAS']}h de histórico):")
+    try:
+        conn = abrir_leitura(cfg["DB_PATH"])
+        try:
+            previsoes = prever_discos(conn, espacos, cfg["PREVISAO_JANELA_HORAS"])
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"   ⚠️  Histórico indisponível ({e}) — previsão ignorada")
+        previsoes = {}
+    imprimir_previsoes(espacos, previsoes)
+    em_risco = discos_em_risco(espacos, previsoes, cfg["PREVISAO_HORIZONTE_MINUTOS"])
+
     qualquer_critico = any(d["critico"] and d["pause_trigger"] for d in espacos.values())
     todos_ok         = all(d["ok"] for d in espacos.values() if d["pause_trigger"])
 
     print()
     if qualquer_critico:
         print("🔴 DISCO CRÍTICO — seed cleaner seria acionado")
+    elif em_risco:
+        print(f"🟠 Previsão de disco crítico em até {cfg['PREVISAO_HORIZONTE_MINUTOS']} min "
+              f"({', '.join(em_risco)}) — seed cleaner preventivo seria acionado")
     elif todos_ok:
         print("🟢 Todos os discos OK")
     else:
@@ -285,12 +432,14 @@ def cmd_check_torrent(cfg):
     """Lista torrents elegíveis para remoção (dry run)."""
     from modulos.limpeza import executar_seed_cleaner
     from modulos.db import init_db
+    from modulos.inventario import InventarioTorrents
+    from modulos.notificacao import Notificador
 
     print("🔍 Verificando torrents elegíveis para remoção...")
     print("=" * 60)
 
     conn   = init_db(cfg["DB_DIR"], cfg["DB_PATH"])
-    client = _conectar_qbittorrent(cfg, lambda *a, **kw: None)
+    client = _conectar_qbittorrent(cfg, Notificador(), conn)     # sem canais: so imprime
 
     # Forçar dry_run e criar espacos "criticos" pra forçar a execução do seed cleaner
     from modulos.helpers import verificar_espacos
@@ -304,23 +453,28 @@ def cmd_check_torrent(cfg):
         if d["seed_cleaner"]:
             espacos_forcar[nome]["critico"] = True
 
-    run_id = criar_run(conn, "manual_check", 0, 0, espacos)
+    run_id     = criar_run(conn, "manual_check", 0, 0, espacos)
+    inventario = InventarioTorrents(client, conn, cfg["TRACKER_CACHE_TTL_HORAS"],
+                                    _criar_espelho(cfg, client, conn))
     executar_seed_cleaner(client, conn, run_id, espacos_forcar,
-                          cfg["TRACKER_RULES"], dry_run=True)
+                          cfg["TRACKER_RULES"], dry_run=True, inventario=inventario,
+                          modo_alvo=False)
     conn.close()
 
 
 def cmd_erase_torrent(cfg):
     """Executa seed cleaner respeitando tempo de seed e cross-seed."""
     from modulos.limpeza import executar_seed_cleaner
-    from modulos.db import init_db
+    from modulos.db import init_db, transacao
     from modulos.helpers import verificar_espacos
+    from modulos.inventario import InventarioTorrents
+    from modulos.notificacao import Notificador
 
     print("🗑️  Executando seed cleaner...")
     print("=" * 60)
 
     conn   = init_db(cfg["DB_DIR"], cfg["DB_PATH"])
-    client = _conectar_qbittorrent(cfg, lambda *a, **kw: None)
+    client = _conectar_qbittorrent(cfg, Notificador(), conn)     # sem canais: so imprime
     espacos = verificar_espacos(cfg["PATHS"])
 
     # Forçar seed_cleaner discos como criticos para executar
@@ -331,12 +485,17 @@ def cmd_erase_torrent(cfg):
             espacos_forcar[nome]["critico"] = True
 
     from modulos.db import criar_run
-    run_id = criar_run(conn, "manual_erase", 0, 0, espacos)
-
-    deletados = executar_seed_cleaner(
-        client, conn, run_id, espacos_forcar,
-        cfg["TRACKER_RULES"], dry_run=cfg["SEED_CLEANER_DRY_RUN"]
-    )
+    run_id     = criar_run(conn, "manual_erase", 0, 0, espacos)
+    inventario = InventarioTorrents(client, conn, cfg["TRACKER_CACHE_TTL_HORAS"],
+                                    _criar_espelho(cfg, client, conn))
+
+    with transacao(conn):
+        deletados = executar_seed_cleaner(
+            client, conn, run_id, espacos_forcar,
+            cfg["TRACKER_RULES"], dry_run=cfg["SEED_CLEANER_DRY_RUN"],
+            inventario=inventario, modo_alvo=False,
+            prazo_espera=cfg["SEED_CLEANER_PRAZO_SEGUNDOS"]
+        )
 
     if cfg["SEED_CLEANER_DRY_RUN"]:
         print(f"\n⚠️  DRY RUN — {deletados} torrents seriam removidos")
@@ -349,41 +508,62 @@ def cmd_erase_torrent(cfg):
 def cmd_tracker_list(cfg):
     """Gera bloco TRACKER_RULES a partir dos torrents atuais."""
     from modulos.tracker_list import gerar_lista_trackers
+    from modulos.db import init_db
+    from modulos.notificacao import Notificador
 
     print("🔍 Gerando lista de trackers...")
     print("=" * 60)
-    client = _conectar_qbittorrent(cfg, lambda *a, **kw: None)
-    gerar_lista_trackers(client)
+    conn   = init_db(cfg["DB_DIR"], cfg["DB_PATH"])
+    client = _conectar_qbittorrent(cfg, Notificador(), conn)     # sem canais: so imprime
+    gerar_lista_trackers(client, conn, cfg["TRACKER_CACHE_TTL_HORAS"],
+                         _criar_espelho(cfg, client, conn))
+    conn.close()
+
+
+def _imprimir_canais(cfg):
+    """Credenciais de cada canal de notificação, com tokens/keys mascarados."""
+    from modulos.notificacao import canais_do_config
+
+    canais = canais_do_config(cfg["NOTIFICACAO_TIPO"], cfg["NOTIFICACAO_CONFIG"])
+    for tipo, config in canais:
+        if len(canais) > 1:
+            print(f"   [{tipo}]")
+        for k, v in config.items():
+            valor = str(v)
+            if "token" in k.lower() or "key" in k.lower():
+                valor = valor[:8] + "..." if len(valor) > 8 else "***"
+            print(f"   {k}: {valor}")
 
 
 def cmd_test_notification(cfg):
     """Envia notificação de teste."""
-    from modulos.notificacao import criar_notificador
+    from modulos.notificacao import canais_do_config, criar_notificador
 
     print("📲 Testando notificação...")
     print("=" * 60)
     print(f"   Tipo:   {cfg['NOTIFICACAO_TIPO']}")
 
-    if cfg["NOTIFICACAO_TIPO"] == "nenhum":
+    if not canais_do_config(cfg["NOTIFICACAO_TIPO"], cfg["NOTIFICACAO_CONFIG"]):
         print("   ⚠️  NOTIFICACAO_TIPO = 'nenhum' — nada será enviado")
         print("   Configure um canal no config.py primeiro")
         return
 
-    for k, v in cfg["NOTIFICACAO_CONFIG"].items():
-        valor = str(v)
-        if "token" in k.lower() or "key" in k.lower():
-            valor = valor[:8] + "..." if len(valor) > 8 else "***"
-        print(f"   {k}: {valor}")
+    _imprimir_canais(cfg)
 
     enviar = criar_notificador(cfg["NOTIFICACAO_TIPO"], cfg["NOTIFICACAO_CONFIG"])
     print("\n   Enviando mensagem de teste...")
     enviar("qbit-manager — Teste", "Notificação de teste enviada com sucesso!",
            priority=0, event_type="test")
-    print("   ✅ Enviado! Verifique seu canal de notificação.")
+    for r in enviar.aguardar(cfg["NOTIFICACAO_PRAZO_SEGUNDOS"]):
+        if r["erro"]:
+            print(f"   ❌ {r['canal']}: {r['erro']}")
+        else:
+            print(f"   ✅ {r['canal']}: enviado! Verifique seu canal de notificação.")
 
 
 def cmd_check_send_log(cfg):
     """Testa envio de log ao OTEL Collector."""
+    from modulos.envio_otel import aguardar_envio
     from modulos.otel import configurar_otel, log, flush
 
     print("📡 Testando envio de log ao OTEL...")
@@ -403,6 +583,9 @@ def cmd_check_send_log(cfg):
         service_name=cfg["OTEL_SERVICE_NAME"],
         environment=cfg["OTEL_ENVIRONMENT"],
         enabled=True,
+        spool_dir=cfg["DB_DIR"],
+        spool_max_mb=cfg["OTEL_SPOOL_MAX_MB"],
+        prazo_envio_segundos=cfg["OTEL_PRAZO_ENVIO_SEGUNDOS"],
     )
 
     print("\n   Acumulando logs de teste no buffer...")
@@ -411,11 +594,206 @@ def cmd_check_send_log(cfg):
     log("Log de teste 3 — completado", level="info", teste=True)
 
     print("   Enviando bloco para o collector...")
-    sucesso = flush()
+    sucesso = flush() and aguardar_envio()
     if sucesso:
         print("   ✅ Log enviado com sucesso! Verifique seu OTEL Collector.")
     else:
-        print("   ❌ Falha ao enviar — verifique o endpoint e conectividade")
+        print("   ❌ Falha ao enviar — verifique o endpoint e conectividade "
+              "(o log ficou no spool para o próximo run)")
+
+
+def _compactar(cfg, conn, prazo_segundos=None, converter_vacuum=False):
+    from modulos.compactacao import compactar, imprimir_resumo
+
+    resumo = compactar(
+        conn,
+        retencao_snapshots_dias=cfg["RETENCAO_SNAPSHOTS_DIAS"],
+        retencao_horario_dias=cfg["RETENCAO_HORARIO_DIAS"],
+        retencao_runs_dias=cfg["RETENCAO_RUNS_DIAS"],
+        lote=cfg["COMPACTAR_LOTE"],
+        prazo_segundos=prazo_segundos,
+        converter_vacuum=converter_vacuum,
+    )
+    imprimir_resumo(resumo)
+    return resumo
+
+
+def cmd_compact(cfg):
+    """Aplica a retenção e compacta o banco (sem prazo, converte o auto_vacuum)."""
+    from modulos.db import init_db
+
+    print("🧹 Compactando o banco...")
+    print("=" * 60)
+    conn = init_db(cfg["DB_DIR"], cfg["DB_PATH"])
+    tamanho_antes = os.path.getsize(cfg["DB_PATH"])
+    _compactar(cfg, conn, converter_vacuum=True)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    tamanho_depois = os.path.getsize(cfg["DB_PATH"])
+    print(f"   💾 {cfg['DB_PATH']}: {tamanho_antes / 1024 ** 2:.1f} MB → "
+          f"{tamanho_depois / 1024 ** 2:.1f} MB")
+
+
+def _executar_ciclo(cfg, client, conn, enviar_notificacao, espelho=None,
+                    cache_trackers=None):
+    """Corpo de um run: checagem de disco completa + envio do log OTEL."""
+    from modulos.checagem_disco import executar_checagem
+    from modulos.compactacao import compactacao_devida
+    from modulos.db import transacao
+    from modulos.otel import flush as otel_flush, imprimir_fases, span
+    from modulos.prometheus import publicar_metricas
+
+    with span("run") as raiz:
+        # Notificacoes que nao chegaram em runs anteriores
+        enviar_notificacao.reenviar_pendentes(conn)
+
+        # Executar checagem de disco (orquestrador principal) — commits adiados e
+        # confirmados ao fim de cada PASSO, nunca durante chamadas ao qBittorrent;
+        # uma excecao desfaz so o que nao foi confirmado (modulos/db.py)
+        with transacao(conn):
+            run_id = executar_checagem(
+                client=client,
+                conn=conn,
+                paths_config=cfg["PATHS"],
+                tracker_rules=cfg["TRACKER_RULES"],
+                seed_cleaner_dry_run=cfg["SEED_CLEANER_DRY_RUN"],
+                min_downloads_per_tracker=cfg["MIN_DOWNLOADS_PER_TRACKER"],
+                min_torrents_per_tracker=cfg["MIN_TORRENTS_PER_TRACKER"],
+                enviar_notificacao_fn=enviar_notificacao,
+                tracker_cache_ttl_horas=cfg["TRACKER_CACHE_TTL_HORAS"],
+                espelho=espelho,
+                cache_trackers=cache_trackers,
+                previsao_janela_horas=cfg["PREVISAO_JANELA_HORAS"],
+                previsao_horizonte_minutos=cfg["PREVISAO_HORIZONTE_MINUTOS"],
+                seed_cleaner_alvo=cfg["SEED_CLEANER_ALVO"],
+                seed_cleaner_prazo_segundos=cfg["SEED_CLEANER_PRAZO_SEGUNDOS"],
+            )
+        raiz["attrs"]["run_id"] = run_id
+
+        # Renovar o prazo do cookie salvo (o qBittorrent conta o timeout por inatividade)
+        sessao = getattr(client, "sessao_qb", None)
+        if sessao is not None:
+            sessao.salvar()
+
+        # Compactacao automatica nas horas de pouco uso, com prazo (continua no proximo ciclo)
+        if compactacao_devida(conn, cfg["COMPACTAR_HORAS"]):
+            print(f"\n🧹 Compactação automática (prazo: {cfg['COMPACTAR_PRAZO_SEGUNDOS']}s)")
+            with span("compactacao"):
+                _compactar(cfg, conn, prazo_segundos=cfg["COMPACTAR_PRAZO_SEGUNDOS"])
+
+        # Esperar os envios das notificacoes (com prazo) e guardar os pendentes
+        with span("notificacoes"):
+            enviar_notificacao.concluir(conn, cfg["NOTIFICACAO_PRAZO_SEGUNDOS"])
+
+    imprimir_fases()
+
+    # Metricas do run para o Prometheus (antes do flush, que limpa as metricas)
+    publicar_metricas()
+
+    # Enviar log completo e o trace do run para o OTEL
+    otel_flush()
+    return run_id
+
+
+def cmd_daemon(cfg, config_dir, intervalo=None):
+    """Executa o fluxo principal em loop, mantendo conexões e caches entre ciclos."""
+    from modulos.daemon import loop_daemon
+    from modulos.db import init_db
+    from modulos.envio_otel import aguardar_envio
+    from modulos.otel import configurar_otel
+    from modulos.notificacao import criar_notificador
+    from modulos.inventario import CacheTrackers
+    from modulos.prometheus import configurar_prometheus, iniciar_servidor, parar_servidor
+    from modulos.acoes import configurar_acoes
+    from modulos.conteudo import configurar_conteudo
+
+    print("🚀 qBittorrent Manager (daemon)")
+    print("=" * 70)
+
+    estado = {"cfg": None, "conn": None, "client": None, "enviar": None,
+              "espelho": None, "cache_trackers": None}
+
+    def _preparar(novo):
+        anterior = estado["cfg"] or {}
+        configurar_otel(
+            endpoint=novo["OTEL_ENDPOINT"],
+            service_name=novo["OTEL_SERVICE_NAME"],
+            environment=novo["OTEL_ENVIRONMENT"],
+            enabled=novo["OTEL_ENABLED"],
+            spool_dir=novo["DB_DIR"],
+            spool_max_mb=novo["OTEL_SPOOL_MAX_MB"],
+            prazo_envio_segundos=novo["OTEL_PRAZO_ENVIO_SEGUNDOS"],
+        )
+        configurar_prometheus(novo["PROMETHEUS_TEXTFILE"], novo["PROMETHEUS_PORTA"],
+                              novo["PROMETHEUS_ENDERECO"])
+        iniciar_servidor()
+        configurar_acoes(novo["ACOES_TAMANHO_LOTE"])
+        configurar_conteudo(novo["CONTEUDO_CACHE_TTL_HORAS"])
+
+        # Canais iguais: mantem o notificador (threads e sessoes HTTP)
+        enviar = estado["enviar"]
+        if enviar is None or any(novo[k] != anterior.get(k)
+                                 for k in ("NOTIFICACAO_TIPO", "NOTIFICACAO_CONFIG")):
+            enviar = criar_notificador(novo["NOTIFICACAO_TIPO"], novo["NOTIFICACAO_CONFIG"])
+
+        conn = estado["conn"]
+        if conn is None or novo["DB_PATH"] != anterior.get("DB_PATH"):
+            conn = init_db(novo["DB_DIR"], novo["DB_PATH"])
+            print(f"✅ Banco: {novo['DB_PATH']}")
+
+        client = estado["client"]
+        if client is None or any(novo[k] != anterior.get(k) for k in ("QB_URL", "QB_USER", "QB_PASS")):
+            try:
+                client = _conectar_qbittorrent(novo, enviar, conn)
+            except SystemExit:
+                if enviar is not estado["enviar"]:
+                    enviar.encerrar(prazo_segundos=0)
+                raise
+        elif conn is not estado["conn"]:
+            client.sessao_qb.conn = conn
+
+        # Conexoes novas invalidam espelho e cache de trackers
+        espelho = estado["espelho"]
+        if (conn is not estado["conn"] or client is not estado["client"]
+                or novo["SYNC_MAINDATA"] != anterior.get("SYNC_MAINDATA")):
+            espelho = _criar_espelho(novo, client, conn)
+        cache_trackers = estado["cache_trackers"]
+        if (conn is not estado["conn"]
+                or novo["TRACKER_CACHE_TTL_HORAS"] != anterior.get("TRACKER_CACHE_TTL_HORAS")):
+            cache_trackers = CacheTrackers(conn, novo["TRACKER_CACHE_TTL_HORAS"])
+
+        # Notificador antigo: grava os resultados dele no banco antigo e para as threads
+        if estado["enviar"] is not None and enviar is not estado["enviar"]:
+            estado["enviar"].encerrar(estado["conn"], anterior["NOTIFICACAO_PRAZO_SEGUNDOS"])
+        if estado["conn"] is not None and conn is not estado["conn"]:
+            estado["conn"].close()
+        estado.update(cfg=novo, conn=conn, client=client, enviar=enviar,
+                      espelho=espelho, cache_trackers=cache_trackers)
+
+    def _recarregar():
+        try:
+            _preparar(_carregar_config(config_dir))
+        except SystemExit:
+            print("   ❌ Falha ao reconectar com a nova configuração — mantendo a anterior")
+
+    def _ciclo():
+        _executar_ciclo(estado["cfg"], estado["client"], estado["conn"], estado["enviar"],
+                        espelho=estado["espelho"], cache_trackers=estado["cache_trackers"])
+
+    def _intervalo():
+        return intervalo or estado["cfg"]["DAEMON_INTERVALO_SEGUNDOS"]
+
+    _preparar(cfg)
+    print(f"⏱️  Intervalo: {_intervalo()}s — SIGTERM encerra, SIGHUP recarrega a configuração")
+
+    arquivos_config = [os.path.join(config_dir, "config.py"),
+                       os.path.join(config_dir, "tracker_rules.py")]
+    loop_daemon(_ciclo, _intervalo, arquivos_config, _recarregar)
+
+    parar_servidor()
+    estado["enviar"].encerrar(estado["conn"], estado["cfg"]["NOTIFICACAO_PRAZO_SEGUNDOS"])
+    aguardar_envio()
+    estado["conn"].close()
 
 
 # ==========================================================================
@@ -434,7 +812,7 @@ def main():
     # ── Resolver INSTALL_DIR (--modules sobrescreve) ─────────────────────
     _setup_modules(cfg, args.modules)
 
-    # ── Despachar subcomando ─────────────────────────────────────────────
+    # ── Subcomandos leves (sem qBittorrent) ──────────────────────────────
     if args.check_config:
         cmd_check_config(cfg, config_dir)
         return
@@ -443,6 +821,25 @@ def main():
         cmd_check_disk(cfg)
         return
 
+    if args.test_notification:
+        cmd_test_notification(cfg)
+        return
+
+    if args.check_send_log:
+        cmd_check_send_log(cfg)
+        return
+
+    if args.compact:
+        cmd_compact(cfg)
+        return
+
+    # ── Tamanho dos lotes de ações na API ────────────────────────────────
+    from modulos.acoes import configurar_acoes
+    from modulos.conteudo import configurar_conteudo
+    configurar_acoes(cfg["ACOES_TAMANHO_LOTE"])
+    configurar_conteudo(cfg["CONTEUDO_CACHE_TTL_HORAS"])
+
+    # ── Despachar subcomando ─────────────────────────────────────────────
     if args.check_torrent:
         cmd_check_torrent(cfg)
         return
@@ -455,19 +852,16 @@ def main():
         cmd_tracker_list(cfg)
         return
 
-    if args.test_notification:
-        cmd_test_notification(cfg)
-        return
-
-    if args.check_send_log:
-        cmd_check_send_log(cfg)
+    if args.daemon:
+        cmd_daemon(cfg, config_dir, args.interval)
         return
 
     # ── Fluxo principal (execucao normal / cron) ─────────────────────────
     from modulos.db import init_db
-    from modulos.otel import configurar_otel, flush as otel_flush
-    from modulos.checagem_disco import executar_checagem
+    from modulos.envio_otel import aguardar_envio
+    from modulos.otel import configurar_otel
     from modulos.notificacao import criar_notificador
+    from modulos.prometheus import configurar_prometheus
 
     print("🚀 qBittorrent Manager (Modular)")
     print("=" * 70)
@@ -478,8 +872,14 @@ def main():
         service_name=cfg["OTEL_SERVICE_NAME"],
         environment=cfg["OTEL_ENVIRONMENT"],
         enabled=cfg["OTEL_ENABLED"],
+        spool_dir=cfg["DB_DIR"],
+        spool_max_mb=cfg["OTEL_SPOOL_MAX_MB"],
+        prazo_envio_segundos=cfg["OTEL_PRAZO_ENVIO_SEGUNDOS"],
     )
 
+    # Prometheus: no cron so o textfile (o /metrics e do --daemon)
+    configurar_prometheus(textfile=cfg["PROMETHEUS_TEXTFILE"])
+
     # Notificador
     enviar_notificacao = criar_notificador(
         cfg["NOTIFICACAO_TIPO"], cfg["NOTIFICACAO_CONFIG"]
@@ -490,22 +890,13 @@ def main():
     print(f"✅ Banco: {cfg['DB_PATH']}")
 
     # Conectar ao qBittorrent
-    client = _conectar_qbittorrent(cfg, enviar_notificacao)
-
-    # Executar checagem de disco (orquestrador principal)
-    run_id = executar_checagem(
-        client=client,
-        conn=conn,
-        paths_config=cfg["PATHS"],
-        tracker_rules=cfg["TRACKER_RULES"],
-        seed_cleaner_dry_run=cfg["SEED_CLEANER_DRY_RUN"],
-        min_downloads_per_tracker=cfg["MIN_DOWNLOADS_PER_TRACKER"],
-        min_torrents_per_tracker=cfg["MIN_TORRENTS_PER_TRACKER"],
-        enviar_notificacao_fn=enviar_notificacao,
-    )
+    client = _conectar_qbittorrent(cfg, enviar_notificacao, conn)
 
-    # Enviar log completo para o OTEL (um unico registro com tudo)
-    otel_flush()
+    _executar_ciclo(cfg, client, conn, enviar_notificacao,
+                    espelho=_criar_espelho(cfg, client, conn))
+
+    # Esperar a thread de envio do OTEL (com prazo; o resto vai para o spool)
+    aguardar_envio()
 
     print(f"🗄️  {cfg['DB_PATH']}")
     print("=" * 70)
@@ -0,0 +1,8 @@
+# tests/conftest.py — raiz do repositorio no sys.path (import modulos.*)
+
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
@@ -0,0 +1,46 @@
+# tests/test_acoes.py — lotes da API e divisao ao meio de lote com falha
+
+from modulos.acoes import executar_em_lote
+
+
+class ClientePausa:
+    """Falha o lote inteiro se ele contem algum hash 'ruim'."""
+
+    def __init__(self, ruins=()):
+        self.ruins    = set(ruins)
+        self.chamadas = []
+
+    def torrents_pause(self, torrent_hashes):
+        lote = torrent_hashes.split("|")
+        self.chamadas.append(lote)
+        if self.ruins & set(lote):
+            raise RuntimeError("hash invalido")
+
+
+def test_lotes_respeitam_o_tamanho_e_removem_duplicados():
+    client = ClientePausa()
+    hashes = [f"h{i}" for i in range(7)] + ["h0"]
+    resultados = executar_em_lote(client, "pause", hashes, tamanho_lote=3)
+    assert [len(l) for l in client.chamadas] == [3, 3, 1]
+    assert resultados == {f"h{i}": None for i in range(7)}
+
+
+def test_lote_com_falha_e_dividido_ate_isolar_o_hash():
+    client = ClientePausa(ruins={"h5"})
+    hashes = [f"h{i}" for i in range(8)]
+    resultados = executar_em_lote(client, "pause", hashes, tamanho_lote=8)
+
+    assert resultados["h5"] == "hash invalido"
+    assert all(resultados[h] is None for h in hashes if h != "h5")
+    # 8 -> 4+4 -> 2+2 (metade com h5) -> 1+1: log2(8) niveis, nao 8 chamadas isoladas
+    assert client.chamadas[0] == hashes
+    assert ["h5"] in client.chamadas
+    assert len(client.chamadas) == 7
+
+
+def test_falha_sem_mensagem_usa_o_nome_da_excecao():
+    class Cliente:
+        def torrents_recheck(self, torrent_hashes):
+            raise TimeoutError()
+
+    assert executar_em_lote(Cliente(), "recheck", ["a"]) == {"a": "TimeoutError"}
@@ -0,0 +1,133 @@
+# tests/test_db.py — snapshot delta x v_torrent_snapshots, abertura somente leitura,
+# init_db sem escrita e transacao do run
+
+import random
+import sqlite3
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from modulos.db import (
+    abrir_leitura,
+    confirmar,
+    criar_run,
+    init_db,
+    salvar_snapshots,
+    transacao,
+    _faixa_progresso,
+)
+
+ESPACOS = {"p2p": {"livre": 50.0, "critico": False, "ok": True,
+                   "limite_min": 10, "limite_max": 20}}
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = init_db(str(tmp_path), str(tmp_path / "qbit.db"))
+    yield conn
+    conn.close()
+
+
+def _torrent(i):
+    return SimpleNamespace(hash=f"h{i:03d}", name=f"Release.{i}", state="stalledUP",
+                           progress=1.0, size=1000 + i, dlspeed=0, upspeed=0, force_start=False)
+
+
+def test_view_reconstroi_o_snapshot_completo_de_cada_run(conn):
+    rnd      = random.Random(7)
+    torrents = {t.hash: t for t in map(_torrent, range(40))}
+    esperado = {}
+    for n in range(30):
+        for t in rnd.sample(list(torrents.values()), 8):
+            t.state       = rnd.choice(("stalledUP", "uploading", "downloading", "pausedDL"))
+            t.progress    = round(rnd.random(), 3)
+            t.force_start = rnd.random() < 0.2
+        if n % 4 == 3:
+            del torrents[rnd.choice(sorted(torrents))]
+        novo = _torrent(100 + n)
+        torrents[novo.hash] = novo
+
+        # tracker_list nao e run de checagem: nao aparece na view
+        status = "tracker_list" if n % 10 == 5 else rnd.choice(("active", "paused"))
+        run_id = criar_run(conn, status, 0, 0, ESPACOS)
+        gravadas = salvar_snapshots(conn, run_id, list(torrents.values()), {})
+        if n:
+            assert gravadas < len(torrents)     # delta, nao snapshot completo
+        if status != "tracker_list":
+            esperado[run_id] = {(t.hash, t.state, int(t.force_start), _faixa_progresso(t.progress))
+                                for t in torrents.values()}
+
+    for run_id, linhas in esperado.items():
+        view = {(r["hash"], r["state"], r["force_start"], _faixa_progresso(r["progress"]))
+                for r in conn.execute("SELECT * FROM v_torrent_snapshots WHERE run_id = ?",
+                                      (run_id,))}
+        assert view == linhas, run_id
+    assert not conn.execute("SELECT 1 FROM v_torrent_snapshots v JOIN runs r ON r.id = v.run_id "
+                            "WHERE r.status = 'tracker_list'").fetchone()
+
+
+def test_abrir_leitura_sem_banco_levanta_erro_do_sqlite(tmp_path):
+    with pytest.raises(sqlite3.Error):
+        abrir_leitura(str(tmp_path / "nao-existe.db"))
+
+
+def test_abrir_leitura_nao_grava_no_banco(tmp_path):
+    db_path = str(tmp_path / "qbit.db")
+    init_db(str(tmp_path), db_path).close()
+    leitor = abrir_leitura(db_path)
+    with pytest.raises(sqlite3.OperationalError):
+        leitor.execute("DELETE FROM runs")
+    leitor.close()
+
+
+def test_init_db_nao_espera_a_transacao_do_run(tmp_path, conn):
+    db_path = str(tmp_path / "qbit.db")
+    with transacao(conn):
+        criar_run(conn, "active", 0, 0, ESPACOS)
+        inicio = time.monotonic()
+        outra  = init_db(str(tmp_path), db_path)
+        leitor = abrir_leitura(db_path)
+        assert time.monotonic() - inicio < 1
+        # Leitores veem o ultimo estado confirmado, sem o run em andamento
+        assert leitor.execute("SELECT COUNT(*) FROM runs").fetchone()[0] == 0
+        outra.close()
+        leitor.close()
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2     # INCREMENTAL
+
+
+def test_confirmar_libera_a_trava_de_escrita_dentro_da_transacao(tmp_path, conn):
+    db_path = str(tmp_path / "qbit.db")
+    outra   = sqlite3.connect(db_path, timeout=0.2)
+    with transacao(conn):
+        criar_run(conn, "active", 0, 0, ESPACOS)
+        with pytest.raises(sqlite3.OperationalError):
+            outra.execute("INSERT INTO runs (started_at, status) VALUES ('x', 'manual_erase')")
+        confirmar(conn)
+        # Entre dois PASSOs outro processo (--erase-torrent, --compact) consegue gravar
+        outra.execute("INSERT INTO runs (started_at, status) VALUES ('x', 'manual_erase')")
+        outra.commit()
+    outra.close()
+    assert conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0] == 2
+
+
+def test_excecao_desfaz_so_o_que_nao_foi_confirmado(conn):
+    with pytest.raises(RuntimeError):
+        with transacao(conn):
+            criar_run(conn, "active", 0, 0, ESPACOS)
+            confirmar(conn)
+            criar_run(conn, "active", 0, 0, ESPACOS)
+            raise RuntimeError("falha no meio do run")
+    assert conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0] == 1
+    assert conn.profundidade == 0
+
+
+def test_banco_antigo_perde_a_coluna_grupo_eligible_at(tmp_path, conn):
+    conn.execute("ALTER TABLE seed_eligibility ADD COLUMN grupo_eligible_at TEXT")
+    conn.execute("PRAGMA user_version = 2")
+    conn.commit()
+    outra   = init_db(str(tmp_path), str(tmp_path / "qbit.db"))
+    colunas = {r["name"] for r in outra.execute("PRAGMA table_info(seed_eligibility)")}
+    outra.close()
+    assert "grupo_eligible_at" not in colunas
+    assert "eligible_at" in colunas
@@ -0,0 +1,48 @@
+# tests/test_envio_otel.py — thread de envio OTLP e spool
+
+import json
+
+import pytest
+
+import modulos.envio_otel as envio_otel
+
+
+@pytest.fixture
+def spool(tmp_path, monkeypatch):
+    monkeypatch.setitem(envio_otel._config, "spool", str(tmp_path / "otel-spool.jsonl"))
+    monkeypatch.setitem(envio_otel._config, "prazo_segundos", 5)
+    return tmp_path / "otel-spool.jsonl"
+
+
+def _caminhos_no_spool(spool):
+    return [json.loads(l)["caminho"] for l in spool.read_text().splitlines()]
+
+
+def test_excecao_no_envio_vai_para_o_spool_e_a_thread_continua(spool, monkeypatch):
+    def _post(endpoint, caminho, payload):
+        if caminho == "/v1/logs":
+            raise ValueError("payload inválido")
+        return True, None
+
+    monkeypatch.setattr(envio_otel, "_post", _post)
+    envio_otel.enfileirar("http://collector", "/v1/logs", {"resourceLogs": []}, "logs")
+    assert envio_otel.aguardar_envio() is False
+    assert _caminhos_no_spool(spool) == ["/v1/logs"]
+    assert envio_otel._estado["em_envio"] is None
+
+    # Mesma thread: reenvia o spool e o payload novo
+    envio_otel._reescrever_spool([])
+    envio_otel.enfileirar("http://collector", "/v1/traces", {"resourceSpans": []}, "traces")
+    assert envio_otel.aguardar_envio() is True
+    assert not spool.exists()
+
+
+def test_erro_ao_ler_o_spool_nao_prende_o_em_envio(spool, monkeypatch):
+    def _reenviar_spool(endpoint):
+        raise OSError("spool ilegível")
+
+    monkeypatch.setattr(envio_otel, "_reenviar_spool", _reenviar_spool)
+    envio_otel.enfileirar("http://collector", "/v1/metrics", {"resourceMetrics": []}, "metricas")
+    assert envio_otel.aguardar_envio(prazo_segundos=2) is False
+    assert envio_otel._estado["em_envio"] is None
+    assert _caminhos_no_spool(spool) == ["/v1/metrics"]
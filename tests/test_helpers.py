@@ -0,0 +1,35 @@
+# tests/test_helpers.py — IndiceRegras (TRACKER_RULES por sufixo de dominio)
+
+from modulos.helpers import IndiceRegras, get_tracker_rules_for_torrent
+
+
+def test_regra_vale_para_o_dominio_e_subdominios():
+    indice = IndiceRegras({"example.com": 30})
+    assert indice.regra("example.com") == ("example.com", 30)
+    assert indice.regra("tracker.example.com") == ("example.com", 30)
+    assert indice.regra("a.b.example.com") == ("example.com", 30)
+
+
+def test_regra_nao_casa_sufixo_parcial_de_label():
+    indice = IndiceRegras({"example.com": 30})
+    assert indice.regra("myexample.com") is None
+    assert indice.regra("example.com.br") is None
+    assert indice.regra("") is None
+
+
+def test_regra_mais_especifica_vence():
+    indice = IndiceRegras({"example.com": 30, "tracker1.example.com": 7})
+    assert indice.regra("tracker1.example.com") == ("tracker1.example.com", 7)
+    assert indice.regra("x.tracker1.example.com") == ("tracker1.example.com", 7)
+    assert indice.regra("tracker2.example.com") == ("example.com", 30)
+
+
+def test_regra_normaliza_curinga_ponto_e_maiusculas():
+    indice = IndiceRegras({"*.Example.COM.": 14, ".outro.org": 3})
+    assert indice.regra("t.example.com") == ("*.Example.COM.", 14)
+    assert indice.regra("outro.org") == (".outro.org", 3)
+
+
+def test_regras_por_torrent_ignoram_hosts_sem_regra():
+    regras = get_tracker_rules_for_torrent(["a.example.com", "sem.regra.net"], {"example.com": 30})
+    assert regras == [("example.com", 30)]
@@ -0,0 +1,104 @@
+# tests/test_identidade.py — union-find e grupos de cross-seed por conteudo
+
+from types import SimpleNamespace
+
+from modulos.db import init_db
+from modulos.identidade import UniaoBusca, impressao_arquivos, indexar_identidade
+
+
+def test_uniao_busca_agrupa_transitivamente():
+    uniao = UniaoBusca()
+    uniao.unir("a", "b")
+    uniao.unir("c", "d")
+    uniao.unir("b", "d")
+    assert len({uniao.achar(x) for x in "abcd"}) == 1
+    assert uniao.achar("e") == "e"
+
+
+def _arquivo(nome, size):
+    return SimpleNamespace(name=nome, size=size)
+
+
+class Inventario:
+    def __init__(self, torrents, arquivos):
+        self.torrents      = torrents
+        self.files_fetches = 0
+        self.client        = SimpleNamespace(
+            torrents_files=lambda torrent_hash: arquivos[torrent_hash])
+
+    def todos(self):
+        return self.torrents
+
+
+def _torrent(h, content_path, size, save_path="/dados", v2=""):
+    return SimpleNamespace(hash=h, content_path=content_path, save_path=save_path,
+                           size=size, total_size=size, infohash_v2=v2)
+
+
+def test_impressao_ignora_a_pasta_raiz_mas_nao_os_nomes():
+    original  = [_arquivo("Show.S01/e1.mkv", 5), _arquivo("Show.S01/e2.mkv", 5)]
+    renomeado = [_arquivo("Show.S01.REPACK/e2.mkv", 5), _arquivo("Show.S01.REPACK/e1.mkv", 5)]
+    outro     = [_arquivo("Outro/a.mkv", 5), _arquivo("Outro/b.mkv", 5)]
+    assert impressao_arquivos(original) == impressao_arquivos(renomeado)
+    assert impressao_arquivos(original) != impressao_arquivos(outro)
+    assert impressao_arquivos(original).startswith("2:")
+
+
+def test_grupos_por_caminho_v2_e_raiz_renomeada():
+    torrents = [
+        _torrent("a", "/dados/Show.S01", 10),
+        _torrent("b", "/dados/Show.S01/", 10),                      # mesmo content_path
+        _torrent("c", "/dados/Show.S01.REPACK", 10),                # raiz renomeada
+        _torrent("d", "/dados/Filme.mkv", 7, v2="f" * 64),
+        _torrent("e", "/outro/Filme.2160p.mkv", 9, v2="f" * 64),    # mesmo info dict v2
+    ]
+    arquivos = {
+        "a": [_arquivo("Show.S01/e1.mkv", 5), _arquivo("Show.S01/e2.mkv", 5)],
+        "b": [_arquivo("Show.S01/e1.mkv", 5), _arquivo("Show.S01/e2.mkv", 5)],
+        "c": [_arquivo("Show.S01.REPACK/e1.mkv", 5), _arquivo("Show.S01.REPACK/e2.mkv", 5)],
+    }
+    grupos = indexar_identidade(Inventario(torrents, arquivos))
+    assert grupos == {"a": "a", "b": "a", "c": "a", "d": "d", "e": "d"}
+
+
+def test_tamanho_igual_por_coincidencia_nao_agrupa():
+    torrents = [_torrent("a", "/dados/x.mkv", 10), _torrent("b", "/dados/y.mkv", 10)]
+    arquivos = {"a": [_arquivo("x.mkv", 10)], "b": [_arquivo("y.mkv", 10)]}
+    assert indexar_identidade(Inventario(torrents, arquivos)) == {"a": "a", "b": "b"}
+
+
+def test_multi_arquivo_sem_pasta_raiz_nao_agrupa_pelo_save_path():
+    # content_path == save_path: nao identifica o conteudo
+    torrents = [_torrent("a", "/dados", 7), _torrent("b", "/dados/", 7),
+                _torrent("c", "/dados", 4)]
+    arquivos = {
+        "a": [_arquivo("a1.mkv", 3), _arquivo("a2.mkv", 4)],
+        "b": [_arquivo("b1.mkv", 2), _arquivo("b2.mkv", 5)],
+    }
+    inventario = Inventario(torrents, arquivos)
+    assert indexar_identidade(inventario) == {"a": "a", "b": "b", "c": "c"}
+    # Tamanho repetido sem caminho proprio: a impressao foi consultada
+    assert inventario.files_fetches == 2
+
+
+def test_falha_no_torrents_files_espera_antes_de_repetir(tmp_path):
+    conn     = init_db(str(tmp_path), str(tmp_path / "qbit.db"))
+    torrents = [_torrent("a", "/dados/x", 10), _torrent("b", "/dados/y", 10)]
+    chamadas = []
+
+    def torrents_files(torrent_hash):
+        chamadas.append(torrent_hash)
+        if torrent_hash == "a":
+            raise RuntimeError("404")
+        return [_arquivo("y/1.mkv", 10)]
+
+    inventario = Inventario(torrents, {})
+    inventario.client.torrents_files = torrents_files
+    indexar_identidade(inventario, conn)
+    indexar_identidade(inventario, conn)
+    assert chamadas == ["a", "b"]           # b tem impressao; a so depois de NOVA_TENTATIVA
+
+    conn.execute("UPDATE content_identity SET falha_at = '2000-01-01T00:00:00' WHERE hash = 'a'")
+    indexar_identidade(inventario, conn)
+    assert chamadas == ["a", "b", "a"]
+    conn.close()
@@ -0,0 +1,82 @@
+# tests/test_importacao.py — Orcamento de tempo de import dos subcomandos leves
+#
+# Roda o qbit-manager.py com `python -X importtime` contra um config.py
+# minimo e soma o tempo acumulado dos imports de nivel superior (o que o
+# processo paga antes de fazer algo util). Fica com a menor de algumas
+# execucoes, para nao medir ruido do sistema. A primeira execucao grava o
+# cache do config.py (CONFIG_DIR/__pycache__); as seguintes medem o caminho
+# com cache.
+#
+# Orcamento: QBIT_ORCAMENTO_IMPORT_MS (padrao 80 ms) — maquinas lentas de CI
+# podem aumentar pelo ambiente.
+
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+from tests.conftest import RAIZ
+
+SCRIPT       = os.path.join(RAIZ, "qbit-manager.py")
+ORCAMENTO_MS = float(os.environ.get("QBIT_ORCAMENTO_IMPORT_MS", 80))
+REPETICOES   = 5
+
+# subcomando -> modulos que nao podem ser importados
+SUBCOMANDOS = {
+    "--check-config": ("qbittorrentapi", "requests", "sqlite3"),
+    "--check-disk":   ("qbittorrentapi", "requests"),    # le a previsao do banco
+}
+
+_LINHA = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)$")
+
+
+@pytest.fixture(scope="module")
+def config_dir(tmp_path_factory):
+    pasta = tmp_path_factory.mktemp("config")
+    dados = pasta / "dados"
+    dados.mkdir()
+    (pasta / "config.py").write_text(
+        f"DB_DIR  = {str(dados)!r}\n"
+        f"DB_PATH = {str(dados / 'qbit.db')!r}\n"
+        f"PATHS = {{\n"
+        f"    'p2p': {{'path': {str(pasta)!r}, 'limite_min': 0, 'limite_max': 0,\n"
+        f"             'seed_cleaner': True, 'pause_trigger': True}},\n"
+        f"}}\n"
+        f"TRACKER_RULES = {{'example.com': 30}}\n",
+        encoding="utf-8")
+    return str(pasta)
+
+
+def medir(subcomando, config_dir):
+    """Roda o subcomando uma vez. Retorna (ms de nivel superior, {modulo: ms acumulado})."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", SCRIPT, subcomando,
+         "--config", config_dir, "--modules", RAIZ],
+        capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stdout + proc.stderr
+    total, modulos = 0.0, {}
+    for linha in proc.stderr.splitlines():
+        m = _LINHA.match(linha)
+        if not m:
+            continue
+        acumulado = int(m.group(2)) / 1000
+        modulos[m.group(4)] = acumulado
+        if len(m.group(3)) == 1:        # nivel superior
+            total += acumulado
+    return round(total, 1), modulos
+
+
+@pytest.mark.parametrize("subcomando", sorted(SUBCOMANDOS))
+def test_import_dentro_do_orcamento(subcomando, config_dir):
+    medicoes = [medir(subcomando, config_dir) for _ in range(REPETICOES)]
+    total, modulos = min(medicoes, key=lambda m: m[0])
+
+    carregados = [p for p in SUBCOMANDOS[subcomando] if any(p in m[1] for m in medicoes)]
+    assert not carregados, f"{subcomando} importou {', '.join(carregados)}"
+
+    pesados = ", ".join(f"{nome} {ms:.1f} ms" for nome, ms in
+                        sorted(modulos.items(), key=lambda m: m[1], reverse=True)[:8])
+    assert total <= ORCAMENTO_MS, (
+        f"{subcomando}: {total} ms de import (orçamento {ORCAMENTO_MS:g} ms) — {pesados}")
@@ -0,0 +1,49 @@
+# tests/test_inventario.py — inventario compartilhado do run e tracker principal
+
+from types import SimpleNamespace
+
+from modulos.inventario import InventarioTorrents
+
+
+class Cliente:
+    def __init__(self, torrents):
+        self.torrents = torrents
+        self.buscas   = 0
+
+    def torrents_info(self):
+        self.buscas += 1
+        return list(self.torrents)
+
+
+def _torrent(h, state="stalledUP", tracker=""):
+    return SimpleNamespace(hash=h, name=h, state=state, tracker=tracker)
+
+
+def test_busca_evitada_conta_por_consumidor_e_nao_por_acesso():
+    client     = Cliente([_torrent(f"h{i}") for i in range(50)] + [_torrent("dl", "forcedDL")])
+    inventario = InventarioTorrents(client)
+    inventario.todos()                          # snapshot: busca
+    for i in range(50):
+        inventario.por_hash(f"h{i}")            # mesmo consumidor, sem contar
+    inventario.por_estado("forcedDL")           # pausa: evitada
+    inventario.todos()                          # trackers: evitada
+    assert (client.buscas, inventario.fetches, inventario.fetches_evitados) == (1, 1, 2)
+
+    inventario.invalidar()
+    inventario.por_estado("forcedDL")
+    assert (client.buscas, inventario.fetches, inventario.fetches_evitados) == (2, 2, 2)
+
+
+def test_tracker_principal_igual_com_e_sem_cache():
+    client = Cliente([_torrent("a", tracker="https://tracker.beta.org/announce"),
+                      _torrent("b")])
+    client.torrents_trackers = lambda torrent_hash: [
+        SimpleNamespace(url="** [DHT] **"),
+        SimpleNamespace(url="https://tracker.alfa.net/announce"),
+        SimpleNamespace(url="https://tracker.beta.org/announce"),
+    ]
+    inventario = InventarioTorrents(client)
+    sem_cache  = inventario.tracker_map()
+    for h in ("a", "b"):
+        inventario.hosts_trackers(h)            # popula o cache
+    assert inventario.tracker_map() == sem_cache == {"a": "beta.org", "b": "alfa.net"}
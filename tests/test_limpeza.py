@@ -0,0 +1,69 @@
+# tests/test_limpeza.py — selecao de grupos do seed cleaner e espera pela liberacao
+
+import modulos.limpeza as limpeza
+from modulos.limpeza import GB, _escolher_para_disco, selecionar_grupos
+
+
+def _grupo(nome, gb, dias=30, ratio=1.0, disco="p2p"):
+    return {"nome": nome, "bytes": int(gb * GB), "dias": dias, "ratio": ratio, "disco": disco}
+
+
+def _nomes(grupos):
+    return sorted(g["nome"] for g in grupos)
+
+
+def test_menor_grupo_que_cobre_sozinho():
+    candidatos = [_grupo("a", 50), _grupo("b", 12), _grupo("c", 3)]
+    assert _nomes(_escolher_para_disco(candidatos, 10 * GB)) == ["b"]
+
+
+def test_empate_de_tamanho_prefere_o_mais_antigo_no_seed():
+    candidatos = [_grupo("novo", 12, dias=10), _grupo("antigo", 12, dias=90)]
+    assert _nomes(_escolher_para_disco(candidatos, 10 * GB)) == ["antigo"]
+
+
+def test_guloso_descarta_grupos_que_ficaram_desnecessarios():
+    # Guloso pelos maiores: 8 + 6 + 5 = 19 >= 18 (nenhum sozinho cobre); nada sobra
+    candidatos = [_grupo("a", 8), _grupo("b", 6), _grupo("c", 5), _grupo("d", 1)]
+    assert _nomes(_escolher_para_disco(candidatos, 18 * GB)) == ["a", "b", "c"]
+    # 8 + 6 = 14 >= 13: o guloso ja para antes do 5
+    assert _nomes(_escolher_para_disco(candidatos, 13 * GB)) == ["a", "b"]
+
+
+def test_grupos_sem_bytes_recuperaveis_nao_sao_escolhidos():
+    candidatos = [_grupo("hardlink", 0), _grupo("a", 2)]
+    assert _nomes(_escolher_para_disco(candidatos, 5 * GB)) == ["a"]
+
+
+def test_selecao_por_disco_conta_grupos_sem_disco_para_todos():
+    espacos = {
+        "p2p":   {"livre": 10, "limite_max": 20},
+        "media": {"livre": 95, "limite_max": 100},
+    }
+    grupos = [_grupo("p2p-grande", 15, disco="p2p"),
+              _grupo("sem-disco", 11, disco=None),
+              _grupo("media", 6, disco="media")]
+    selecionados, necessidade, projecao = selecionar_grupos(grupos, espacos, ["p2p", "media"])
+
+    assert necessidade == {"p2p": 10, "media": 5}
+    # sem-disco cobre p2p sozinho (menor suficiente) e conta tambem para media
+    assert _nomes(selecionados) == ["sem-disco"]
+    assert projecao == {"p2p": 21, "media": 106}
+
+
+def test_disco_sem_bytes_esperados_nao_segura_a_espera(monkeypatch):
+    livre = {"p2p": 100 * GB}
+
+    def _livre_bytes(paths):
+        livre["p2p"] -= GB      # downloads ativos consumindo espaco
+        return livre["p2p"]
+
+    monkeypatch.setattr(limpeza, "_livre_bytes", _livre_bytes)
+    monkeypatch.setattr(limpeza, "_hashes_restantes", lambda client, hashes: set())
+    monkeypatch.setattr(limpeza.time, "sleep", lambda s: None)
+
+    espacos   = {"p2p": {"paths": ["/p2p"], "limite_max": 500}}
+    resultado = limpeza.aguardar_liberacao(None, espacos, [{"hash": "h"}], {"p2p": 100 * GB},
+                                           prazo_segundos=300, esperado={"p2p": 0})
+    assert resultado["completo"] is True
+    assert resultado["segundos"] < 1
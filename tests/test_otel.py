@@ -0,0 +1,23 @@
+# tests/test_otel.py — metricas acumuladas por run
+
+import pytest
+
+from modulos import otel
+
+
+@pytest.fixture
+def coletando(monkeypatch):
+    monkeypatch.setitem(otel._config, "enabled", False)
+    monkeypatch.setitem(otel._config, "coletar", True)
+    yield
+    otel._limpar_metricas()
+
+
+def test_flush_limpa_todas_as_metricas_do_run(coletando):
+    otel.gauge("qbit.disco.livre", 42.1, "GiBy", disco="p2p")
+    otel.contador("qbit.acoes.pausados", 3)
+    assert otel.metricas_do_run()["unidades"] == {"qbit.disco.livre": "GiBy",
+                                                  "qbit.acoes.pausados": "1"}
+    otel.flush()
+    metricas = otel.metricas_do_run()
+    assert metricas["gauges"] == metricas["contadores"] == metricas["unidades"] == {}
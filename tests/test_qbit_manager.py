@@ -0,0 +1,63 @@
+# tests/test_qbit_manager.py — subcomandos do entry point com qBittorrent falso
+
+import importlib.util
+import os
+import sys
+import types
+
+import pytest
+
+from tests.conftest import RAIZ
+
+
+@pytest.fixture
+def qm():
+    """qbit-manager.py importado como modulo (o nome tem hifen)."""
+    spec   = importlib.util.spec_from_file_location(
+        "qbit_manager", os.path.join(RAIZ, "qbit-manager.py"))
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+@pytest.fixture
+def cfg(qm, tmp_path):
+    dados = tmp_path / "dados"
+    (tmp_path / "config.py").write_text(
+        f"DB_DIR  = {str(dados)!r}\n"
+        f"DB_PATH = {str(dados / 'qbit.db')!r}\n"
+        f"QB_URL  = 'http://127.0.0.1:1'\n"
+        f"PATHS   = {{'p2p': {{'path': {str(tmp_path)!r}, 'limite_min': 0, 'limite_max': 0,"
+        f" 'seed_cleaner': True, 'pause_trigger': True}}}}\n",
+        encoding="utf-8")
+    return qm._carregar_config(str(tmp_path))
+
+
+@pytest.fixture
+def qbittorrentapi_login_recusado(monkeypatch):
+    """Modulo qbittorrentapi falso cujo login sempre falha."""
+    falso = types.ModuleType("qbittorrentapi")
+
+    class LoginFailed(Exception):
+        pass
+
+    class Client:
+        def __init__(self, host=None, username=None, password=None):
+            pass
+
+        def auth_log_in(self, *args, **kwargs):
+            raise LoginFailed("credenciais recusadas")
+
+    falso.LoginFailed = LoginFailed
+    falso.Client      = Client
+    monkeypatch.setitem(sys.modules, "qbittorrentapi", falso)
+    return falso
+
+
+@pytest.mark.parametrize("comando", ["cmd_check_torrent", "cmd_erase_torrent", "cmd_tracker_list"])
+def test_login_recusado_em_comando_avulso_sai_com_erro(qm, cfg, qbittorrentapi_login_recusado,
+                                                       comando, capsys):
+    with pytest.raises(SystemExit) as saida:
+        getattr(qm, comando)(cfg)
+    assert saida.value.code == 1
+    assert "❌ Falha ao autenticar" in capsys.readouterr().out